@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+动作解析基准测试
+用 benchmarks/data/model_outputs.jsonl 中的模型输出样本（含格式不规范的输出），
+对比旧的 startswith + 多次正则回退解析与 utils.action_parser 单次扫描解析的吞吐量和失败率。
+
+样本每行: {"output": 模型原始输出, "expected": 期望解析出的动作名（无法执行时为 null）}
+
+用法: python benchmarks/bench_action_parser.py [--rounds 2000] [--corpus path.jsonl] [--show-failures]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import json
+import re
+import time
+
+from utils.action_parser import ActionParseError, parse_action, parse_response
+
+DEFAULT_CORPUS = os.path.join(base_dir, "benchmarks", "data", "model_outputs.jsonl")
+
+
+def legacy_parse(response: str) -> str | None:
+    """旧实现：model_decide 的 JSON/正则回退 + _parse_and_execute 的 startswith 链，返回识别出的动作名"""
+    try:
+        result = json.loads(response)
+        action = result.get("Action", "")
+    except json.JSONDecodeError:
+        action_match = re.search(r'"?Action"?\s*[:：]\s*"?([^"]*)"?', response, re.DOTALL)
+        action = action_match.group(1).strip() if action_match else ""
+        if not action:
+            for line in response.split('\n'):
+                if any(cmd in line for cmd in ['click(', 'type(', 'hotkey(', 'scroll(', 'finished(']):
+                    action = line.strip()
+                    break
+
+    def point(prefix: str = "") -> re.Match | None:
+        return (re.search(prefix + r"<point>(\d+)\s+(\d+)</point>", action)
+                or re.search((prefix or "point=") + r"['\"](\d+)\s+(\d+)['\"]", action))
+
+    if action.startswith("finished("):
+        return "finished"
+    if action.startswith("click("):
+        return "click" if point() else None
+    if action.startswith("left_double("):
+        return "left_double" if point() else None
+    if action.startswith("type("):
+        return "type" if re.search(r"content=['\"]([^'\"]*)['\"]", action) else None
+    if action.startswith("hotkey("):
+        return "hotkey" if re.search(r"key=['\"]([^'\"]*)['\"]", action) else None
+    if action.startswith("scroll("):
+        return "scroll" if point() and re.search(r"direction=['\"]([^'\"]*)['\"]", action) else None
+    if action.startswith("wait("):
+        return "wait"
+    if action.startswith("drag("):
+        start = (re.search(r"start_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", action)
+                 or re.search(r"start_point=['\"](\d+)\s+(\d+)['\"]", action))
+        end = (re.search(r"end_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", action)
+               or re.search(r"end_point=['\"](\d+)\s+(\d+)['\"]", action))
+        return "drag" if start and end else None
+    return None
+
+
+def current_parse(response: str) -> str | None:
+    """新实现：parse_response + parse_action"""
+    _, action = parse_response(response)
+    try:
+        return parse_action(action).name
+    except ActionParseError:
+        return None
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bench(name: str, parse, corpus: list[dict], rounds: int, show_failures: bool) -> None:
+    failures = [row for row in corpus if parse(row["output"]) != row["expected"]]
+    outputs = [row["output"] for row in corpus]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for output in outputs:
+            parse(output)
+    elapsed = time.perf_counter() - start
+    total = rounds * len(outputs)
+
+    print(f"{name:<10} {total / elapsed:>12,.0f} 次/秒 {elapsed / total * 1e6:>9.2f} 微秒/次 "
+          f"错误 {len(failures):>3}/{len(corpus)} ({len(failures) / len(corpus):.1%})")
+    if show_failures:
+        for row in failures:
+            print(f"    ✗ 期望 {row['expected']}, 得到 {parse(row['output'])}: {row['output'][:80]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="动作解析吞吐量与失败率基准测试")
+    parser.add_argument("--rounds", type=int, default=2000, help="遍历样本的轮数")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="样本文件（JSONL）")
+    parser.add_argument("--show-failures", action="store_true", help="打印解析错误的样本")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"样本: {len(corpus)} 条，轮数: {args.rounds}\n")
+    bench("legacy", legacy_parse, corpus, args.rounds, args.show_failures)
+    bench("current", current_parse, corpus, args.rounds, args.show_failures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agent 主循环端到端基准测试
+在假屏幕 + 本地模拟模型服务（benchmarks/mock_server.py）上运行真实的 GUIAgent 图
+（截图 -> 决策 -> 执行），不需要网络、真实模型和显示器。
+假屏幕是一条 N 个画面的链，每个画面有一个“下一步”按钮；模拟服务按脚本依次点击按钮，最后返回 finished()。
+
+每个任务长度在独立子进程中运行（峰值内存互不影响），报告：
+  - 步数/秒、总耗时
+  - 分阶段耗时 p50/p95（Tracer）
+  - 请求字节数（客户端统计 + 服务端实际收到）
+  - 峰值 RSS
+
+结果保存为 JSON；传入 --compare 基线文件时，步数/秒下降或耗时、请求字节、峰值内存上升超过容差则以非零状态退出。
+
+用法: python benchmarks/bench_agent_loop.py [--steps 10 50 100] [--latency 0.05] [--streaming]
+      [--output benchmarks/results/agent_loop.json] [--compare baseline.json --tolerance 0.2]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCREEN_SIZE = (1280, 720)
+BUTTON_SIZE = (160, 48)
+# 对比基线时检查的指标：名称 -> 越大越好（True）/越小越好（False）
+COMPARED_METRICS = {
+    "steps_per_sec": True,
+    "wall_s": False,
+    "request_bytes_mean": False,
+    "peak_rss_mb": False,
+}
+
+
+def button_box(index: int) -> tuple[int, int, int, int]:
+    """第 index 个画面中按钮的位置（每个画面不同，保证帧内容变化）"""
+    x = 80 + (index * 173) % (SCREEN_SIZE[0] - BUTTON_SIZE[0] - 160)
+    y = 80 + (index * 97) % (SCREEN_SIZE[1] - BUTTON_SIZE[1] - 160)
+    return x, y, x + BUTTON_SIZE[0], y + BUTTON_SIZE[1]
+
+
+def build_script(steps: int) -> tuple[dict, list[str]]:
+    """生成 steps 个画面的假屏幕脚本和对应的模型回答脚本"""
+    states, answers = {}, []
+    for i in range(steps):
+        x1, y1, x2, y2 = box = button_box(i)
+        states[f"page{i}"] = {"title": f"第 {i + 1} 页", "widgets": [
+            {"name": "next", "box": list(box), "label": "下一步", "click": f"page{i + 1}"}]}
+        # 模型坐标为归一化的 0-1000
+        px = round((x1 + x2) / 2 / SCREEN_SIZE[0] * 1000)
+        py = round((y1 + y2) / 2 / SCREEN_SIZE[1] * 1000)
+        answers.append(json.dumps({"Thought": f"点击第 {i + 1} 页的下一步按钮",
+                                   "Action": f"click(point='<point>{px} {py}</point>')"}, ensure_ascii=False))
+    states[f"page{steps}"] = {"title": "完成", "widgets": []}
+    answers.append(json.dumps({"Thought": "已经到达最后一页",
+                               "Action": "finished(content='done')"}, ensure_ascii=False))
+    return {"size": list(SCREEN_SIZE), "initial": "page0", "states": states}, answers
+
+
+def peak_rss_mb() -> float | None:
+    """当前进程的峰值 RSS（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def run_one(args) -> dict:
+    """在当前进程中运行一次任务，返回指标"""
+    from benchmarks.mock_server import MockConfig, MockModelServer
+    from gui_operator.execute import Operation
+    from gui_operator.fake_screen import FakeScreen
+    from main import GUIAgent
+    from utils.tracing import Tracer
+
+    script, answers = build_script(args.steps)
+    config = MockConfig(answers=answers, latency=args.latency, chunk_interval=args.chunk_interval,
+                        prompt_tokens=args.prompt_tokens, completion_tokens=args.completion_tokens)
+    screen = FakeScreen.from_script(script)
+    tracer = Tracer()
+    settle_ms = args.settle_ms
+    with MockModelServer(config) as server, tempfile.TemporaryDirectory() as steps_dir:
+        with redirect_stdout(io.StringIO()):
+            agent = GUIAgent("依次点击每一页的下一步按钮直到最后一页", model_name="mock", api_key="mock",
+                             base_url=server.base_url, client_mode=args.client_mode, streaming=args.streaming,
+                             save_screenshots=args.save_screenshots, record_trajectory=False,
+                             settle_options={"min_wait": 0.0, "stable_ms": settle_ms,
+                                             "poll_interval": min(0.05, max(settle_ms, 1) / 1000)},
+                             operation=Operation(input_backend=screen, screen=screen),
+                             steps_dir=steps_dir, tracer=tracer, recursion_limit=args.steps * 3 + 30)
+            start = time.perf_counter()
+            final_state = agent.run()
+            wall = time.perf_counter() - start
+        stats = server.stats
+
+    steps = final_state["step"]
+    if screen.state_name != f"page{args.steps}":
+        raise RuntimeError(f"任务未走完画面链: 停在 {screen.state_name}")
+    server_bytes = stats.request_bytes
+    return {
+        "steps": steps,
+        "wall_s": round(wall, 3),
+        "steps_per_sec": round(steps / wall, 2),
+        "model_requests": stats.requests,
+        "request_bytes_mean": round(sum(server_bytes) / len(server_bytes)) if server_bytes else 0,
+        "request_bytes_max": max(server_bytes, default=0),
+        "request_bytes_total": sum(server_bytes),
+        "client_request_bytes_mean": (round(sum(agent.request_sizes) / len(agent.request_sizes))
+                                      if agent.request_sizes else 0),
+        "peak_rss_mb": peak_rss_mb(),
+        "phases": tracer.summary(),
+    }
+
+
+def spawn(args, steps: int) -> dict:
+    """在子进程中运行一个任务长度（峰值 RSS 只反映这一次运行）"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-one", "--steps", str(steps),
+           "--latency", str(args.latency), "--chunk-interval", str(args.chunk_interval),
+           "--prompt-tokens", str(args.prompt_tokens), "--completion-tokens", str(args.completion_tokens),
+           "--settle-ms", str(args.settle_ms), "--client-mode", args.client_mode]
+    if args.streaming:
+        cmd.append("--streaming")
+    if args.save_screenshots:
+        cmd.append("--save-screenshots")
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=base_dir)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{steps} 步运行失败:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """与基线对比，返回超出容差的回归描述"""
+    regressions = []
+    for steps, current in results["runs"].items():
+        base = baseline.get("runs", {}).get(steps)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{steps} 步 {metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_run(steps: str, run: dict, phases: int) -> None:
+    rss = f"{run['peak_rss_mb']:.1f}MB" if run["peak_rss_mb"] is not None else "-"
+    print(f"\n📊 {steps} 步: {run['steps_per_sec']:.2f} 步/秒, 总耗时 {run['wall_s']:.2f}s, "
+          f"模型请求 {run['model_requests']} 次, 峰值RSS {rss}")
+    print(f"📦 请求大小: 平均 {run['request_bytes_mean'] / 1024:.1f}KB, 最大 {run['request_bytes_max'] / 1024:.1f}KB "
+          f"(客户端统计平均 {run['client_request_bytes_mean'] / 1024:.1f}KB)")
+    rows = list(run["phases"].items())[:phases]
+    if rows:
+        width = max(len(name) for name, _ in rows)
+        print(f"   {'阶段':<{width}}  {'次数':>6}  {'p50ms':>9}  {'p95ms':>9}  {'合计ms':>10}")
+        for name, row in rows:
+            print(f"   {name:<{width}}  {row['count']:>6}  {row['p50_ms']:>9.2f}  {row['p95_ms']:>9.2f}  "
+                  f"{row['total_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent 主循环端到端基准测试")
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 50, 100], help="任务长度（步数）")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟模型响应延迟（秒）")
+    parser.add_argument("--chunk-interval", type=float, default=0.0, help="流式分片间隔（秒）")
+    parser.add_argument("--prompt-tokens", type=int, default=1500)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--settle-ms", type=int, default=50, help="画面稳定检测需要保持稳定的毫秒数")
+    parser.add_argument("--client-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--save-screenshots", action="store_true", help="同时把截图写入临时 steps 目录")
+    parser.add_argument("--phases", type=int, default=12, help="每个任务长度打印的阶段数")
+    parser.add_argument("--output", default=os.path.join(base_dir, "benchmarks", "results", "agent_loop.json"))
+    parser.add_argument("--compare", help="基线 JSON，超出容差时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变化（默认20%%）")
+    parser.add_argument("--run-one", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        args.steps = args.steps[0]
+        print(json.dumps(run_one(args), ensure_ascii=False))
+        return
+
+    results = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: getattr(args, key) for key in ("latency", "chunk_interval", "prompt_tokens",
+                                                      "completion_tokens", "settle_ms", "client_mode",
+                                                      "streaming", "save_screenshots")},
+        "runs": {},
+    }
+    for steps in args.steps:
+        print(f"⏳ 运行 {steps} 步 ...")
+        results["runs"][str(steps)] = spawn(args, steps)
+        print_run(str(steps), results["runs"][str(steps)], args.phases)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("⚠️ 基线的运行参数与本次不同，对比结果仅供参考")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ 回归 {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ 与基线相比没有超过 {args.tolerance:.0%} 的回归")
+
+
+if __name__ == "__main__":
+    main()
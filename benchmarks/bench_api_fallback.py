@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口回退检查
+在本地模拟模型服务上让 chat.completions 返回不同的错误，连续发起多次请求，检查接口熔断是否正确：
+
+  - 普通请求错误（上下文超长、图片无效等 400/413/422）：本次回退或抛出，但不熔断，下一次仍先尝试 chat
+  - 能力错误（404/405/501，或指明接口/参数不被支持的 400）：熔断 chat，冷却期内直接使用 responses
+
+任一场景的熔断状态或 chat 尝试次数不符合预期时以非零状态退出。
+
+用法: python benchmarks/bench_api_fallback.py [--calls 3]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import io
+from contextlib import redirect_stdout
+
+import openai
+from PIL import Image
+
+from benchmarks.mock_server import MockConfig, MockModelServer
+from utils.model import LVMChat
+
+# (场景, chat 返回的状态码和错误体, responses 是否可用, 是否应熔断 chat)
+SCENARIOS = [
+    ("400 上下文超长", (400, {"error": {"message": "This model's maximum context length is 8192 tokens",
+                                     "code": "context_length_exceeded"}}), True, False),
+    ("400 图片无效", (400, {"error": {"message": "Invalid image: unsupported image format",
+                                  "code": "invalid_image"}}), True, False),
+    ("413 请求体过大", (413, {"error": {"message": "Request entity too large"}}), True, False),
+    ("422 参数校验失败", (422, {"detail": [{"msg": "field required"}]}), True, False),
+    ("400 两个接口都失败", (400, {"error": {"message": "Invalid image", "code": "invalid_image"}}), False, False),
+    ("404 接口不存在", (404, {"error": {"message": "Not found"}}), True, True),
+    ("405 方法不允许", (405, {"error": {"message": "Method not allowed"}}), True, True),
+    ("400 不支持的参数", (400, {"error": {"message": "Unrecognized request argument supplied: messages",
+                                    "code": None}}), True, True),
+]
+
+
+def run_scenario(error: tuple[int, dict], responses_ok: bool, calls: int) -> dict:
+    """连续请求 calls 次，返回 chat 被尝试的次数、失败次数和最后的接口顺序"""
+    config = MockConfig(errors={"chat": error, **({} if responses_ok else {"responses": error})})
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    image = buffer.getvalue()
+    failures = 0
+    with MockModelServer(config) as server:
+        chat = LVMChat(api_key="mock", base_url=server.base_url, model="mock")
+        for _ in range(calls):
+            try:
+                with redirect_stdout(io.StringIO()):
+                    chat.get_multimodal_response("点击下一步", image)
+            except openai.APIStatusError:
+                failures += 1
+        return {"chat_attempts": server.stats.rejected if responses_ok else None,
+                "failures": failures, "order": chat.api_modes.order()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口回退检查")
+    parser.add_argument("--calls", type=int, default=3, help="每个场景连续请求的次数")
+    args = parser.parse_args()
+
+    problems = []
+    for name, error, responses_ok, should_trip in SCENARIOS:
+        result = run_scenario(error, responses_ok, args.calls)
+        tripped = result["order"][0] != "chat"
+        expected_attempts = 1 if should_trip else args.calls
+        ok = tripped == should_trip and result["chat_attempts"] in (None, expected_attempts)
+        if not responses_ok:
+            ok = ok and result["failures"] == args.calls
+        attempts = "-" if result["chat_attempts"] is None else result["chat_attempts"]
+        print(f"{'✅' if ok else '❌'} {name:<14} chat 尝试 {attempts}/{args.calls} 次, "
+              f"失败 {result['failures']} 次, {'已熔断' if tripped else '未熔断'} (接口顺序 {result['order']})")
+        if not ok:
+            problems.append(name)
+
+    for name in problems:
+        print(f"❌ {name}: 熔断状态与预期不符")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+取消延迟基准测试
+在假屏幕 + 本地模拟模型服务上运行 GUIAgent（不需要显示器和真实模型），
+在不同阶段调用 cancel()，测量从取消到 run() 退出（Agent 线程空闲）的耗时：
+
+  - request:        模型请求进行中（服务端30秒不响应），同步客户端
+  - request-async:  同上，异步共享客户端
+  - stream:         流式响应进行中（只发出一个分片后挂起）
+  - settle:         执行 wait() 动作后的画面稳定等待中
+
+任一场景超过阈值或 Agent 在取消后仍发送了输入时以非零状态退出。
+
+用法: python benchmarks/bench_cancel.py [--rounds 5] [--threshold-ms 300]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import io
+import json
+import statistics
+import threading
+import time
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gui_operator.execute import Operation
+from gui_operator.fake_screen import FakeScreen
+from main import GUIAgent
+from utils.cancel import Cancelled
+
+SCRIPT = {"size": [1280, 720], "states": {"home": {"widgets": [
+    {"name": "search", "box": [100, 100, 500, 140], "kind": "input", "submit": "home"}]}}}
+WAIT_RESPONSE = '{"Thought": "等待页面加载", "Action": "wait()"}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """模拟模型服务：按路径决定行为（挂起 / 流式挂起 / 立即返回 wait()）"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(404)
+        self.end_headers()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        mode = self.path.split("/")[1]
+        try:
+            if mode == "hang":
+                time.sleep(30)
+                return
+            if mode == "stream" and body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+                         "choices": [{"index": 0, "delta": {"content": '{"Thought": "'}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(30)
+                return
+            data = json.dumps({"id": "c", "object": "chat.completion", "created": 0, "model": "m",
+                               "choices": [{"index": 0, "finish_reason": "stop",
+                                            "message": {"role": "assistant", "content": WAIT_RESPONSE}}],
+                               "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def measure(port: int, scenario: str, cancel_after: float) -> tuple[float, int]:
+    """运行一次并在 cancel_after 秒后取消，返回 (取消到退出的秒数, 取消后收到的输入事件数)"""
+    mode = {"request": "hang", "request-async": "hang", "stream": "stream", "settle": "ok"}[scenario]
+    screen = FakeScreen.from_script(SCRIPT)
+    with redirect_stdout(io.StringIO()):
+        agent = GUIAgent("在搜索框输入关键词", model_name="mock", api_key="mock",
+                         base_url=f"http://127.0.0.1:{port}/{mode}/v1",
+                         client_mode="async" if scenario == "request-async" else "sync",
+                         streaming=scenario == "stream", record_trajectory=False, save_screenshots=False,
+                         operation=Operation(input_backend=screen, screen=screen))
+    agent.lvm_chat.warmup = lambda: None
+    done = threading.Event()
+    stopped_at = [0.0]
+
+    def run():
+        try:
+            with redirect_stdout(io.StringIO()):
+                agent.run()
+        except Cancelled:
+            pass
+        finally:
+            stopped_at[0] = time.monotonic()
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    time.sleep(cancel_after)
+    events_before = len(screen.events)
+    cancelled_at = time.monotonic()
+    agent.cancel("benchmark")
+    if not done.wait(10):
+        return float("inf"), 0
+    return stopped_at[0] - cancelled_at, len(screen.events) - events_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="取消延迟基准测试")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--threshold-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    failed = False
+    for scenario, cancel_after in (("request", 0.5), ("request-async", 0.5), ("stream", 0.5), ("settle", 1.2)):
+        latencies, stray_inputs = [], 0
+        for _ in range(args.rounds):
+            latency, strays = measure(port, scenario, cancel_after)
+            latencies.append(latency * 1000)
+            stray_inputs += strays
+        worst = max(latencies)
+        ok = worst <= args.threshold_ms and stray_inputs == 0
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {scenario:<14} 取消->空闲 平均 {statistics.fmean(latencies):.1f}ms, "
+              f"最大 {worst:.1f}ms, 取消后输入 {stray_inputs} 次")
+    server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
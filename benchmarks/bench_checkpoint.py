@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查点写入开销基准测试
+模拟一个N步的运行（不访问网络、不截图），每步按 截图/决策/执行 三个节点各写一次检查点，
+对比朴素做法（每个节点把完整状态和整段会话历史序列化后整体重写）与当前实现
+（会话消息、动作历史、轨迹增量追加，快照只记录消息序号和列表长度）的单次写入耗时和数据库大小。
+
+用法: python benchmarks/bench_checkpoint.py [--steps 100] [--keep-images 3]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import json
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from utils.checkpoint import AgentCheckpointer
+from utils.model import ImageRef, LVMChat, OMITTED_IMAGE_TEXT
+from utils.prompts import COMPUTER_USE_UITARS
+from utils.trajectory import TrajectoryStep
+
+RESPONSE = '{"Thought": "点击搜索框，输入关键词", "Action": "click(point=\'<point>500 300</point>\')"}'
+NODES = ("screenshot", "decide", "execute")
+
+
+def simulate(steps: int, keep_images: int):
+    """逐节点产出 (节点, 状态, 会话历史, 额外状态, 只追加列表)，历史按 LVMChat 的方式降级旧截图"""
+    prompt = COMPUTER_USE_UITARS.format(instruction="打开浏览器搜索小米汽车并播放第一个视频")
+    history: list[dict] = []
+    actions: list[str] = []
+    trajectory: list[TrajectoryStep] = []
+    for step in range(1, steps + 1):
+        state = {"instruction": "bench", "screenshot_path": f"steps/step_{step}.png", "step": step,
+                 "thought": "", "action": "", "finished": False, "settle_time": 0.0}
+        extra = {"model_calls": step - 1}
+        logs = {"action_history": actions, "trajectory": trajectory}
+        yield "screenshot", state, history, extra, logs
+
+        user_turns = [m for m in history if m["role"] == "user"]
+        for message in user_turns[:max(len(user_turns) - (keep_images - 1), 0)]:
+            message["content"] = [{"type": "input_text", "text": OMITTED_IMAGE_TEXT}]
+        history.append({"role": "user", "content": [
+            {"type": "input_image", "image_ref": ImageRef.of(state["screenshot_path"])},
+            {"type": "input_text", "text": prompt}]})
+        history.append({"role": "assistant", "content": [{"type": "output_text", "text": RESPONSE}]})
+        actions.append("click(point='<point>500 300</point>')")
+        state = {**state, "thought": "点击搜索框", "action": actions[-1]}
+        extra = {**extra, "model_calls": step}
+        yield "decide", state, history, extra, logs
+
+        trajectory.append(TrajectoryStep(step, "点击搜索框", actions[-1], fingerprint=step * 7919, settle_time=0.3))
+        state = {**state, "settle_time": 0.3}
+        yield "execute", state, history, extra, logs
+
+
+def run_naive(path: str, steps: int, keep_images: int) -> list[float]:
+    """朴素实现：每个节点整体重写一行完整快照"""
+    conn = sqlite3.connect(path)
+    conn.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;"
+                       "CREATE TABLE snapshots (run_id TEXT, node TEXT, data TEXT, PRIMARY KEY (run_id, node));")
+    times = []
+    for node, state, history, extra, logs in simulate(steps, keep_images):
+        start = time.perf_counter()
+        data = json.dumps({"state": state, "history": [LVMChat.compact_message(m) for m in history],
+                           "extra": extra, "action_history": logs["action_history"],
+                           "trajectory": [s.to_dict() for s in logs["trajectory"]]}, ensure_ascii=False)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", ("bench", node, data))
+        times.append(time.perf_counter() - start)
+    conn.close()
+    return times
+
+
+def run_incremental(path: str, steps: int, keep_images: int) -> list[float]:
+    """当前实现：AgentCheckpointer"""
+    checkpointer = AgentCheckpointer(path)
+    checkpointer.begin("bench", "bench")
+    for node, state, history, extra, logs in simulate(steps, keep_images):
+        checkpointer.save("bench", node, state, history, LVMChat.compact_message, extra, logs)
+    checkpointer.finish("bench")
+    checkpointer.close()
+    return checkpointer.write_times
+
+
+def report(name: str, times: list[float], path: str) -> None:
+    last_steps = [t * 1000 for t in times[-len(NODES) * 10:]]
+    ms = sorted(t * 1000 for t in times)
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    print(f"{name:<14} 写入 {len(ms)} 次 | 平均 {statistics.fmean(ms):.3f}ms | "
+          f"p50 {ms[len(ms) // 2]:.3f}ms | p95 {ms[min(len(ms) - 1, int(len(ms) * 0.95))]:.3f}ms | "
+          f"最后10步平均 {statistics.fmean(last_steps):.3f}ms | 数据库 {size / 1024:.0f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查点写入开销基准测试")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--keep-images", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"模拟 {args.steps} 步 x {len(NODES)} 个节点\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        naive_path = os.path.join(tmp, "naive.db")
+        report("整体重写", run_naive(naive_path, args.steps, args.keep_images), naive_path)
+        incremental_path = os.path.join(tmp, "incremental.db")
+        report("增量(当前)", run_incremental(incremental_path, args.steps, args.keep_images), incremental_path)
+
+
+if __name__ == "__main__":
+    main()
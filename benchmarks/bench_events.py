@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件总线基准测试
+对比 Agent 线程每输出一行日志的耗时：
+  - 旧方式：替换 sys.stdout，print 同步调用界面/Socket.IO 回调（用 sleep 模拟一次推送的耗时）
+  - 事件总线：publish 只放入订阅者的有界队列，慢消费者在自己的线程中处理
+并报告慢消费者跟不上时队列丢弃的事件数（发布方从不等待）。
+
+用法: python benchmarks/bench_events.py [--lines 2000] [--sink-ms 0.5] [--queue 1000]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import threading
+import time
+
+from core.events import EventBus, AgentEvent, LOG
+
+
+class _SlowRedirector:
+    """旧的 OutputRedirector：每次 write 同步调用一次耗时的回调"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text: str) -> None:
+        if text.strip():
+            time.sleep(self.delay)
+
+    def flush(self) -> None:
+        pass
+
+
+def bench_stdout(lines: int, delay: float) -> float:
+    """返回每行平均耗时（微秒）"""
+    original = sys.stdout
+    sys.stdout = _SlowRedirector(delay)
+    try:
+        start = time.perf_counter()
+        for i in range(lines):
+            print(f"📸 Step {i} - 模型响应")
+        return (time.perf_counter() - start) / lines * 1e6
+    finally:
+        sys.stdout = original
+
+
+def bench_bus(lines: int, delay: float, maxsize: int) -> tuple[float, int, int]:
+    """返回 (每行平均耗时微秒, 消费者处理数, 丢弃数)"""
+    bus = EventBus(maxsize)
+    subscription = bus.subscribe()
+    consumed = [0]
+
+    def consume():
+        for _ in subscription:
+            time.sleep(delay)
+            consumed[0] += 1
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    start = time.perf_counter()
+    for i in range(lines):
+        bus.publish(AgentEvent(LOG, "bench", i, {"message": f"📸 Step {i} - 模型响应", "level": "info"}))
+    per_line = (time.perf_counter() - start) / lines * 1e6
+    subscription.close()
+    consumer.join()
+    return per_line, consumed[0], subscription.dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件总线基准测试")
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--sink-ms", type=float, default=0.5, help="模拟一次界面/Socket.IO 推送的耗时（毫秒）")
+    parser.add_argument("--queue", type=int, default=1000, help="订阅者队列容量")
+    args = parser.parse_args()
+
+    delay = args.sink_ms / 1000
+    stdout_us = bench_stdout(args.lines, delay)
+    bus_us, consumed, dropped = bench_bus(args.lines, delay, args.queue)
+    print(f"替换stdout  {stdout_us:9.1f} µs/行（Agent 线程上同步推送）")
+    print(f"事件总线    {bus_us:9.1f} µs/行（消费者处理 {consumed} 条, 队列满丢弃 {dropped} 条）")
+    print(f"Agent 线程上的日志开销降低 {stdout_us / max(bus_us, 1e-9):.0f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话历史内存基准测试
+模拟一个100步的会话（不访问网络，chat.completions 由本地桩对象应答），
+对比旧的历史表示（每张截图展开成完整 base64 data URL 并在每次请求时整体复制）
+与当前实现（图片句柄 + 按帧编号的LRU编码缓存 + 历史策略）的内存占用和耗时。
+
+用法: python benchmarks/bench_history_memory.py [--steps 100] [--keep-images 3]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import base64
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from PIL import Image
+
+from gui_operator.frame import Frame
+from utils.model import LVMChat, HistoryPolicy
+from utils.prompts import COMPUTER_USE_UITARS
+
+SAMPLE_SCREENSHOT = os.path.join(base_dir, "utils", "screenshot-20260120-160656.png")
+RESPONSE = '{"Thought": "点击搜索框", "Action": "click(point=\'<point>500 300</point>\')"}'
+
+
+class _Completions:
+    """本地桩：立即返回固定回答"""
+
+    def create(self, model, messages, **kwargs):
+        message = SimpleNamespace(content=RESPONSE)
+        usage = SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class _Responses:
+    """本地桩：首轮（无历史）走 responses 接口"""
+
+    def create(self, model, input, **kwargs):
+        return SimpleNamespace(output_text=RESPONSE)
+
+
+def iter_frames(steps: int):
+    """逐步生成互不相同的帧（在示例截图上改动一个像素块），模拟每步一次截图"""
+    base = Image.open(SAMPLE_SCREENSHOT).convert("RGB")
+    for i in range(steps):
+        img = base.copy()
+        img.paste((i * 37 % 256, i * 11 % 256, 0), (i % 50 * 10, 0, i % 50 * 10 + 40, 40))
+        yield Frame(rgb=img.tobytes(), width=img.width, height=img.height)
+
+
+def run_legacy(frames, prompt: str) -> list:
+    """旧实现：历史保存完整 data URL，每次请求复制整段历史"""
+    history = []
+    for frame in frames:
+        b64 = base64.b64encode(frame.to_png()).decode("utf-8")
+        current = {"role": "user", "content": [
+            {"type": "input_image", "image_url": f"data:image/png;base64,{b64}"},
+            {"type": "input_text", "text": prompt}]}
+        messages = [
+            {"role": m["role"], "content": [
+                {"type": "image_url", "image_url": {"url": c["image_url"]}} if c["type"] == "input_image"
+                else {"type": "text", "text": c["text"]} for c in m["content"]]}
+            for m in history + [current]
+        ]
+        del messages
+        history.append(current)
+        history.append({"role": "assistant", "content": [{"type": "output_text", "text": RESPONSE}]})
+    return history
+
+
+def run_current(frames, prompt: str, keep_images: int) -> LVMChat:
+    """当前实现：句柄 + LRU编码缓存 + 历史策略"""
+    chat = LVMChat(api_key="benchmark", upload_profile="original",
+                   history_policy=HistoryPolicy(keep_images=keep_images))
+    chat.client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions()),
+                                  responses=_Responses())
+    for frame in frames:
+        chat.get_multimodal_response(prompt, frame, res_format="json", use_history=True)
+    return chat
+
+
+def measure(name: str, fn) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} retained={current / 1024 / 1024:8.1f}MB  peak={peak / 1024 / 1024:8.1f}MB  "
+          f"time={elapsed:6.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话历史内存基准测试")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--keep-images", type=int, default=3)
+    args = parser.parse_args()
+
+    prompt = COMPUTER_USE_UITARS.format(instruction="打开浏览器搜索GUI Agent")
+    print(f"🧪 合成会话: {args.steps} 步, 保留最近 {args.keep_images} 张截图\n")
+
+    # 预热一轮，排除首次调用时的模块导入等一次性分配
+    run_current(iter_frames(2), prompt, args.keep_images)
+    measure("legacy", lambda: run_legacy(iter_frames(args.steps), prompt))
+    chat = measure("current", lambda: run_current(iter_frames(args.steps), prompt, args.keep_images))
+    print(f"\n编码缓存: 命中 {chat.image_cache.hits}, 未命中 {chat.image_cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
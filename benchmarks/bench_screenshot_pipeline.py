@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图 -> 编码 流水线基准测试
+对比旧流程（mss写PNG到磁盘 -> 读回 -> base64）与内存流程（抓帧 -> 内存PNG -> base64）
+每一步的耗时。没有可用显示器时使用 utils/ 下的示例截图作为输入帧。
+
+用法: python benchmarks/bench_screenshot_pipeline.py [--rounds 20]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import base64
+import statistics
+import tempfile
+import time
+
+import mss
+import mss.tools
+
+from gui_operator.frame import Frame, FrameWriter
+
+SAMPLE_SCREENSHOT = os.path.join(base_dir, "utils", "screenshot-20260120-160656.png")
+
+
+def make_grabber():
+    """返回抓帧函数；无显示器时退化为读取示例截图"""
+    try:
+        sct = mss.mss()
+        monitor = sct.monitors[1]
+        sct.grab(monitor)
+        return (lambda: Frame.from_mss(sct.grab(monitor))), "mss"
+    except Exception:
+        from PIL import Image
+        image = Image.open(SAMPLE_SCREENSHOT).convert("RGB")
+        rgb, size = image.tobytes(), image.size
+        return (lambda: Frame(rgb=rgb, width=size[0], height=size[1])), "sample"
+
+
+def disk_round_trip(grab, path: str) -> str:
+    """旧流程：写PNG -> 读回 -> base64"""
+    frame = grab()
+    mss.tools.to_png(frame.rgb, frame.size, output=path)
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+def in_memory(grab, writer: FrameWriter | None, path: str) -> str:
+    """新流程：内存PNG -> base64，落盘交给后台线程"""
+    frame = grab()
+    if writer:
+        writer.submit(frame, path)
+    return base64.b64encode(frame.to_png()).decode("utf-8")
+
+
+def measure(fn, rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    print(f"{name:<28} mean={statistics.mean(timings):8.2f}ms  "
+          f"median={statistics.median(timings):8.2f}ms  max={max(timings):8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图编码流水线基准测试")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    grab, source = make_grabber()
+    frame = grab()
+    print(f"🖥️  输入来源: {source}, 分辨率 {frame.width}x{frame.height}, 轮数 {args.rounds}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "step.png")
+        writer = FrameWriter()
+        report("before: disk round trip", measure(lambda: disk_round_trip(grab, path), args.rounds))
+        report("after: in-memory", measure(lambda: in_memory(grab, None, path), args.rounds))
+        report("after: in-memory + async save", measure(lambda: in_memory(grab, writer, path), args.rounds))
+        writer.flush()
+
+
+if __name__ == "__main__":
+    main()
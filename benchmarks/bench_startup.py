@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准测试
+用 python -X importtime 分别测量三个入口（gui_app.py、web_app.py、main.py）的模块加载耗时，
+每个入口在独立的子进程和临时工作目录中运行多次取中位数，并列出最重的直接依赖。
+
+以下情况以非零状态退出：
+  - gui_app / web_app 启动时导入了应推迟到第一个任务才加载的重依赖（langgraph、openai、pyautogui、mss）
+  - 与基线相比导入耗时增加超过容差
+
+用法: python benchmarks/bench_startup.py [--runs 5] [--tolerance 0.3]
+      [--baseline benchmarks/data/startup_baseline.json] [--update-baseline]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+ENTRY_POINTS = ("gui_app", "web_app", "main")
+# 界面/服务启动时不应加载的模块（只在运行任务时需要）
+DEFERRED_MODULES = ("langgraph", "openai", "pyautogui", "mss")
+LAZY_ENTRY_POINTS = ("gui_app", "web_app")
+DEFAULT_BASELINE = os.path.join(base_dir, "benchmarks", "data", "startup_baseline.json")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """解析 -X importtime 输出，返回 [(模块名, 嵌套深度, 自身微秒, 累计微秒)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(head.split(":")[1]), int(cumulative_us)))
+    return rows
+
+
+def measure(entry: str, cwd: str) -> dict:
+    """在子进程中导入一次入口模块，返回导入耗时、进程耗时和导入的模块列表"""
+    env = {**os.environ, "PYTHONPATH": base_dir + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+                          capture_output=True, text=True, cwd=cwd, env=env)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {entry} 失败:\n{proc.stderr[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+    top = next((row for row in rows if row[0] == entry and row[1] == 0), None)
+    if top is None:
+        raise RuntimeError(f"没有找到 {entry} 的导入记录")
+    # 入口模块的直接依赖：紧跟在它之前、深度为1的行
+    index = rows.index(top)
+    children = []
+    for name, depth, _, cumulative in reversed(rows[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cumulative))
+    return {
+        "import_ms": top[3] / 1000,
+        "wall_ms": wall * 1000,
+        "modules": {row[0] for row in rows},
+        "children": sorted(children, key=lambda item: item[1], reverse=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="每个入口的运行次数（取中位数）")
+    parser.add_argument("--entries", nargs="+", default=list(ENTRY_POINTS), choices=ENTRY_POINTS)
+    parser.add_argument("--top", type=int, default=6, help="列出的最重直接依赖数")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="允许的相对增长（默认30%%）")
+    parser.add_argument("--slack-ms", type=float, default=30.0, help="允许的绝对增长（毫秒），避免小数值的抖动误报")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写为基线")
+    args = parser.parse_args()
+
+    results, failures = {}, []
+    # 临时工作目录：入口模块导入时创建的 tasks/、logs/ 等不会写进仓库
+    with tempfile.TemporaryDirectory() as cwd:
+        for entry in args.entries:
+            runs = [measure(entry, cwd) for _ in range(args.runs)]
+            import_ms = statistics.median(run["import_ms"] for run in runs)
+            wall_ms = statistics.median(run["wall_ms"] for run in runs)
+            results[entry] = {"import_ms": round(import_ms, 1), "wall_ms": round(wall_ms, 1)}
+            print(f"\n🚀 {entry}: 导入 {import_ms:.1f}ms, 进程总耗时 {wall_ms:.1f}ms (中位数, {args.runs} 次)")
+            for name, cumulative in runs[-1]["children"][:args.top]:
+                print(f"   {name:<32} {cumulative / 1000:8.1f}ms")
+            if entry in LAZY_ENTRY_POINTS:
+                loaded = sorted(m for m in DEFERRED_MODULES if m in runs[-1]["modules"])
+                if loaded:
+                    failures.append(f"{entry} 启动时导入了应推迟加载的模块: {', '.join(loaded)}")
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if baseline and not args.update_baseline:
+        print()
+        for entry, current in results.items():
+            old = baseline.get("entries", {}).get(entry)
+            if old is None:
+                continue
+            limit = max(old["import_ms"] * (1 + args.tolerance), old["import_ms"] + args.slack_ms)
+            ok = current["import_ms"] <= limit
+            print(f"{'✅' if ok else '❌'} {entry:<8} 导入 {old['import_ms']:.1f}ms -> {current['import_ms']:.1f}ms "
+                  f"(上限 {limit:.1f}ms)")
+            if not ok:
+                failures.append(f"{entry} 导入耗时回归: {old['import_ms']:.1f}ms -> {current['import_ms']:.1f}ms")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                       "platform": platform.platform(), "entries": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 基线已更新: {args.baseline}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
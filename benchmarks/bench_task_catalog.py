@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务列表与全文搜索基准测试
+在临时目录中生成 N 条历史任务记录（每条带完整日志和轨迹），对比：
+  - 旧实现：每次请求 listdir + 逐个 json.load 全部任务记录 + Python 排序
+  - 任务目录：一次性回填后，按索引分页/过滤查询
+  - 搜索：逐个读取任务记录做子串匹配（相当于 grep） vs FTS5 全文索引
+
+用法: python benchmarks/bench_task_catalog.py [--tasks 3000] [--logs 200] [--repeat 5]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from core.task_catalog import TaskCatalog
+
+STATUSES = ("已完成", "已停止", "错误")
+THOUGHTS = ("页面正在加载，等待完成", "看到登录对话框，需要输入用户名", "搜索结果已出现，点击第一条", "表单已提交，任务完成")
+
+
+def generate(tasks_dir: str, count: int, logs: int) -> None:
+    """生成任务记录文件（以及会被跳过的 .trace.json）"""
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        started = start + timedelta(minutes=37 * i)
+        task_id = started.strftime("%Y%m%d_%H%M%S_%f")
+        record = {
+            "id": task_id,
+            "instruction": f"{'打开浏览器' if i % 3 else '登录后台'}完成第 {i} 个任务",
+            "start_time": started.isoformat(),
+            "end_time": (started + timedelta(seconds=60)).isoformat(),
+            "status": STATUSES[(i // 3) % len(STATUSES)],
+            "steps": 10,
+            "duration": 60.0,
+            "logs": [{"message": f"[00:00:00] 📸 Step {j % 10} - {THOUGHTS[(i + j) % len(THOUGHTS)]} " + "x" * 120,
+                      "level": "info", "timestamp": started.isoformat(), "step": j % 10} for j in range(logs)],
+            "trajectory": {"steps": [{"step": j, "thought": THOUGHTS[(i * 7 + j) % len(THOUGHTS)],
+                                      "action": f"click(point='<point>{j} {i % 1000}</point>')"} for j in range(10)]},
+            "screenshots": [{"filename": f"{task_id}/step_{j}.png", "step": j} for j in range(10)],
+            "usage": {"input_tokens": 15000, "output_tokens": 600, "total_tokens": 15600},
+        }
+        with open(os.path.join(tasks_dir, f"{task_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        if i % 10 == 0:
+            with open(os.path.join(tasks_dir, f"{task_id}.trace.json"), "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": []}, f)
+
+
+def legacy_list(tasks_dir: str) -> list[dict]:
+    """旧的 get_all_tasks 实现"""
+    tasks = []
+    for filename in os.listdir(tasks_dir):
+        if filename.endswith('.json') and not filename.endswith('.trace.json'):
+            with open(os.path.join(tasks_dir, filename), 'r', encoding='utf-8') as f:
+                task_data = json.load(f)
+            tasks.append({
+                'id': filename[:-5],
+                'instruction': task_data.get('instruction', ''),
+                'start_time': task_data.get('start_time', ''),
+                'end_time': task_data.get('end_time', ''),
+                'status': task_data.get('status', ''),
+                'steps': len(task_data.get('screenshots', [])),
+                'duration': task_data.get('duration', 0)
+            })
+    tasks.sort(key=lambda x: x.get('start_time', ''), reverse=True)
+    return tasks
+
+
+def legacy_grep(tasks_dir: str, text: str) -> int:
+    """没有索引时的搜索：逐个读取任务记录，在 Thought 和日志中查找子串"""
+    hits = 0
+    for filename in os.listdir(tasks_dir):
+        if filename.endswith('.json') and not filename.endswith('.trace.json'):
+            with open(os.path.join(tasks_dir, filename), 'r', encoding='utf-8') as f:
+                task_data = json.load(f)
+            hits += sum(text in step['thought'] for step in task_data.get('trajectory', {}).get('steps', []))
+            hits += sum(text in log['message'] for log in task_data.get('logs', []))
+    return hits
+
+
+def timed_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务列表基准测试")
+    parser.add_argument("--tasks", type=int, default=3000)
+    parser.add_argument("--logs", type=int, default=200, help="每条任务记录的日志条数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_dir = os.path.join(tmp, "tasks")
+        os.makedirs(tasks_dir)
+        generate(tasks_dir, args.tasks, args.logs)
+
+        legacy = timed_ms(lambda: legacy_list(tasks_dir), args.repeat)
+        catalog = TaskCatalog(os.path.join(tmp, "catalog.db"))
+        start = time.perf_counter()
+        added = catalog.backfill(tasks_dir)
+        backfill = (time.perf_counter() - start) * 1000
+        resync = timed_ms(lambda: catalog.backfill(tasks_dir), args.repeat)
+        first_page = timed_ms(lambda: catalog.query(page=1, page_size=50), args.repeat)
+        deep_page = timed_ms(lambda: catalog.query(page=args.tasks // 100, page_size=50), args.repeat)
+        filtered = timed_ms(lambda: catalog.query(status="failed", since="2026-02-01", until="2026-03-31",
+                                                  prefix="登录", page=1, page_size=50), args.repeat)
+        tasks, total = catalog.query(status="failed", since="2026-02-01", until="2026-03-31", prefix="登录")
+        grep = timed_ms(lambda: legacy_grep(tasks_dir, "登录对话框"), args.repeat)
+        search = timed_ms(lambda: catalog.search("登录对话框", page=1, page_size=20), args.repeat)
+        search_thought = timed_ms(lambda: catalog.search("登录对话框", kind="thought", page=1, page_size=20),
+                                  args.repeat)
+        _, hits = catalog.search("登录对话框")
+        selective = timed_ms(lambda: catalog.search(f"<point>5 {args.tasks // 2 % 1000}</point>"), args.repeat)
+        db_mb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)
+                    if name.startswith("catalog.db")) / 1024 / 1024
+
+        print(f"📁 {args.tasks} 条任务记录，每条 {args.logs} 条日志")
+        print(f"旧实现（全部读取+排序）  {legacy:9.1f} ms/次")
+        print(f"回填任务目录（一次性）   {backfill:9.1f} ms（{added} 条，含全文索引，数据库 {db_mb:.0f}MB）")
+        print(f"启动时再次同步           {resync:9.1f} ms")
+        print(f"第1页（50条）            {first_page:9.2f} ms")
+        print(f"深分页（第{args.tasks // 100}页）        {deep_page:9.2f} ms")
+        print(f"状态+日期+前缀过滤       {filtered:9.2f} ms（{total} 条匹配）")
+        print(f"搜索：逐个读取记录       {grep:9.1f} ms/次")
+        print(f"搜索：全文索引第1页      {search:9.2f} ms（{hits} 条命中）")
+        print(f"搜索：仅 Thought         {search_thought:9.2f} ms")
+        print(f"搜索：少量命中的动作     {selective:9.2f} ms")
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
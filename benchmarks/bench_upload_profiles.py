@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图上传配置基准测试
+对每个上传配置（UPLOAD_PROFILES）统计上传图尺寸、载荷字节数（原始/base64）和编码耗时。
+默认抓取当前屏幕，没有显示器时使用 utils/ 下的示例截图；也可用 --image 指定图片。
+
+用法: python benchmarks/bench_upload_profiles.py [--rounds 10] [--image path.png]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import statistics
+import time
+
+from PIL import Image
+
+from gui_operator.frame import Frame
+from utils.model import UPLOAD_PROFILES, encode_image
+
+SAMPLE_SCREENSHOT = os.path.join(base_dir, "utils", "screenshot-20260120-160656.png")
+
+
+def load_frame(image_path: str | None) -> tuple[Frame, str]:
+    """抓取屏幕帧，失败时退化为读取图片文件"""
+    if not image_path:
+        try:
+            import mss
+            with mss.mss() as sct:
+                return Frame.from_mss(sct.grab(sct.monitors[1])), "mss"
+        except Exception:
+            image_path = SAMPLE_SCREENSHOT
+    image = Image.open(image_path).convert("RGB")
+    return Frame(rgb=image.tobytes(), width=image.width, height=image.height), image_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图上传配置基准测试")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--image", help="使用指定图片代替屏幕截图")
+    args = parser.parse_args()
+
+    frame, source = load_frame(args.image)
+    print(f"🖥️  输入来源: {source}, 分辨率 {frame.width}x{frame.height}, 轮数 {args.rounds}\n")
+    print(f"{'profile':<10} {'size':>11} {'bytes':>10} {'base64':>10} {'encode(ms)':>11}")
+
+    for name, profile in UPLOAD_PROFILES.items():
+        timings = []
+        for _ in range(args.rounds):
+            # 每轮使用新帧，避免命中Frame内部的PNG缓存
+            fresh = Frame(rgb=frame.rgb, width=frame.width, height=frame.height)
+            start = time.perf_counter()
+            encoded = encode_image(fresh, profile)
+            timings.append((time.perf_counter() - start) * 1000)
+        w, h = encoded.encoded_size
+        b64_bytes = len(encoded.data_url) - encoded.data_url.index(",") - 1
+        print(f"{name:<10} {f'{w}x{h}':>11} {encoded.num_bytes:>10} {b64_bytes:>10} "
+              f"{statistics.median(timings):>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 OpenAI 兼容模拟模型服务
+实现 LVMChat 使用的接口：POST /v1/chat/completions（含流式）、POST /v1/responses、GET /v1/models。
+按脚本依次返回回答（超出后重复最后一条），可配置首字延迟、输出速度和 token 数，
+并统计收到的请求字节数，用于离线基准测试（不需要网络和真实模型）。
+
+用法: python benchmarks/mock_server.py [--port 8000] [--latency 0.3] [--script answers.json]
+"""
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = '{"Thought": "点击下一步按钮", "Action": "click(point=\'<point>500 500</point>\')"}'
+
+
+@dataclass
+class MockConfig:
+    """模拟服务的行为配置"""
+    answers: list[str] = field(default_factory=lambda: [DEFAULT_ANSWER])  # 按请求顺序返回的回答
+    latency: float = 0.0  # 首字（非流式为整个响应）之前的延迟（秒）
+    chunk_interval: float = 0.0  # 流式分片之间的间隔（秒）
+    chunk_chars: int = 8  # 每个流式分片的字符数
+    prompt_tokens: int = 1500
+    completion_tokens: int = 60
+    stall_after_first_chunk: float = 0.0  # 流式：发出第一个分片后挂起的秒数（测试取消/超时）
+    disabled: tuple[str, ...] = ()  # 返回404的接口（"chat" / "responses"），用于测试接口回退
+    errors: dict[str, tuple[int, dict]] = field(default_factory=dict)  # 接口 -> (状态码, 错误响应体)
+
+
+@dataclass
+class MockStats:
+    """服务端统计"""
+    requests: int = 0
+    chat: int = 0
+    responses: int = 0
+    streamed: int = 0
+    rejected: int = 0  # 按 errors 配置返回错误的请求数
+    request_bytes: list[int] = field(default_factory=list)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'MockModelServer'
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.loads(raw or b"{}")
+        api = "chat" if self.path.endswith("/chat/completions") else \
+              "responses" if self.path.endswith("/responses") else None
+        config = self.server.config
+        if api is None or api in config.disabled:
+            self._send_json(404, {"error": {"message": f"{self.path} not supported"}})
+            return
+        if api in config.errors:
+            with self.server._lock:
+                self.server.stats.rejected += 1
+            status, error = config.errors[api]
+            self._send_json(status, error)
+            return
+        answer = self.server.next_answer(api, len(raw), bool(body.get("stream")))
+        try:
+            if api == "chat" and body.get("stream"):
+                self._stream_chat(answer, body)
+                return
+            time.sleep(config.latency)
+            self._send_json(200, self._chat(answer) if api == "chat" else self._responses(answer))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _usage(self) -> dict:
+        config = self.server.config
+        return {"prompt_tokens": config.prompt_tokens, "completion_tokens": config.completion_tokens,
+                "total_tokens": config.prompt_tokens + config.completion_tokens}
+
+    def _chat(self, answer: str) -> dict:
+        return {"id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": "mock",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": answer}}],
+                "usage": self._usage()}
+
+    def _responses(self, answer: str) -> dict:
+        config = self.server.config
+        return {"id": "resp-mock", "object": "response", "created_at": int(time.time()), "model": "mock",
+                "status": "completed",
+                "output": [{"type": "message", "id": "msg-mock", "role": "assistant", "status": "completed",
+                            "content": [{"type": "output_text", "text": answer, "annotations": []}]}],
+                "usage": {"input_tokens": config.prompt_tokens, "output_tokens": config.completion_tokens,
+                          "total_tokens": config.prompt_tokens + config.completion_tokens}}
+
+    def _stream_chat(self, answer: str, body: dict) -> None:
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(config.latency)
+
+        def send(data: dict) -> None:
+            self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        step = max(config.chunk_chars, 1)
+        for index in range(0, len(answer), step):
+            send({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+                  "choices": [{"index": 0, "delta": {"content": answer[index:index + step]}, "finish_reason": None}]})
+            if index == 0 and config.stall_after_first_chunk:
+                time.sleep(config.stall_after_first_chunk)
+            if config.chunk_interval:
+                time.sleep(config.chunk_interval)
+        send({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+              "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+                  "choices": [], "usage": self._usage()})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class MockModelServer(ThreadingHTTPServer):
+    """
+    模拟模型服务（后台线程运行）
+
+        with MockModelServer(MockConfig(answers=[...])) as server:
+            LVMChat(api_key="mock", base_url=server.base_url, ...)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_answer(self, api: str, num_bytes: int, streamed: bool) -> str:
+        """按请求顺序取下一条回答并记录统计"""
+        with self._lock:
+            index = self.stats.requests
+            self.stats.requests += 1
+            setattr(self.stats, api, getattr(self.stats, api) + 1)
+            self.stats.streamed += streamed
+            self.stats.request_bytes.append(num_bytes)
+        answers = self.config.answers
+        return answers[min(index, len(answers) - 1)]
+
+    def reset(self, answers: list[str] | None = None) -> None:
+        """重置统计（和回答脚本），开始新的一轮"""
+        with self._lock:
+            self.stats = MockStats()
+            if answers is not None:
+                self.config.answers = answers
+
+    def start(self) -> 'MockModelServer':
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-model-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'MockModelServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="响应前延迟（秒）")
+    parser.add_argument("--chunk-interval", type=float, default=0.0, help="流式分片间隔（秒）")
+    parser.add_argument("--prompt-tokens", type=int, default=1500)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--script", help="回答脚本：JSON 字符串数组，按请求顺序返回")
+    parser.add_argument("--disable", nargs="*", default=[], choices=["chat", "responses"], help="返回404的接口")
+    args = parser.parse_args()
+
+    answers = json.load(open(args.script, encoding="utf-8")) if args.script else [DEFAULT_ANSWER]
+    config = MockConfig(answers=answers, latency=args.latency, chunk_interval=args.chunk_interval,
+                        prompt_tokens=args.prompt_tokens, completion_tokens=args.completion_tokens,
+                        disabled=tuple(args.disable))
+    server = MockModelServer(config, args.host, args.port)
+    print(f"🧪 模拟模型服务: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ a = Analysis(
         ('ui', 'ui'),
     ],
     hiddenimports=[
+        # main 及其依赖在第一个任务开始时才导入（core.warmup），需显式打包
+        'main',
         'tkinter',
         'tkinter.ttk',
         'tkinter.scrolledtext',
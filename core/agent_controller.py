@@ -1,38 +1,10 @@
 # core/agent_controller.py
 
-import sys
 import threading
-from typing import Callable
-from io import StringIO
-from main import GUIAgent
-
-
-class OutputRedirector:
-    """输出重定向器 - 捕获print输出并传递给GUI"""
-    
-    def __init__(self, callback: Callable[[str], None]):
-        """
-        初始化输出重定向器
-        
-        Args:
-            callback: 接收输出文本的回调函数
-        """
-        self.callback = callback
-        self.buffer = StringIO()
-    
-    def write(self, text: str) -> None:
-        """
-        写入文本
-        
-        Args:
-            text: 要写入的文本
-        """
-        if text and text.strip():
-            self.callback(text)
-    
-    def flush(self) -> None:
-        """刷新缓冲区"""
-        pass
+from datetime import datetime
+from core.events import EventBus, AgentEvent, LOG, FINISHED, FAILED
+from core.warmup import load_agent_class
+from utils.cancel import CancelToken, Cancelled
 
 
 class AgentController:
@@ -43,9 +15,7 @@ class AgentController:
         api_key: str,
         base_url: str,
         model_name: str,
-        log_callback: Callable[[str, str], None],
-        screenshot_callback: Callable[[str, int], None],
-        status_callback: Callable[[str, str], None]
+        events: EventBus
     ):
         """
         初始化Agent控制器
@@ -54,19 +24,17 @@ class AgentController:
             api_key: API密钥
             base_url: API基础URL
             model_name: 模型名称
-            log_callback: 日志回调函数 (message, level)
-            screenshot_callback: 截图回调函数 (image_path, step)
-            status_callback: 状态回调函数 (status, color)
+            events: 事件总线，Agent 的日志、截图和结束状态都发布到这里，由界面按自己的节奏消费
         """
         self.api_key = api_key
         self.base_url = base_url
         self.model_name = model_name
-        self.log_callback = log_callback
-        self.screenshot_callback = screenshot_callback
-        self.status_callback = status_callback
+        self.events = events
         
         self.agent_thread: threading.Thread | None = None
-        self.stop_event = threading.Event()
+        # 每个任务一个取消令牌，GUIAgent 在节点、模型请求和等待中响应取消
+        self.cancel_token = CancelToken()
+        self.run_id = ""
         self._running = False
     
     def is_running(self) -> bool:
@@ -78,6 +46,9 @@ class AgentController:
         """
         return self._running
     
+    def _log(self, message: str, level: str = "info") -> None:
+        self.events.publish(AgentEvent(LOG, self.run_id, data={"message": message, "level": level}))
+    
     def start_task(self, instruction: str) -> None:
         """
         启动任务
@@ -86,11 +57,13 @@ class AgentController:
             instruction: 任务指令
         """
         if self._running:
-            self.log_callback("任务已在运行中", "warning")
+            self._log("任务已在运行中", "warning")
             return
         
-        # 重置停止事件
-        self.stop_event.clear()
+        # 新任务使用新的取消令牌和运行ID
+        self.cancel_token = CancelToken()
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._log(f"开始执行任务: {instruction}")
         
         # 在新线程中运行Agent
         self.agent_thread = threading.Thread(
@@ -102,20 +75,18 @@ class AgentController:
         self.agent_thread.start()
     
     def stop_task(self) -> None:
-        """停止当前任务"""
+        """停止当前任务（结束状态由 Agent 发布的 FINISHED 事件通知界面）"""
         if not self._running:
             return
         
-        self.log_callback("正在停止任务...", "warning")
-        self.stop_event.set()
+        self._log("正在停止任务...", "warning")
+        self.cancel_token.cancel("用户停止")
         
-        # 等待线程结束（最多5秒）
+        # 等待线程结束（正常几百毫秒内，最多5秒）
         if self.agent_thread:
             self.agent_thread.join(timeout=5.0)
         
         self._running = False
-        self.status_callback("已停止", "orange")
-        self.log_callback("任务已停止", "info")
     
     def _run_agent_thread(self, instruction: str) -> None:
         """
@@ -124,44 +95,28 @@ class AgentController:
         Args:
             instruction: 任务指令
         """
-        # 保存原始stdout
-        original_stdout = sys.stdout
-        original_stderr = sys.stderr
-        
         try:
-            # 重定向输出
-            sys.stdout = OutputRedirector(lambda msg: self.log_callback(msg, "info"))
-            sys.stderr = OutputRedirector(lambda msg: self.log_callback(msg, "error"))
-            
-            # 更新状态
-            self.status_callback("执行中", "blue")
-            self.log_callback(f"开始执行任务: {instruction}", "info")
-            
-            # 创建并运行Agent
-            # 注意：需要修改GUIAgent类以支持配置和停止事件
+            # 首次启动任务时才导入 main（langgraph、openai 等），界面启动不受影响
+            GUIAgent = load_agent_class()
             agent = GUIAgent(
                 instruction=instruction,
-                model_name=self.model_name
+                model_name=self.model_name,
+                api_key=self.api_key,
+                base_url=self.base_url,
+                cancel_token=self.cancel_token,
+                run_id=self.run_id,
+                events=self.events
             )
-            
-            # 修改Agent的配置
-            agent.lvm_chat.client.api_key = self.api_key
-            agent.lvm_chat.client.base_url = self.base_url
-            
-            # 运行Agent（这里需要修改GUIAgent以支持停止事件）
-            final_state = agent.run()
-            
-            # 任务完成
-            if not self.stop_event.is_set():
-                self.status_callback("已完成", "green")
-                self.log_callback(f"任务完成！共执行 {final_state['step']} 步", "success")
-        
         except Exception as e:
-            self.log_callback(f"执行错误: {str(e)}", "error")
-            self.status_callback("错误", "red")
+            self.events.publish(AgentEvent(FINISHED, self.run_id,
+                                           data={"status": FAILED, "steps": 0, "error": str(e)}))
+            self._running = False
+            return
         
+        try:
+            agent.run()
+        except (Cancelled, Exception):
+            # run() 已发布 FINISHED 事件（cancelled / failed）
+            pass
         finally:
-            # 恢复原始stdout
-            sys.stdout = original_stdout
-            sys.stderr = original_stderr
             self._running = False
@@ -13,6 +13,9 @@ class AppConfig:
     base_url: str
     model_name: str = "your-model-name"
     history: List[str] = field(default_factory=list)
+    executors: int = 1  # Web服务同时执行的任务数
+    displays: List[str] = field(default_factory=list)  # 每个执行器绑定的显示器（如 ":99"），空则自动分配
+    warmup: bool = True  # 界面/服务启动后在后台预加载 Agent 依赖
     
     def to_dict(self) -> dict:
         """转换为字典"""
@@ -39,6 +42,9 @@ class AppConfig:
         if not self.base_url.startswith("http://") and not self.base_url.startswith("https://"):
             return False, "Base URL必须以http://或https://开头"
         
+        if self.executors < 1:
+            return False, "执行器数量至少为1"
+        
         return True, ""
 
 
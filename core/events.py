@@ -0,0 +1,209 @@
+# core/events.py
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+# 事件类型
+STEP_STARTED = "step_started"  # {"step"}
+SCREENSHOT = "screenshot"  # {"path", "width", "height", "frame"}（frame 为内存帧，不写入日志文件）
+MODEL_RESPONSE = "model_response"  # {"thought", "action", "response", "source", "duration"}
+ACTION = "action"  # {"action", "ok", "error", "settle_time"}
+USAGE = "usage"  # {"input_tokens", "output_tokens", "total_tokens", "request_bytes", ...}
+FINISHED = "finished"  # {"status", "steps", "error"}
+LOG = "log"  # {"message", "level"}
+EVENT_KINDS = (STEP_STARTED, SCREENSHOT, MODEL_RESPONSE, ACTION, USAGE, FINISHED, LOG)
+
+# FINISHED 事件的状态
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+@dataclass
+class AgentEvent:
+    """Agent 运行中发布的一条事件"""
+    kind: str
+    run_id: str = ""
+    step: int = 0
+    data: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "run_id": self.run_id, "step": self.step,
+                "timestamp": self.timestamp, "data": self.data}
+
+
+class Subscription:
+    """
+    一个订阅者的有界事件队列
+
+    队列满时丢弃最旧的事件（计入 dropped），发布方从不等待消费方；
+    消费方按自己的节奏 get()/drain()，或直接迭代直到 close()
+    """
+
+    def __init__(self, bus: 'EventBus', kinds: Iterable[str] | None, run_id: str | None, maxsize: int):
+        self.bus = bus
+        self.kinds = frozenset(kinds) if kinds else None
+        self.run_id = run_id
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque[AgentEvent] = deque()
+        self._cond = threading.Condition()
+
+    def matches(self, event: AgentEvent) -> bool:
+        return ((self.kinds is None or event.kind in self.kinds)
+                and (self.run_id is None or event.run_id == self.run_id))
+
+    def offer(self, event: AgentEvent) -> None:
+        """放入一条事件（不阻塞）"""
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None) -> AgentEvent | None:
+        """取一条事件；超时或已关闭且队列为空时返回 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            return self._queue.popleft() if self._queue else None
+
+    def drain(self, limit: int | None = None) -> list[AgentEvent]:
+        """取出当前已有的事件（不等待），最多 limit 条"""
+        with self._cond:
+            count = len(self._queue) if limit is None else min(limit, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def close(self) -> None:
+        """取消订阅；已在队列中的事件仍可取出"""
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[AgentEvent]:
+        """阻塞迭代，直到关闭且队列取空"""
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+
+class EventBus:
+    """
+    进程内事件总线
+
+    GUIAgent 发布结构化事件（步骤开始、截图、模型响应、动作、用量、结束、日志），
+    Tk 界面、Web 服务和文件日志各自订阅、各自消费；
+    发布只是把事件放入各订阅者的有界队列，不会在 Agent 线程上执行任何界面或网络调用
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        """
+        初始化事件总线
+
+        Args:
+            maxsize: 订阅者队列的默认容量
+        """
+        self.maxsize = maxsize
+        self.published = 0
+        self._subscribers: tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, kinds: Iterable[str] | None = None, run_id: str | None = None,
+                  maxsize: int | None = None) -> Subscription:
+        """
+        订阅事件
+
+        Args:
+            kinds: 只接收这些类型，默认全部
+            run_id: 只接收这次运行的事件，默认全部
+            maxsize: 队列容量，默认使用总线的设置
+        """
+        subscription = Subscription(self, kinds, run_id, maxsize or self.maxsize)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, event: AgentEvent) -> None:
+        """发布事件（订阅者列表是不可变元组，发布时不加锁）"""
+        self.published += 1
+        for subscription in self._subscribers:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def emit(self, kind: str, run_id: str = "", step: int = 0, **data) -> AgentEvent:
+        """构造并发布事件"""
+        event = AgentEvent(kind, run_id, step, data)
+        self.publish(event)
+        return event
+
+    def stats(self) -> dict:
+        subscribers = self._subscribers
+        return {
+            "published": self.published,
+            "subscribers": len(subscribers),
+            "pending": sum(len(s._queue) for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
+
+
+def _json_default(value):
+    # 内存帧等不可序列化的对象只记录类型名
+    return f"<{type(value).__name__}>"
+
+
+class EventFileLogger:
+    """文件日志订阅者：后台线程把事件逐行写入 JSONL"""
+
+    def __init__(self, bus: EventBus, path: str = "logs/events.jsonl",
+                 kinds: Iterable[str] | None = None, maxsize: int = 10000):
+        """
+        初始化文件日志
+
+        Args:
+            bus: 事件总线
+            path: JSONL 文件路径（追加写入）
+            kinds: 只记录这些类型，默认全部
+            maxsize: 队列容量
+        """
+        self.path = path
+        self.subscription = bus.subscribe(kinds, maxsize=maxsize)
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> 'EventFileLogger':
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="event-file-logger", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止订阅，写完队列中剩余的事件"""
+        self.subscription.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in self.subscription:
+                # 一次写完当前积压的事件再 flush
+                for item in [event] + self.subscription.drain():
+                    f.write(json.dumps(item.to_dict(), ensure_ascii=False, default=_json_default) + "\n")
+                f.flush()
@@ -0,0 +1,380 @@
+# core/task_catalog.py
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+# 任务记录中的状态文本；查询时也接受任务队列的英文状态
+STATUS_ALIASES = {"completed": "已完成", "cancelled": "已停止", "failed": "错误"}
+MAX_PAGE_SIZE = 500
+# 全文索引中的文档类型：任务指令、每一步的 Thought / Action、日志
+SEARCH_KINDS = ("instruction", "thought", "action", "log")
+
+
+@dataclass
+class TaskSummary:
+    """任务目录中的一条任务元数据（不含日志和截图）"""
+    id: str
+    instruction: str
+    status: str
+    start_time: str
+    end_time: str
+    steps: int = 0
+    duration: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    error: str | None = None
+
+    @classmethod
+    def from_record(cls, record: dict) -> 'TaskSummary':
+        """从 tasks/<id>.json 任务记录提取元数据"""
+        usage = record.get("usage") or {}
+        return cls(
+            id=record["id"],
+            instruction=record.get("instruction", ""),
+            status=record.get("status", ""),
+            start_time=record.get("start_time", ""),
+            end_time=record.get("end_time", ""),
+            steps=record.get("steps", len(record.get("screenshots", []))),
+            duration=record.get("duration", 0) or 0,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
+            error=record.get("error"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "instruction": self.instruction,
+            "status": self.status,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "steps": self.steps,
+            "duration": self.duration,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "error": self.error,
+        }
+
+
+@dataclass
+class SearchHit:
+    """一条全文搜索结果，screenshot 为该步骤截图相对 steps/ 的文件名"""
+    task_id: str
+    kind: str
+    step: int | None
+    snippet: str
+    screenshot: str | None = None
+    instruction: str | None = None
+    status: str | None = None
+    start_time: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "task_id": self.task_id,
+            "kind": self.kind,
+            "step": self.step,
+            "snippet": self.snippet,
+            "screenshot": self.screenshot,
+            "instruction": self.instruction,
+            "status": self.status,
+            "start_time": self.start_time,
+        }
+
+
+def record_documents(record: dict) -> list[tuple[str, int | None, str, str | None]]:
+    """
+    从 tasks/<id>.json 任务记录提取全文索引文档 [(类型, 步骤, 内容, 截图文件名)]
+
+    轨迹中的 Thought/Action 按步骤关联截图；旧记录中的日志没有步骤号时，
+    按时间戳归到之前最近一次截图的步骤
+    """
+    screenshots = sorted((s.get("timestamp", ""), s.get("step"), s.get("filename"))
+                         for s in record.get("screenshots", []))
+    shot_times = [timestamp for timestamp, _, _ in screenshots]
+    by_step = {step: filename for _, step, filename in screenshots}
+
+    documents = [("instruction", None, record.get("instruction", ""), None)]
+    for step in (record.get("trajectory") or {}).get("steps", []):
+        screenshot = by_step.get(step.get("step"))
+        documents.append(("thought", step.get("step"), step.get("thought", ""), screenshot))
+        documents.append(("action", step.get("step"), step.get("action", ""), screenshot))
+    for log in record.get("logs", []):
+        if "step" in log:
+            step = log["step"]
+        else:
+            index = bisect.bisect_right(shot_times, log.get("timestamp", "")) - 1
+            step = screenshots[index][1] if index >= 0 else None
+        documents.append(("log", step, log.get("message", ""), by_step.get(step)))
+    return documents
+
+
+def _phrase(text: str) -> str:
+    """FTS5 短语（按字面匹配，不解析查询语法）"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _snippet(content: str, terms: list[str], width: int = 160) -> str:
+    """截取内容中第一个命中词附近的片段"""
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    hit = min((p for p in positions if p >= 0), default=0)
+    start = max(hit - width // 3, 0)
+    text = " ".join(content[start:start + width].split())
+    return ("…" if start else "") + text + ("…" if start + width < len(content) else "")
+
+
+class TaskCatalog:
+    """
+    历史任务目录（SQLite）
+
+    只保存任务元数据，任务列表分页、过滤都走索引，不再逐个读取 tasks/*.json；
+    任务结束时写入，首次启动时从已有的任务记录回填
+
+    另有 FTS5 全文索引（task_search）覆盖任务指令、每一步的 Thought/Action 和日志，
+    任务运行中按步骤增量写入；trigram 分词让没有空格的中文也能按子串检索
+    """
+
+    _COLUMNS = ("id, instruction, status, start_time, end_time, steps, duration, "
+                "input_tokens, output_tokens, total_tokens, error")
+
+    def __init__(self, path: str = "tasks/catalog.db"):
+        """
+        初始化任务目录
+
+        Args:
+            path: SQLite数据库路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS task_records (
+                id TEXT PRIMARY KEY,
+                instruction TEXT NOT NULL,
+                status TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                steps INTEGER NOT NULL DEFAULT 0,
+                duration REAL NOT NULL DEFAULT 0,
+                input_tokens INTEGER NOT NULL DEFAULT 0,
+                output_tokens INTEGER NOT NULL DEFAULT 0,
+                total_tokens INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_start ON task_records(start_time);
+            CREATE INDEX IF NOT EXISTS idx_records_status ON task_records(status, start_time);
+            CREATE INDEX IF NOT EXISTS idx_records_instruction ON task_records(instruction);
+            CREATE TABLE IF NOT EXISTS search_tasks (task_id TEXT PRIMARY KEY);
+        """)
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5("
+                               "content, kind, task_id UNINDEXED, step UNINDEXED, screenshot UNINDEXED, "
+                               "tokenize='trigram')")
+        except sqlite3.OperationalError:
+            # SQLite 3.34 之前没有 trigram 分词器，退回默认分词（中文只能整段匹配）
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5("
+                               "content, kind, task_id UNINDEXED, step UNINDEXED, screenshot UNINDEXED)")
+        sql = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'task_search'").fetchone()[0]
+        self._trigram = "trigram" in sql
+
+    def upsert(self, record: dict) -> TaskSummary:
+        """写入（或覆盖）一条任务记录的元数据"""
+        summary = TaskSummary.from_record(record)
+        with self._lock, self._conn:
+            self._write(summary)
+        return summary
+
+    def _write(self, summary: TaskSummary) -> None:
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO task_records ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (summary.id, summary.instruction, summary.status, summary.start_time, summary.end_time,
+             summary.steps, summary.duration, summary.input_tokens, summary.output_tokens,
+             summary.total_tokens, summary.error))
+
+    def index(self, task_id: str, documents: list[tuple[str, int | None, str, str | None]]) -> None:
+        """
+        把一个任务的文档写入全文索引（任务运行中按步骤批量调用）
+
+        Args:
+            task_id: 任务ID
+            documents: [(类型, 步骤, 内容, 截图文件名)]，类型见 SEARCH_KINDS
+        """
+        with self._lock, self._conn:
+            self._index(task_id, documents)
+
+    def _index(self, task_id: str, documents: list[tuple[str, int | None, str, str | None]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO task_search (content, kind, task_id, step, screenshot) VALUES (?, ?, ?, ?, ?)",
+            [(content, kind, task_id, step, screenshot)
+             for kind, step, content, screenshot in documents if content and content.strip()])
+        self._conn.execute("INSERT OR IGNORE INTO search_tasks (task_id) VALUES (?)", (task_id,))
+
+    def backfill(self, tasks_dir: str = "tasks", batch: int = 500) -> int:
+        """
+        把目录中尚未收录的任务记录（<id>.json，跳过 .trace.json）加入目录和全文索引，返回新增条数
+
+        只读取缺失的文件；已收录（且已建全文索引）的任务不会重复解析
+        """
+        if not os.path.isdir(tasks_dir):
+            return 0
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT id FROM task_records")}
+            indexed = {row[0] for row in self._conn.execute("SELECT task_id FROM search_tasks")}
+        missing = [name for name in os.listdir(tasks_dir)
+                   if name.endswith(".json") and not name.endswith(".trace.json")
+                   and (name[:-5] not in known or name[:-5] not in indexed)]
+        added = 0
+        pending: list[TaskSummary] = []
+        pending_documents: list[tuple[str, list]] = []
+        for name in missing:
+            try:
+                with open(os.path.join(tasks_dir, name), "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                record = {**record, "id": record.get("id", name[:-5])}
+                if record["id"] not in known:
+                    pending.append(TaskSummary.from_record(record))
+                if record["id"] not in indexed:
+                    pending_documents.append((record["id"], record_documents(record)))
+            except Exception as e:
+                print(f"⚠️ 回填任务记录失败 {name}: {e}")
+                continue
+            if len(pending) + len(pending_documents) >= batch:
+                added += self._write_many(pending, pending_documents)
+                pending, pending_documents = [], []
+        return added + self._write_many(pending, pending_documents)
+
+    def _write_many(self, summaries: list[TaskSummary], documents: list[tuple[str, list]] = ()) -> int:
+        with self._lock, self._conn:
+            for summary in summaries:
+                self._write(summary)
+            for task_id, task_documents in documents:
+                self._index(task_id, task_documents)
+        return len(summaries)
+
+    def query(self, status: str | None = None, since: str | None = None, until: str | None = None,
+              prefix: str | None = None, page: int = 1, page_size: int = 50) -> tuple[list[TaskSummary], int]:
+        """
+        分页查询任务，按开始时间倒序
+
+        Args:
+            status: 状态（已完成/已停止/错误，或 completed/cancelled/failed）
+            since: 开始时间下限（ISO 格式，包含）
+            until: 开始时间上限（ISO 格式，按前缀包含：2026-10-17 包含当天）
+            prefix: 指令前缀
+            page: 页码（从1开始）
+            page_size: 每页条数（最多 MAX_PAGE_SIZE）
+
+        Returns:
+            (本页任务, 符合条件的总数)
+        """
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(STATUS_ALIASES.get(status, status))
+        if since:
+            conditions.append("start_time >= ?")
+            params.append(since)
+        if until:
+            conditions.append("start_time < ?")
+            params.append(until + "\U0010ffff")
+        if prefix:
+            # 范围比较可以走指令索引（LIKE 'x%' 在默认排序规则下不能）
+            conditions.append("instruction >= ? AND instruction < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM task_records{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM task_records{where} ORDER BY start_time DESC LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]).fetchall()
+        return [TaskSummary(*row) for row in rows], total
+
+    def search(self, query: str, kind: str | None = None, task_id: str | None = None,
+               page: int = 1, page_size: int = 20) -> tuple[list[SearchHit], int]:
+        """
+        全文搜索，按 bm25 相关度排序
+
+        多个词（空格分隔）须同时出现；trigram 分词下少于3个字的词无法走索引，改用 LIKE 匹配
+
+        Args:
+            query: 搜索词
+            kind: 只搜索某类文档（instruction/thought/action/log）
+            task_id: 只搜索某个任务
+            page: 页码（从1开始）
+            page_size: 每页条数（最多 MAX_PAGE_SIZE）
+
+        Returns:
+            (本页结果, 命中总数)
+        """
+        terms = query.split()
+        if not terms:
+            return [], 0
+        indexed = [t for t in terms if not self._trigram or len(t) >= 3]
+        # 类型也是索引列，用列过滤代替逐行比较
+        match = [f"content: {_phrase(t)}" for t in indexed]
+        if kind:
+            match.append(f"kind: {_phrase(kind)}")
+        conditions, params = [], []
+        if match:
+            conditions.append("s.task_search MATCH ?")
+            params.append(" AND ".join(match))
+        for term in terms:
+            if term not in indexed:
+                conditions.append("s.content LIKE ? ESCAPE '\\'")
+                escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+        if task_id:
+            conditions.append("s.task_id = ?")
+            params.append(task_id)
+        where = " AND ".join(conditions)
+        # 没有可走索引的词时按写入顺序倒序（最新的在前）
+        score = "bm25(task_search, 1.0, 0.0)" if indexed else "-s.rowid"
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM task_search AS s WHERE {where}", params).fetchone()[0]
+            # 先只对 rowid 排序取出本页，再读取内容并关联任务元数据（常见词命中很多时避免逐行 JOIN）
+            rows = self._conn.execute(
+                f"SELECT s.task_id, s.kind, s.step, s.content, s.screenshot, r.instruction, r.status, r.start_time "
+                f"FROM (SELECT s.rowid AS id, {score} AS score FROM task_search AS s WHERE {where} "
+                f"ORDER BY score LIMIT ? OFFSET ?) AS top "
+                f"JOIN task_search AS s ON s.rowid = top.id LEFT JOIN task_records AS r ON r.id = s.task_id "
+                f"ORDER BY top.score",
+                params + [page_size, (page - 1) * page_size]).fetchall()
+        return [SearchHit(task_id, kind, step, _snippet(content, terms), screenshot, instruction, status, start_time)
+                for task_id, kind, step, content, screenshot, instruction, status, start_time in rows], total
+
+    def get(self, task_id: str) -> TaskSummary | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {self._COLUMNS} FROM task_records WHERE id = ?",
+                                     (task_id,)).fetchone()
+        return TaskSummary(*row) if row else None
+
+    def delete(self, task_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM task_records WHERE id = ?", (task_id,))
+            self._conn.execute("DELETE FROM task_search WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM search_tasks WHERE task_id = ?", (task_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM task_records").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,214 @@
+# core/task_queue.py
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+@dataclass
+class QueuedTask:
+    """队列中的一条任务记录"""
+    id: str
+    instruction: str
+    priority: int
+    status: str
+    created: float
+    started: float | None = None
+    finished: float | None = None
+    executor: str | None = None
+    replay_task_id: str | None = None
+    cancel_requested: bool = False
+    steps: int = 0
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "instruction": self.instruction,
+            "priority": self.priority,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "executor": self.executor,
+            "replay_task_id": self.replay_task_id,
+            "cancel_requested": self.cancel_requested,
+            "steps": self.steps,
+            "error": self.error,
+        }
+
+
+class TaskQueue:
+    """
+    持久化任务队列（SQLite）
+
+    按优先级（高者先）和入队时间调度；服务重启后未完成的任务重新排队，不会丢失
+    """
+
+    _COLUMNS = ("id, instruction, priority, status, created, started, finished, executor, "
+                "replay_task_id, cancel_requested, steps, error")
+
+    def __init__(self, path: str = "tasks/queue.db"):
+        """
+        初始化任务队列
+
+        Args:
+            path: SQLite数据库路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                instruction TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL,
+                executor TEXT,
+                replay_task_id TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                steps INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_schedule ON tasks(status, priority DESC, created);
+        """)
+        self.recover()
+
+    def _row(self, row) -> QueuedTask | None:
+        if row is None:
+            return None
+        task = QueuedTask(*row)
+        task.cancel_requested = bool(task.cancel_requested)
+        return task
+
+    def recover(self) -> int:
+        """把上次异常退出时仍在运行的任务重新排队，返回恢复的任务数"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, started = NULL, executor = NULL WHERE status = ? AND cancel_requested = 0",
+                (QUEUED, RUNNING))
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, finished = ? WHERE status = ? AND cancel_requested = 1",
+                (CANCELLED, time.time(), RUNNING))
+            return cursor.rowcount
+
+    def enqueue(self, instruction: str, priority: int = 0, replay_task_id: str | None = None) -> str:
+        """
+        添加任务
+
+        Args:
+            instruction: 任务指令
+            priority: 优先级，数值越大越先执行
+            replay_task_id: 回放的历史任务ID
+
+        Returns:
+            任务ID
+        """
+        # 时间戳便于阅读和按目录排序，随机后缀保证同一时刻提交的任务也不会主键冲突
+        task_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
+        with self._available, self._conn:
+            self._conn.execute(
+                "INSERT INTO tasks (id, instruction, priority, status, created, replay_task_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, instruction, priority, QUEUED, time.time(), replay_task_id))
+            self._available.notify()
+        return task_id
+
+    def claim(self, executor: str, timeout: float | None = None) -> QueuedTask | None:
+        """
+        领取优先级最高的排队任务并标记为运行中（阻塞等待，直到有任务或超时）
+
+        Args:
+            executor: 执行器名称
+            timeout: 最长等待秒数，None 表示一直等待
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                row = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM tasks WHERE status = ? ORDER BY priority DESC, created LIMIT 1",
+                    (QUEUED,)).fetchone()
+                if row is not None:
+                    task = self._row(row)
+                    with self._conn:
+                        self._conn.execute("UPDATE tasks SET status = ?, started = ?, executor = ? WHERE id = ?",
+                                           (RUNNING, time.time(), executor, task.id))
+                    task.status, task.executor = RUNNING, executor
+                    return task
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._available.wait(remaining)
+
+    def finish(self, task_id: str, status: str, steps: int = 0, error: str | None = None) -> None:
+        """记录任务结束"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE tasks SET status = ?, finished = ?, steps = ?, error = ? WHERE id = ?",
+                               (status, time.time(), steps, error, task_id))
+
+    def cancel(self, task_id: str) -> QueuedTask | None:
+        """
+        取消任务：排队中的直接取消，运行中的标记为待取消（由执行器停止）
+
+        Returns:
+            更新后的任务；任务不存在时返回None
+        """
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE tasks SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                               (CANCELLED, time.time(), task_id, QUEUED))
+            self._conn.execute("UPDATE tasks SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                               (task_id, RUNNING))
+            row = self._conn.execute(f"SELECT {self._COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row(row)
+
+    def get(self, task_id: str) -> QueuedTask | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {self._COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row(row)
+
+    def list(self, statuses: tuple[str, ...] | None = None, limit: int = 100) -> list[QueuedTask]:
+        """按调度顺序列出任务（可按状态过滤）"""
+        query = f"SELECT {self._COLUMNS} FROM tasks"
+        params: tuple = ()
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        query += " ORDER BY status = 'running' DESC, priority DESC, created LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def position(self, task_id: str) -> int | None:
+        """排队任务前面还有几个任务；不在排队中时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT priority, created FROM tasks WHERE id = ? AND status = ?",
+                                     (task_id, QUEUED)).fetchone()
+            if row is None:
+                return None
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status = ? AND (priority > ? OR (priority = ? AND created < ?))",
+                (QUEUED, row[0], row[0], row[1])).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,41 @@
+# core/warmup.py
+
+import importlib
+import threading
+import time
+
+# 运行任务才需要的重依赖：main 会带入 langgraph、openai、pyautogui、mss 等
+HEAVY_MODULES = ("langgraph.graph", "main")
+
+
+def load_agent_class():
+    """导入并返回 GUIAgent（首次调用时才加载重依赖；后台预热已完成时几乎没有开销）"""
+    from main import GUIAgent
+    return GUIAgent
+
+
+def warm_up(modules: tuple[str, ...] = HEAVY_MODULES, delay: float = 0.0) -> threading.Thread:
+    """
+    在后台线程中预先导入重依赖，让第一次启动任务时不必再等待导入
+
+    界面或服务启动完成后调用；导入期间启动任务也是安全的（同一模块的导入会等待预热线程完成）
+
+    Args:
+        modules: 要导入的模块
+        delay: 开始导入前的等待秒数（让界面先完成首次绘制）
+    """
+    def run():
+        if delay > 0:
+            time.sleep(delay)
+        start = time.perf_counter()
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"⚠️ 预加载 {name} 失败: {e}")
+                return
+        print(f"🔥 Agent 依赖已在后台预加载 ({time.perf_counter() - start:.2f}秒)")
+
+    thread = threading.Thread(target=run, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
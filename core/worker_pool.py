@@ -0,0 +1,298 @@
+# core/worker_pool.py
+
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+
+@dataclass
+class BatchTask:
+    """批量运行中的一个任务"""
+    task_id: str
+    instruction: str
+    deadline: float | None = None  # 任务截止时间（秒），None 使用进程池默认值
+
+
+@dataclass
+class TaskResult:
+    """单个任务的运行结果"""
+    task_id: str
+    instruction: str
+    status: str  # "success" / "failed" / "timeout" / "error"
+    steps: int = 0
+    duration: float = 0.0
+    model_calls: int = 0
+    actions: int = 0
+    step_latency: float = 0.0  # 平均每步耗时（秒）
+    settle_time: float = 0.0  # 画面稳定等待合计（秒）
+    display: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class WorkerConfig:
+    """传给工作进程的配置（需可序列化）"""
+    model_name: str
+    api_key: str
+    base_url: str
+    agent_options: dict = field(default_factory=dict)  # 透传给 GUIAgent 的其他参数
+    fake_script: str | None = None  # 使用假屏幕脚本代替真实/虚拟显示器
+    output_dir: str = "batch_runs"
+
+
+def load_tasks(path: str) -> list[BatchTask]:
+    """
+    读取任务文件
+
+    支持 .jsonl（每行 {"instruction": ..., "task_id"?: ..., "deadline"?: ...}）
+    和纯文本（每行一条指令，# 开头为注释）；path 为 "-" 时从标准输入读取
+    """
+    lines = sys.stdin.read().splitlines() if path == "-" else Path(path).read_text(encoding="utf-8").splitlines()
+    tasks = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        task_id = f"task_{len(tasks) + 1:04d}"
+        if line.startswith("{"):
+            data = json.loads(line)
+            tasks.append(BatchTask(task_id=str(data.get("task_id", task_id)),
+                                   instruction=data["instruction"],
+                                   deadline=data.get("deadline")))
+        else:
+            tasks.append(BatchTask(task_id=task_id, instruction=line))
+    return tasks
+
+
+def _run_task(task: BatchTask, config: WorkerConfig, display: str | None, results) -> None:
+    """工作进程入口：在指定显示器上运行一个 GUIAgent，结果放入结果队列"""
+    task_dir = Path(config.output_dir) / task.task_id
+    task_dir.mkdir(parents=True, exist_ok=True)
+    log = open(task_dir / "agent.log", "w", encoding="utf-8", buffering=1)
+    sys.stdout = sys.stderr = log
+    if display:
+        os.environ["DISPLAY"] = display
+
+    result = TaskResult(task_id=task.task_id, instruction=task.instruction, status="error", display=display)
+    start = time.monotonic()
+    try:
+        from gui_operator.execute import Operation
+        from main import GUIAgent
+
+        if config.fake_script:
+            from gui_operator.fake_screen import FakeScreen
+            screen = FakeScreen.load(config.fake_script)
+            operation = Operation(input_backend=screen, screen=screen)
+        else:
+            operation = Operation(display=display)
+        agent = GUIAgent(
+            instruction=task.instruction,
+            model_name=config.model_name,
+            api_key=config.api_key,
+            base_url=config.base_url,
+            operation=operation,
+            steps_dir=str(task_dir / "steps"),
+            **config.agent_options
+        )
+        try:
+            final_state = agent.run()
+            result.status = "success" if final_state.get("finished") else "failed"
+            result.steps = final_state.get("step", 0)
+        finally:
+            result.model_calls = agent.model_calls
+            result.actions = agent.actions_executed
+            result.settle_time = round(sum(agent.settle_times), 3)
+            (task_dir / "trajectory.json").write_text(
+                json.dumps(agent.trajectory.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    except Exception as e:
+        result.status = "failed" if type(e).__name__ == "GraphRecursionError" else "error"
+        result.error = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    finally:
+        result.duration = round(time.monotonic() - start, 3)
+        if result.steps:
+            result.step_latency = round(result.duration / result.steps, 3)
+        results.put(asdict(result))
+        log.close()
+
+
+class WorkerPool:
+    """
+    多进程批量运行器
+
+    每个工作槽位绑定一个独立的显示器（默认各自启动一个 Xvfb），
+    每个任务在新的子进程中运行，超过截止时间直接终止该进程，不影响其他槽位
+    """
+
+    def __init__(self, config: WorkerConfig, workers: int = 4, display_mode: str = "xvfb",
+                 screen_size: tuple[int, int] = (1920, 1080), task_deadline: float = 600.0):
+        """
+        初始化进程池
+
+        Args:
+            config: 工作进程配置
+            workers: 并发槽位数
+            display_mode: "xvfb"（每个槽位一个虚拟显示器）、"current"（当前桌面，只能1个槽位）或
+                          "fake"（假屏幕脚本，无需显示器）
+            screen_size: 虚拟显示器尺寸
+            task_deadline: 默认的单任务截止时间（秒）
+        """
+        if display_mode == "current" and workers != 1:
+            raise ValueError("使用当前桌面时只能有1个工作槽位")
+        if display_mode == "fake" and not config.fake_script:
+            raise ValueError("fake 模式需要提供假屏幕脚本")
+        self.config = config
+        self.workers = workers
+        self.display_mode = display_mode
+        self.screen_size = screen_size
+        self.task_deadline = task_deadline
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def _start_displays(self) -> list:
+        if self.display_mode != "xvfb":
+            return [None] * self.workers
+        from gui_operator.virtual_display import VirtualDisplay
+        displays = []
+        try:
+            for _ in range(self.workers):
+                number = VirtualDisplay.free_number(99 + len(displays))
+                displays.append(VirtualDisplay(number, self.screen_size).start())
+        except Exception:
+            for display in displays:
+                display.stop()
+            raise
+        return displays
+
+    def run(self, tasks: list[BatchTask], on_result=None) -> list[TaskResult]:
+        """
+        运行全部任务并返回结果（按完成顺序）
+
+        Args:
+            tasks: 任务列表
+            on_result: 每个任务完成时的回调 (TaskResult)
+        """
+        Path(self.config.output_dir).mkdir(parents=True, exist_ok=True)
+        displays = self._start_displays()
+        results_queue = self._ctx.Queue()
+        pending = list(reversed(tasks))
+        running: dict[int, tuple] = {}  # 槽位 -> (进程, 任务, 截止时刻)
+        results: list[TaskResult] = []
+        received: dict[str, TaskResult] = {}  # 已从队列取出、尚未记录的结果
+        finished: set[str] = set()
+
+        def finish(result: TaskResult) -> None:
+            if result.task_id in finished:
+                # 已记为超时/错误后才到达的结果不再重复记录
+                return
+            finished.add(result.task_id)
+            results.append(result)
+            icon = "✅" if result.status == "success" else "❌"
+            print(f"{icon} [{len(results)}/{len(tasks)}] {result.task_id} {result.status} "
+                  f"({result.steps} 步, {result.duration:.1f} 秒)")
+            if on_result:
+                on_result(result)
+
+        def receive(timeout: float, task_id: str | None = None) -> TaskResult | None:
+            """
+            从结果队列取结果放入 received；指定 task_id 时一直取到该任务的结果或超时，
+            其他任务的结果留在 received 中由主循环记录
+            """
+            end = time.monotonic() + timeout
+            while True:
+                if task_id is not None and task_id in received:
+                    return received.pop(task_id)
+                try:
+                    data = results_queue.get(timeout=max(end - time.monotonic(), 0))
+                except queue.Empty:
+                    return None
+                result = TaskResult(**data)
+                received[result.task_id] = result
+                if task_id is None:
+                    return None
+
+        try:
+            while pending or running:
+                # 空闲槽位领取任务
+                for slot in range(self.workers):
+                    if slot not in running and pending:
+                        task = pending.pop()
+                        display = displays[slot].name if displays[slot] else None
+                        process = self._ctx.Process(target=_run_task, name=f"agent-{task.task_id}",
+                                                    args=(task, self.config, display, results_queue))
+                        process.start()
+                        deadline = time.monotonic() + (task.deadline or self.task_deadline)
+                        running[slot] = (process, task, deadline)
+
+                # 收集结果
+                receive(0.5)
+                for task_id in list(received):
+                    finish(received.pop(task_id))
+
+                # 回收结束的进程，终止超时的进程
+                now = time.monotonic()
+                for slot, (process, task, deadline) in list(running.items()):
+                    if not process.is_alive():
+                        process.join()
+                        del running[slot]
+                        if task.task_id not in finished:
+                            # 进程异常退出且没有上报结果：稍等队列中该任务的结果，否则记为错误
+                            result = receive(1.0, task.task_id)
+                            finish(result or TaskResult(task.task_id, task.instruction, "error",
+                                                        display=displays[slot].name if displays[slot] else None,
+                                                        error=f"工作进程退出码 {process.exitcode}"))
+                    elif now > deadline:
+                        # 截止前已上报的结果优先于超时
+                        result = receive(0, task.task_id)
+                        process.terminate()
+                        process.join(timeout=5)
+                        if process.is_alive():
+                            process.kill()
+                        del running[slot]
+                        finish(result or TaskResult(task.task_id, task.instruction, "timeout",
+                                                    duration=round(task.deadline or self.task_deadline, 3),
+                                                    display=displays[slot].name if displays[slot] else None,
+                                                    error="超过任务截止时间"))
+        finally:
+            for process, _, _ in running.values():
+                process.terminate()
+            for display in displays:
+                if display:
+                    display.stop()
+        return results
+
+
+def summarize(results: list[TaskResult]) -> dict:
+    """汇总成功率、步数和耗时"""
+    def percentile(values: list[float], q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    statuses: dict[str, int] = {}
+    for result in results:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    completed = [r for r in results if r.steps]
+    steps = [r.steps for r in completed]
+    durations = [r.duration for r in results]
+    step_latency = [r.step_latency for r in completed]
+    model_calls = sum(r.model_calls for r in results)
+    return {
+        "total": len(results),
+        "statuses": statuses,
+        "success_rate": round(statuses.get("success", 0) / len(results), 4) if results else 0.0,
+        "steps_mean": round(statistics.fmean(steps), 2) if steps else 0.0,
+        "steps_p95": percentile(steps, 0.95),
+        "duration_mean": round(statistics.fmean(durations), 2) if durations else 0.0,
+        "duration_p95": percentile(durations, 0.95),
+        "step_latency_mean": round(statistics.fmean(step_latency), 3) if step_latency else 0.0,
+        "step_latency_p95": percentile(step_latency, 0.95),
+        "actions_per_model_call": round(sum(r.actions for r in results) / model_calls, 2) if model_calls else 0.0,
+    }
@@ -0,0 +1,143 @@
+# gui_operator/capture.py
+
+import collections
+import threading
+import time
+
+import mss
+
+from gui_operator.frame import Frame
+
+
+class MssScreen:
+    """持久化的mss截图句柄（mss句柄不能跨线程使用，需在使用它的线程内创建）"""
+
+    def __init__(self, monitor_index: int = 1, display: str | None = None):
+        self.monitor_index = monitor_index
+        self.display = display  # X显示器名（如 ":99"），None 表示当前显示器
+        self._sct = None
+        self._monitor = None
+
+    def _handle(self):
+        if self._sct is None:
+            self._sct = mss.mss(display=self.display) if self.display else mss.mss()
+            self._monitor = self._sct.monitors[self.monitor_index]
+        return self._sct
+
+    def grab(self) -> Frame:
+        """抓取一帧，时间戳记为开始抓取的时刻"""
+        sct = self._handle()
+        started = time.monotonic()
+        frame = Frame.from_mss(sct.grab(self._monitor))
+        frame.timestamp = started
+        return frame
+
+    def size(self) -> tuple[int, int]:
+        """屏幕尺寸 (width, height)"""
+        self._handle()
+        return self._monitor["width"], self._monitor["height"]
+
+    def close(self) -> None:
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class CaptureService:
+    """后台连续截图服务 - 持久mss句柄按固定帧率抓帧，保存在环形缓冲区中"""
+
+    def __init__(self, fps: float = 10.0, buffer_size: int = 8, monitor_index: int = 1,
+                 display: str | None = None):
+        """
+        初始化截图服务
+
+        Args:
+            fps: 抓帧频率（帧/秒）
+            buffer_size: 环形缓冲区容量
+            monitor_index: mss显示器编号（1为主显示器）
+            display: X显示器名（如虚拟显示器 ":99"）
+        """
+        self.interval = 1.0 / fps
+        self.monitor_index = monitor_index
+        self.display = display
+        self._frames: collections.deque[Frame] = collections.deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.error: Exception | None = None
+
+    def start(self) -> 'CaptureService':
+        """启动后台抓帧线程（重复调用无副作用）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="capture-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止抓帧线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def __enter__(self) -> 'CaptureService':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self) -> Frame | None:
+        """最新一帧（无抓取开销）"""
+        with self._cond:
+            return self._frames[-1] if self._frames else None
+
+    def frame_after(self, t: float, timeout: float = 2.0) -> Frame | None:
+        """
+        获取在时刻t之后才开始抓取的第一帧，保证不会拿到旧画面
+
+        Args:
+            t: time.monotonic() 时间点
+            timeout: 最长等待秒数
+
+        Returns:
+            满足条件的帧；超时或服务未运行时返回None
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for frame in self._frames:
+                    if frame.timestamp >= t:
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return None
+                self._cond.wait(remaining)
+
+    def _run(self) -> None:
+        screen = MssScreen(self.monitor_index, self.display)
+        try:
+            next_tick = time.monotonic()
+            while not self._stop.is_set():
+                frame = screen.grab()
+                with self._cond:
+                    self._frames.append(frame)
+                    self._cond.notify_all()
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    # 抓帧比设定帧率慢时不累积欠账
+                    next_tick = time.monotonic()
+        except Exception as e:
+            self.error = e
+            print(f"⚠️ 截图服务异常退出: {e}")
+        finally:
+            screen.close()
+            with self._cond:
+                self._cond.notify_all()
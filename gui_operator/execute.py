@@ -1,44 +1,170 @@
 # operator/execute.py
 
-import pyautogui
-import pyperclip
-import mss
+import contextlib
+import statistics
+import threading
 import time
-
-# 允许鼠标移动到屏幕角落（默认会触发fail-safe）
-pyautogui.FAILSAFE = False
+from typing import Callable
+from gui_operator.capture import MssScreen
+from gui_operator.frame import Frame, FrameWriter
+from gui_operator.input_backend import InputBackend, Pacing, DEFAULT_PACING, create_input_backend
+from utils.cancel import CancelToken
+from utils.tracing import NULL_TRACER, Tracer
 
 class Operation:
     """GUI操作工具类"""
     
+    def __init__(self, input_backend: InputBackend | str = "auto", pacing: Pacing = DEFAULT_PACING,
+                 display: str | None = None, screen=None, cancel_token: CancelToken | None = None,
+                 log: Callable[[str], None] = print):
+        """
+        Args:
+            input_backend: 输入后端实例，或后端名（"auto" / "xtest" / "pyautogui"）
+            pacing: 按名称创建后端时使用的输入节奏
+            display: X显示器名（如虚拟显示器 ":99"），截图和输入都指向该显示器
+            screen: 自定义截图来源（提供 grab()/size()，如 FakeScreen），所有线程共用
+            cancel_token: 取消令牌，取消后不再发送任何输入，等待立即中止
+            log: 日志输出（GUIAgent 传入自己的 _log，点击/输入等日志随之发布为 LOG 事件）
+        """
+        self.log = log
+        self.display = display
+        self.screen = screen
+        self.cancel_token = cancel_token
+        # 截图落盘在后台线程完成，不占用每一步的关键路径
+        self.writer = FrameWriter()
+        # 每个线程复用一个持久的mss句柄，不再每次截图都重新打开
+        self._screens = threading.local()
+        if isinstance(input_backend, str):
+            input_backend = create_input_backend(input_backend, pacing, display)
+        self.backend = input_backend
+        # 每类输入动作的实测耗时（秒）
+        self.latencies: dict[str, list[float]] = {}
+        self.tracer = NULL_TRACER
+        self.log(f"🎛️  输入后端: {self.backend.name}")
+    
+    @property
+    def tracer(self) -> Tracer:
+        return self._tracer
+    
+    @tracer.setter
+    def tracer(self, tracer: Tracer) -> None:
+        """分阶段计时（输入动作、后台截图落盘）"""
+        self._tracer = tracer
+        self.writer.tracer = tracer
+    
+    @contextlib.contextmanager
+    def _timed(self, name: str):
+        # 任务取消后不再发送输入，避免多余的点击
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.latencies.setdefault(name, []).append((end - start) / 1e9)
+            self._tracer.record(f"input.{name}", start, end, "input")
+    
+    def latency_summary(self) -> dict[str, dict]:
+        """各类输入动作的耗时统计（毫秒）"""
+        summary = {}
+        for name, samples in self.latencies.items():
+            ordered = sorted(samples)
+            summary[name] = {
+                "count": len(samples),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            }
+        return summary
+    
+    def screen_size(self) -> tuple[int, int]:
+        """屏幕尺寸 (width, height)，由输入后端提供，与点击坐标处于同一坐标系"""
+        return self.backend.size()
+    
     def click(self, x: int, y: int):
         """点击指定坐标"""
-        print(f"🖱️  点击坐标 ({x}, {y})")
-        pyautogui.click(x=x, y=y)
+        self.log(f"🖱️  点击坐标 ({x}, {y})")
+        with self._timed("click"):
+            self.backend.click(x, y)
     
     def input(self, text: str):
-        """输入文本（使用粘贴方式，支持中文）"""
-        print(f"⌨️  输入: {text}")
-        pyperclip.copy(text)  # 复制到剪贴板
-        pyautogui.hotkey('ctrl', 'v')  # Windows用ctrl
+        """输入文本（支持中文）"""
+        self.log(f"⌨️  输入: {text}")
+        with self._timed("type"):
+            self.backend.type_text(text)
     
-    def screenshot(self, save_path: str):
-        """截图并保存"""
-        with mss.mss() as sct:
-            sct.shot(output=save_path)
-        print(f"📸 截图已保存: {save_path}")
+    def screenshot(self, save_path: str | None = None) -> Frame:
+        """
+        截图并以内存帧返回
+        
+        Args:
+            save_path: 可选，提供时在后台线程异步写入该路径
+            
+        Returns:
+            Frame对象（原始像素，按需编码）
+        """
+        frame = self.grab()
+        self.save_frame(frame, save_path)
+        return frame
+    
+    def grab(self) -> Frame:
+        """仅抓取一帧（不保存、不打印），供稳定检测等高频场景使用"""
+        return self._screen().grab()
+    
+    def save_frame(self, frame: Frame, save_path: str | None = None):
+        """把已抓取的帧交给后台线程保存"""
+        if save_path:
+            self.writer.submit(frame, save_path)
+            self.log(f"📸 截图已捕获: {save_path}")
+        else:
+            self.log("📸 截图已捕获（仅内存）")
+    
+    def _screen(self) -> MssScreen:
+        if self.screen is not None:
+            return self.screen
+        screen = getattr(self._screens, "screen", None)
+        if screen is None:
+            screen = self._screens.screen = MssScreen(display=self.display)
+        return screen
+    
+    def flush(self):
+        """等待后台截图写入完成"""
+        self.writer.flush()
     
     def hotkey(self, *keys):
         """按下组合键（如ctrl+c）"""
-        print(f"⌨️  按下组合键: {' + '.join(keys)}")
-        pyautogui.hotkey(*keys)
+        self.log(f"⌨️  按下组合键: {' + '.join(keys)}")
+        with self._timed("hotkey"):
+            self.backend.hotkey(*keys)
     
     def double_click(self, x: int, y: int):
         """双击指定坐标"""
-        print(f"🖱️  双击坐标 ({x}, {y})")
-        pyautogui.doubleClick(x=x, y=y)
+        self.log(f"🖱️  双击坐标 ({x}, {y})")
+        with self._timed("double_click"):
+            self.backend.click(x, y, clicks=2)
+    
+    def right_click(self, x: int, y: int):
+        """右键单击指定坐标"""
+        self.log(f"🖱️  右键点击坐标 ({x}, {y})")
+        with self._timed("right_click"):
+            self.backend.click(x, y, button="right")
+    
+    def scroll(self, x: int, y: int, direction: str = "down"):
+        """在指定坐标处向某个方向滚动"""
+        self.log(f"🖱️  在 ({x}, {y}) 向{direction}滚动")
+        with self._timed("scroll"):
+            self.backend.scroll(x, y, direction)
+    
+    def drag(self, x1: int, y1: int, x2: int, y2: int):
+        """从起点拖拽到终点"""
+        self.log(f"🖱️  拖拽 ({x1}, {y1}) -> ({x2}, {y2})")
+        with self._timed("drag"):
+            self.backend.drag(x1, y1, x2, y2)
     
     def wait(self, seconds: float = 1.0):
         """等待指定时间"""
-        print(f"⏱️  等待 {seconds} 秒...")
-        time.sleep(seconds)
\ No newline at end of file
+        self.log(f"⏱️  等待 {seconds} 秒...")
+        if self.cancel_token is not None:
+            self.cancel_token.sleep(seconds)
+        else:
+            time.sleep(seconds)
\ No newline at end of file
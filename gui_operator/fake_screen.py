@@ -0,0 +1,208 @@
+# gui_operator/fake_screen.py
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from gui_operator.frame import Frame
+from gui_operator.input_backend import InputBackend, Pacing, DEFAULT_PACING
+
+
+@dataclass
+class FakeWidget:
+    """脚本化界面中的一个控件"""
+    name: str
+    box: tuple[int, int, int, int]  # (x1, y1, x2, y2) 屏幕像素
+    kind: str = "button"  # "button" 或 "input"
+    label: str = ""
+    color: str = "#d0d0d0"
+    click: str | None = None  # 点击后切换到的状态
+    submit: str | None = None  # 输入框中回车后切换到的状态
+    text: str = ""  # 输入框当前内容
+
+    def contains(self, x: int, y: int) -> bool:
+        x1, y1, x2, y2 = self.box
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+
+@dataclass
+class FakeState:
+    """脚本化界面的一个画面状态"""
+    name: str
+    widgets: list[FakeWidget] = field(default_factory=list)
+    background: str = "#ffffff"
+    title: str = ""
+    hotkeys: dict[str, str] = field(default_factory=dict)  # "ctrl l" -> 状态名
+    scroll: dict[str, str] = field(default_factory=dict)  # 方向 -> 状态名
+
+
+class FakeScreen(InputBackend):
+    """
+    纯内存的假屏幕：按脚本渲染界面状态，并把点击、输入、按键应用到状态上
+
+    同时提供截图接口（grab/size，可作为 Operation 的 screen）和输入接口（InputBackend），
+    整个 截图 -> 决策 -> 执行 循环无需任何显示器即可运行
+    """
+
+    name = "fake"
+
+    def __init__(self, states: list[FakeState], initial: str | None = None,
+                 size: tuple[int, int] = (1280, 720), transition_delay: float = 0.0,
+                 pacing: Pacing = DEFAULT_PACING):
+        """
+        初始化假屏幕
+
+        Args:
+            states: 界面状态列表
+            initial: 初始状态名，默认第一个
+            size: 屏幕尺寸
+            transition_delay: 状态切换生效前的延迟（秒），用于模拟界面动画/加载
+            pacing: 输入节奏
+        """
+        super().__init__(pacing)
+        self.states = {state.name: state for state in states}
+        self.width, self.height = size
+        self.transition_delay = transition_delay
+        self.state = self.states[initial or states[0].name]
+        self.focus: FakeWidget | None = None
+        self.events: list[tuple[str, ...]] = []  # 收到的输入事件，便于断言和统计
+        self._pending: tuple[float, str] | None = None
+        self._frame: Frame | None = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_script(cls, script: dict, **kwargs) -> 'FakeScreen':
+        """从字典脚本创建：{"size": [w, h], "initial": ..., "states": {名称: {"widgets": [...], ...}}}"""
+        states = []
+        for name, spec in script["states"].items():
+            widgets = [FakeWidget(**{**w, "box": tuple(w["box"])}) for w in spec.get("widgets", [])]
+            states.append(FakeState(name=name, widgets=widgets,
+                                    background=spec.get("background", "#ffffff"),
+                                    title=spec.get("title", name),
+                                    hotkeys=spec.get("hotkeys", {}),
+                                    scroll=spec.get("scroll", {})))
+        if "size" in script:
+            kwargs.setdefault("size", tuple(script["size"]))
+        return cls(states, initial=script.get("initial"), **kwargs)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'FakeScreen':
+        """从JSON脚本文件创建"""
+        return cls.from_script(json.loads(Path(path).read_text(encoding="utf-8")), **kwargs)
+
+    @property
+    def state_name(self) -> str:
+        with self._lock:
+            self._apply_pending()
+            return self.state.name
+
+    # ---- 截图接口 ----
+
+    def grab(self) -> Frame:
+        """渲染当前画面（同一画面复用像素缓冲，每次返回新的帧对象）"""
+        with self._lock:
+            self._apply_pending()
+            if self._frame is None:
+                self._frame = self._render()
+            return Frame(rgb=self._frame.rgb, width=self.width, height=self.height)
+
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def close(self) -> None:
+        pass
+
+    def _render(self) -> Frame:
+        img = Image.new("RGB", (self.width, self.height), self.state.background)
+        draw = ImageDraw.Draw(img)
+        if self.state.title:
+            draw.text((10, 10), self.state.title, fill="#000000")
+        for widget in self.state.widgets:
+            outline = "#0060df" if widget is self.focus else "#606060"
+            fill = "#ffffff" if widget.kind == "input" else widget.color
+            draw.rectangle(widget.box, fill=fill, outline=outline, width=2)
+            draw.text((widget.box[0] + 6, widget.box[1] + 6), widget.text or widget.label, fill="#000000")
+        return Frame(rgb=img.tobytes(), width=self.width, height=self.height)
+
+    # ---- 状态切换 ----
+
+    def _goto(self, name: str | None) -> None:
+        if not name:
+            return
+        if name not in self.states:
+            raise KeyError(f"脚本中没有状态: {name}")
+        if self.transition_delay > 0:
+            self._pending = (time.monotonic() + self.transition_delay, name)
+        else:
+            self._switch(name)
+
+    def _switch(self, name: str) -> None:
+        self.state = self.states[name]
+        self.focus = None
+        self._frame = None
+
+    def _apply_pending(self) -> None:
+        if self._pending is not None and time.monotonic() >= self._pending[0]:
+            name = self._pending[1]
+            self._pending = None
+            self._switch(name)
+
+    def _changed(self) -> None:
+        self._frame = None
+
+    # ---- 输入接口 ----
+
+    def click(self, x: int, y: int, button: str = "left", clicks: int = 1) -> None:
+        with self._lock:
+            self._apply_pending()
+            self.events.append(("click", x, y, button, clicks))
+            widget = next((w for w in reversed(self.state.widgets) if w.contains(x, y)), None)
+            if widget is not self.focus:
+                self.focus = widget if widget is not None and widget.kind == "input" else None
+                self._changed()
+            if widget is not None and button == "left":
+                self._goto(widget.click)
+        self._pause()
+
+    def scroll(self, x: int, y: int, direction: str) -> None:
+        with self._lock:
+            self._apply_pending()
+            self.events.append(("scroll", x, y, direction))
+            self._goto(self.state.scroll.get(direction))
+        self._pause()
+
+    def drag(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        with self._lock:
+            self.events.append(("drag", x1, y1, x2, y2))
+        self._pause()
+
+    def hotkey(self, *keys: str) -> None:
+        combo = " ".join(key.lower() for key in keys)
+        with self._lock:
+            self._apply_pending()
+            self.events.append(("hotkey", combo))
+            if combo in ("enter", "return"):
+                self._submit()
+            else:
+                self._goto(self.state.hotkeys.get(combo))
+        self._pause()
+
+    def type_text(self, text: str) -> None:
+        with self._lock:
+            self._apply_pending()
+            self.events.append(("type", text))
+            for line_index, line in enumerate(text.split("\n")):
+                if line_index:
+                    self._submit()
+                if line and self.focus is not None:
+                    self.focus.text += line
+                    self._changed()
+        self._pause()
+
+    def _submit(self) -> None:
+        if self.focus is not None:
+            self._goto(self.focus.submit)
@@ -0,0 +1,50 @@
+# gui_operator/fingerprint.py
+
+import hashlib
+
+from PIL import Image
+
+from gui_operator.frame import Frame
+from gui_operator.settle import thumbnail
+
+
+def dhash(frame: Frame, hash_size: int = 8) -> int:
+    """
+    截图的差值感知哈希（dHash）
+
+    缩成 (hash_size+1) x hash_size 的灰度图，比较每行相邻像素的明暗得到 hash_size^2 位指纹；
+    对缩放、轻微压缩噪声不敏感，相似画面的指纹汉明距离很小
+    """
+    pixels = thumbnail(frame, (hash_size + 1, hash_size)).tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def region_hash(frame: Frame, center: tuple[float, float], radius: float = 0.05, size: int = 32) -> int:
+    """
+    目标点附近区域的内容指纹（只做精确比对）
+
+    dHash 只看相邻像素谁更亮，勾选复选框、输入框里多几个字、光标出现，明暗关系往往不变；
+    这里把区域缩成 size x size 的灰度图并量化到16级后取64位摘要，区域内容变了指纹就不同
+
+    Args:
+        center: 目标位置（相对屏幕的坐标 0-1）
+        radius: 区域半宽/半高（占屏幕宽高的比例）
+    """
+    width, height = frame.size
+    x, y = center
+    box = (max(x - radius, 0.0) * width, max(y - radius, 0.0) * height,
+           min(x + radius, 1.0) * width, min(y + radius, 1.0) * height)
+    img = Image.frombuffer("RGB", frame.size, frame.rgb, "raw", "RGB", 0, 1)
+    pixels = img.resize((size, size), Image.Resampling.BOX, box=box).convert("L").tobytes()
+    digest = hashlib.blake2b(bytes(value >> 4 for value in pixels), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def hamming(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return (a ^ b).bit_count()
@@ -0,0 +1,88 @@
+# gui_operator/frame.py
+
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import mss.tools
+
+from utils.tracing import NULL_TRACER
+
+# 全局递增的帧编号
+_frame_ids = itertools.count(1)
+
+
+@dataclass
+class Frame:
+    """内存中的一帧截图（原始RGB像素），按需编码为PNG"""
+    rgb: bytes
+    width: int
+    height: int
+    timestamp: float = field(default_factory=time.monotonic)
+    frame_id: int = field(default_factory=lambda: next(_frame_ids))
+    path: str | None = None
+    _png: bytes | None = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @classmethod
+    def from_mss(cls, shot) -> 'Frame':
+        """从mss的ScreenShot对象创建帧"""
+        return cls(rgb=shot.rgb, width=shot.width, height=shot.height)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def to_png(self) -> bytes:
+        """编码为PNG字节（结果会缓存，落盘线程和请求线程共享同一次压缩）"""
+        with self._lock:
+            if self._png is None:
+                self._png = mss.tools.to_png(self.rgb, self.size)
+            return self._png
+
+    def save(self, path: str) -> str:
+        """把帧写入磁盘"""
+        Path(path).write_bytes(self.to_png())
+        self.path = str(path)
+        return self.path
+
+
+class FrameWriter:
+    """后台落盘线程 - 把截图写入steps/的操作移出关键路径"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self.tracer = NULL_TRACER
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, frame: Frame, path: str) -> None:
+        """提交一帧等待写入（立即返回）"""
+        frame.path = str(path)
+        self._ensure_thread()
+        self._queue.put(frame)
+
+    def flush(self) -> None:
+        """阻塞直到所有已提交的帧写入完成"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            try:
+                with self.tracer.span("png_write", "capture"):
+                    frame.save(frame.path)
+            except Exception as e:
+                print(f"⚠️ 截图落盘失败 {frame.path}: {e}")
+            finally:
+                self._queue.task_done()
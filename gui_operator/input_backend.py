@@ -0,0 +1,312 @@
+# gui_operator/input_backend.py
+
+import abc
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class Pacing:
+    """输入节奏：所有等待都显式配置，不再依赖 pyautogui.PAUSE 的隐式停顿"""
+    action_pause: float = 0.0  # 每个输入动作之后的停顿（秒）
+    double_click_interval: float = 0.05  # 双击两次点击之间的间隔（秒）
+    drag_duration: float = 0.2  # 拖拽移动耗时（秒）
+    drag_steps: int = 20  # 拖拽过程中的移动步数
+    key_interval: float = 0.0  # 组合键/逐字输入时按键之间的间隔（秒）
+    scroll_clicks: int = 3  # 每次滚动的滚轮格数
+    remap_interval: float = 0.01  # 临时重映射键码输入一个字符后、再次改映射前的等待（秒），留给应用读取按键
+
+
+DEFAULT_PACING = Pacing()
+
+# 动作中的按键名 -> X keysym 名称
+_KEY_ALIASES = {
+    "ctrl": "Control_L", "control": "Control_L", "shift": "Shift_L", "alt": "Alt_L",
+    "win": "Super_L", "super": "Super_L", "cmd": "Super_L", "meta": "Super_L",
+    "enter": "Return", "return": "Return", "esc": "Escape", "escape": "Escape",
+    "backspace": "BackSpace", "tab": "Tab", "space": "space", "delete": "Delete", "del": "Delete",
+    "insert": "Insert", "home": "Home", "end": "End", "pageup": "Prior", "pagedown": "Next",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right",
+    "capslock": "Caps_Lock", "printscreen": "Print",
+}
+
+
+class InputBackend(abc.ABC):
+    """输入后端接口 - Operation 通过它发送鼠标和键盘事件（坐标均为屏幕像素）；缺少方法的后端在创建时即报错"""
+
+    name = "base"
+
+    def __init__(self, pacing: Pacing = DEFAULT_PACING):
+        self.pacing = pacing
+
+    @abc.abstractmethod
+    def size(self) -> tuple[int, int]:
+        """屏幕尺寸 (width, height)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def click(self, x: int, y: int, button: str = "left", clicks: int = 1) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def scroll(self, x: int, y: int, direction: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def drag(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def type_text(self, text: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def _pause(self) -> None:
+        if self.pacing.action_pause > 0:
+            time.sleep(self.pacing.action_pause)
+
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui 后端（跨平台兜底）：关闭隐式 PAUSE，ASCII 文本直接键入，仅非ASCII文本走剪贴板"""
+
+    name = "pyautogui"
+
+    def __init__(self, pacing: Pacing = DEFAULT_PACING):
+        super().__init__(pacing)
+        import pyautogui
+        self._gui = pyautogui
+        # 允许鼠标移动到屏幕角落（默认会触发fail-safe）
+        pyautogui.FAILSAFE = False
+        # 停顿由 Pacing 显式控制
+        pyautogui.PAUSE = 0
+
+    def size(self) -> tuple[int, int]:
+        width, height = self._gui.size()
+        return width, height
+
+    def click(self, x: int, y: int, button: str = "left", clicks: int = 1) -> None:
+        self._gui.click(x=x, y=y, button=button, clicks=clicks, interval=self.pacing.double_click_interval)
+        self._pause()
+
+    def scroll(self, x: int, y: int, direction: str) -> None:
+        amount = self.pacing.scroll_clicks
+        if direction in ("left", "right"):
+            self._gui.hscroll(amount if direction == "right" else -amount, x=x, y=y)
+        else:
+            self._gui.scroll(amount if direction == "up" else -amount, x=x, y=y)
+        self._pause()
+
+    def drag(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        self._gui.moveTo(x1, y1)
+        self._gui.dragTo(x2, y2, duration=self.pacing.drag_duration, button="left")
+        self._pause()
+
+    def hotkey(self, *keys: str) -> None:
+        self._gui.hotkey(*keys, interval=self.pacing.key_interval)
+        self._pause()
+
+    def type_text(self, text: str) -> None:
+        if text.isascii():
+            self._gui.write(text, interval=self.pacing.key_interval)
+        else:
+            # pyautogui 无法直接键入中文等字符，使用粘贴方式
+            import pyperclip
+            pyperclip.copy(text)
+            self._gui.hotkey("command" if sys.platform == "darwin" else "ctrl", "v")
+        self._pause()
+
+
+class XTestBackend(InputBackend):
+    """
+    Linux X11 后端：通过 python-xlib 的 XTEST 扩展直接注入事件
+
+    没有 pyautogui 的逐调用停顿；任意 Unicode 文本通过临时重映射一个空闲键码键入，
+    不经过剪贴板，也不启动 xclip/xsel 子进程
+    """
+
+    name = "xtest"
+    # 空闲键码的 重映射 -> 按键 -> 恢复 必须串行：同一进程内的所有 XTest 后端共用
+    _remap_lock = threading.Lock()
+
+    def __init__(self, pacing: Pacing = DEFAULT_PACING, display: str | None = None):
+        super().__init__(pacing)
+        from Xlib import X, XK, display as xdisplay
+        from Xlib.ext import xtest
+        self._X, self._XK, self._xtest = X, XK, xtest
+        self._display = xdisplay.Display(display)
+        if not self._display.has_extension("XTEST"):
+            self._display.close()
+            raise RuntimeError("X服务器不支持XTEST扩展")
+        self._spare_keycode = self._find_spare_keycode()
+
+    def _find_spare_keycode(self) -> int | None:
+        """找一个没有映射任何keysym的键码，用于键入键盘布局之外的字符"""
+        first = self._display.display.info.min_keycode
+        count = self._display.display.info.max_keycode - first + 1
+        mapping = self._display.get_keyboard_mapping(first, count)
+        for offset in range(count - 1, -1, -1):
+            if not any(mapping[offset]):
+                return first + offset
+        return None
+
+    def size(self) -> tuple[int, int]:
+        screen = self._display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def _fake(self, event_type: int, detail: int = 0, x: int = 0, y: int = 0) -> None:
+        self._xtest.fake_input(self._display, event_type, detail, x=x, y=y)
+
+    def _move(self, x: int, y: int) -> None:
+        self._fake(self._X.MotionNotify, x=x, y=y)
+
+    def _press_button(self, button: int) -> None:
+        self._fake(self._X.ButtonPress, button)
+        self._fake(self._X.ButtonRelease, button)
+
+    def click(self, x: int, y: int, button: str = "left", clicks: int = 1) -> None:
+        code = {"left": 1, "middle": 2, "right": 3}[button]
+        self._move(x, y)
+        for i in range(clicks):
+            if i:
+                self._display.sync()
+                time.sleep(self.pacing.double_click_interval)
+            self._press_button(code)
+        self._display.sync()
+        self._pause()
+
+    def scroll(self, x: int, y: int, direction: str) -> None:
+        # X11 中滚轮是 4-7 号按键
+        code = {"up": 4, "down": 5, "left": 6, "right": 7}.get(direction, 5)
+        self._move(x, y)
+        for _ in range(self.pacing.scroll_clicks):
+            self._press_button(code)
+        self._display.sync()
+        self._pause()
+
+    def drag(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        self._move(x1, y1)
+        self._fake(self._X.ButtonPress, 1)
+        self._display.sync()
+        steps = max(self.pacing.drag_steps, 1)
+        for i in range(1, steps + 1):
+            self._move(x1 + (x2 - x1) * i // steps, y1 + (y2 - y1) * i // steps)
+            self._display.sync()
+            time.sleep(self.pacing.drag_duration / steps)
+        self._fake(self._X.ButtonRelease, 1)
+        self._display.sync()
+        self._pause()
+
+    def _keycode(self, key: str) -> int:
+        name = _KEY_ALIASES.get(key.lower(), key)
+        if len(name) > 1 and name[0] in "fF" and name[1:].isdigit():
+            name = name.upper()
+        keysym = self._XK.string_to_keysym(name)
+        if not keysym and len(name) == 1:
+            keysym = self._XK.string_to_keysym(name.lower())
+        keycode = self._display.keysym_to_keycode(keysym) if keysym else 0
+        if not keycode:
+            raise ValueError(f"无法映射按键: {key}")
+        return keycode
+
+    def hotkey(self, *keys: str) -> None:
+        keycodes = [self._keycode(key) for key in keys]
+        for keycode in keycodes:
+            self._fake(self._X.KeyPress, keycode)
+            if self.pacing.key_interval:
+                self._display.sync()
+                time.sleep(self.pacing.key_interval)
+        for keycode in reversed(keycodes):
+            self._fake(self._X.KeyRelease, keycode)
+        self._display.sync()
+        self._pause()
+
+    def _tap(self, keycode: int, shift: bool = False) -> None:
+        shift_code = self._keycode("shift") if shift else 0
+        if shift_code:
+            self._fake(self._X.KeyPress, shift_code)
+        self._fake(self._X.KeyPress, keycode)
+        self._fake(self._X.KeyRelease, keycode)
+        if shift_code:
+            self._fake(self._X.KeyRelease, shift_code)
+
+    def type_text(self, text: str) -> None:
+        remapped = False
+        try:
+            for ch in text:
+                if ch == "\n":
+                    self._tap(self._keycode("Return"))
+                    continue
+                if ch == "\t":
+                    self._tap(self._keycode("Tab"))
+                    continue
+                # Latin-1 字符的 keysym 与码点相同，其余字符使用 Unicode keysym
+                keysym = ord(ch) if 0x20 <= ord(ch) <= 0xff else 0x01000000 | ord(ch)
+                mapped = next(((code, index) for code, index in self._display.keysym_to_keycodes(keysym)
+                               if index in (0, 1)), None)
+                if mapped is not None:
+                    self._tap(mapped[0], shift=mapped[1] == 1)
+                elif self._spare_keycode is not None:
+                    # 临时把空闲键码映射到该字符再按下；按键同步到服务器并留出读取时间后才释放锁，
+                    # 否则下一个字符的重映射可能赶在应用处理这次按键之前，键入错误的字
+                    with self._remap_lock:
+                        self._display.sync()
+                        self._display.change_keyboard_mapping(self._spare_keycode, [(keysym, keysym)])
+                        self._display.sync()
+                        remapped = True
+                        self._tap(self._spare_keycode)
+                        self._display.sync()
+                        if self.pacing.remap_interval:
+                            time.sleep(self.pacing.remap_interval)
+                else:
+                    raise ValueError(f"键盘映射中没有空闲键码，无法输入字符: {ch!r}")
+                if self.pacing.key_interval:
+                    self._display.sync()
+                    time.sleep(self.pacing.key_interval)
+        finally:
+            if remapped:
+                with self._remap_lock:
+                    self._display.sync()
+                    self._display.change_keyboard_mapping(self._spare_keycode, [(0, 0)])
+                    self._display.sync()
+            else:
+                self._display.sync()
+        self._pause()
+
+    def close(self) -> None:
+        self._display.close()
+
+
+def create_input_backend(name: str = "auto", pacing: Pacing = DEFAULT_PACING,
+                         display: str | None = None) -> InputBackend:
+    """
+    创建输入后端
+
+    Args:
+        name: "auto"（Linux X11 下优先 XTest，否则 pyautogui）、"xtest" 或 "pyautogui"
+        pacing: 输入节奏
+        display: X显示器名（如 ":99"），默认取 DISPLAY 环境变量
+    """
+    if name == "pyautogui":
+        return PyAutoGUIBackend(pacing)
+    if name == "xtest":
+        return XTestBackend(pacing, display)
+    if name != "auto":
+        raise ValueError(f"未知的输入后端: {name}")
+    if sys.platform.startswith("linux") and (display or os.environ.get("DISPLAY")):
+        try:
+            return XTestBackend(pacing, display)
+        except Exception as e:
+            if display and display != os.environ.get("DISPLAY"):
+                # pyautogui 只能操作 DISPLAY 环境变量指向的显示器
+                raise RuntimeError(f"无法连接显示器 {display}: {e}") from e
+            print(f"⚠️ XTest输入后端不可用，改用pyautogui: {e}")
+    return PyAutoGUIBackend(pacing)
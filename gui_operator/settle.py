@@ -0,0 +1,122 @@
+# gui_operator/settle.py
+
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from PIL import Image, ImageChops, ImageStat
+
+from gui_operator.frame import Frame
+from utils.cancel import CancelToken
+
+
+@dataclass
+class SettleResult:
+    """一次画面稳定检测的结果"""
+    settled: bool  # 是否在超时前稳定
+    elapsed: float  # 实际等待秒数
+    polls: int  # 抓取的缩略帧数
+    last_diff: float  # 最后一次帧间差异（灰度均值，0-255）
+
+
+def thumbnail(frame: Frame, size: tuple[int, int]) -> Image.Image:
+    """把帧缩成小尺寸灰度图，用于廉价的帧间比较"""
+    img = Image.frombuffer("RGB", frame.size, frame.rgb, "raw", "RGB", 0, 1)
+    return img.resize(size, Image.Resampling.BOX, reducing_gap=3.0).convert("L")
+
+
+def frame_diff(a: Image.Image, b: Image.Image) -> float:
+    """两张缩略图的平均像素差"""
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0]
+
+
+class SettleDetector:
+    """画面稳定检测器 - 轮询缩略帧，帧间差异持续低于阈值一段时间即认为界面已稳定"""
+
+    def __init__(
+        self,
+        grab: Callable[[], Frame],
+        threshold: float = 1.0,
+        stable_ms: int = 300,
+        timeout: float = 3.0,
+        poll_interval: float = 0.05,
+        min_wait: float = 0.1,
+        thumb_size: tuple[int, int] = (96, 54),
+        cancel_token: CancelToken | None = None
+    ):
+        """
+        初始化稳定检测器
+
+        Args:
+            grab: 抓取一帧的函数
+            threshold: 帧间平均灰度差阈值（0-255）
+            stable_ms: 需要保持稳定的毫秒数
+            timeout: 最长等待秒数
+            poll_interval: 轮询间隔秒数
+            min_wait: 开始检测前的最短等待（给界面开始响应的时间）
+            thumb_size: 比较用缩略图尺寸
+            cancel_token: 取消令牌，等待过程中被取消时立即抛出 Cancelled
+        """
+        self.grab = grab
+        self.threshold = threshold
+        self.stable_ms = stable_ms
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.min_wait = min_wait
+        self.thumb_size = thumb_size
+        self.cancel_token = cancel_token
+
+    def _sleep(self, seconds: float) -> None:
+        if self.cancel_token is not None:
+            self.cancel_token.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def wait(self, min_wait: float | None = None, timeout: float | None = None) -> SettleResult:
+        """
+        阻塞直到画面稳定或超时
+
+        Args:
+            min_wait: 覆盖默认的最短等待
+            timeout: 覆盖默认的超时时间
+
+        Returns:
+            SettleResult
+        """
+        min_wait = self.min_wait if min_wait is None else min_wait
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + max(timeout, min_wait)
+        if min_wait > 0:
+            self._sleep(min_wait)
+
+        previous = thumbnail(self.grab(), self.thumb_size)
+        polls = 1
+        stable_since = time.monotonic()
+        diff = 0.0
+        while True:
+            now = time.monotonic()
+            if (now - stable_since) * 1000 >= self.stable_ms:
+                return SettleResult(True, now - start, polls, diff)
+            if now >= deadline:
+                return SettleResult(False, now - start, polls, diff)
+            self._sleep(self.poll_interval)
+
+            current = thumbnail(self.grab(), self.thumb_size)
+            polls += 1
+            diff = frame_diff(previous, current)
+            if diff > self.threshold:
+                stable_since = time.monotonic()
+            previous = current
+
+
+def screen_changed(before: Frame, after: Frame, size: tuple[int, int] = (192, 108),
+                   pixel_threshold: int = 8) -> bool:
+    """
+    两帧之间是否有可见变化
+
+    与稳定检测的平均差不同，这里只要有一个缩略图像素变化超过阈值就算变化，
+    输入几个字符这样的小范围变化也能检测到
+    """
+    diff = ImageChops.difference(thumbnail(before, size), thumbnail(after, size))
+    return diff.point(lambda v: 255 if v > pixel_threshold else 0).getbbox() is not None
@@ -0,0 +1,91 @@
+# gui_operator/virtual_display.py
+
+import os
+import shutil
+import subprocess
+import time
+
+
+class VirtualDisplay:
+    """Xvfb 虚拟显示器 - 无需物理桌面即可运行截图/输入循环（Linux）"""
+
+    def __init__(self, number: int | None = None, size: tuple[int, int] = (1920, 1080), depth: int = 24,
+                 start_timeout: float = 10.0):
+        """
+        初始化虚拟显示器
+
+        Args:
+            number: 显示器编号（:N），为None时自动选择一个空闲编号
+            size: 屏幕尺寸 (width, height)
+            depth: 颜色深度
+            start_timeout: 等待Xvfb就绪的最长秒数
+        """
+        self.number = number
+        self.size = size
+        self.depth = depth
+        self.start_timeout = start_timeout
+        self._process: subprocess.Popen | None = None
+
+    @property
+    def name(self) -> str:
+        """DISPLAY 名称，例如 ":99" """
+        return f":{self.number}"
+
+    @staticmethod
+    def _in_use(number: int) -> bool:
+        return os.path.exists(f"/tmp/.X{number}-lock") or os.path.exists(f"/tmp/.X11-unix/X{number}")
+
+    @classmethod
+    def free_number(cls, start: int = 99) -> int:
+        """从 start 开始找一个未被占用的显示器编号"""
+        number = start
+        while cls._in_use(number):
+            number += 1
+        return number
+
+    def start(self) -> 'VirtualDisplay':
+        """启动Xvfb并等待其接受连接"""
+        if self._process is not None:
+            return self
+        xvfb = shutil.which("Xvfb")
+        if xvfb is None:
+            raise RuntimeError("未找到Xvfb，请先安装（如 apt install xvfb）")
+        if self.number is None:
+            self.number = self.free_number()
+        width, height = self.size
+        self._process = subprocess.Popen(
+            [xvfb, self.name, "-screen", "0", f"{width}x{height}x{self.depth}", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        socket_path = f"/tmp/.X11-unix/X{self.number}"
+        deadline = time.monotonic() + self.start_timeout
+        while not os.path.exists(socket_path):
+            if self._process.poll() is not None:
+                self._process = None
+                raise RuntimeError(f"Xvfb {self.name} 启动失败（编号可能已被占用）")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"等待Xvfb {self.name} 就绪超时")
+            time.sleep(0.05)
+        print(f"🖥️  虚拟显示器已启动: {self.name} ({width}x{height})")
+        return self
+
+    def stop(self) -> None:
+        """关闭Xvfb"""
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def __enter__(self) -> 'VirtualDisplay':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -9,15 +9,29 @@ import sys, os
 base_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, base_dir)
 
-import re
 import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
 from datetime import datetime
 from typing import TypedDict
 from pathlib import Path
 from langgraph.graph import StateGraph, END
+from core.events import (EventBus, AgentEvent, STEP_STARTED, SCREENSHOT, MODEL_RESPONSE, ACTION, USAGE,
+                         FINISHED, LOG, COMPLETED, CANCELLED, FAILED)
+from gui_operator.capture import CaptureService
 from gui_operator.execute import Operation
-from utils.model import LVMChat
-from utils.prompts import COMPUTER_USE_UITARS
+from gui_operator.fingerprint import dhash, hamming
+from gui_operator.input_backend import InputBackend, Pacing, DEFAULT_PACING
+from gui_operator.settle import SettleDetector, SettleResult, screen_changed
+from utils.action_parser import Action, ActionParseError, PlannedAction, parse_action, parse_plan, parse_response
+from utils.cancel import CancelToken, Cancelled
+from utils.checkpoint import AgentCheckpointer, Checkpoint, FINISHED as RUN_FINISHED
+from utils.model import LVMChat, DEFAULT_BASE_URL, DEFAULT_UPLOAD_PROFILE, DEFAULT_HISTORY_POLICY, HistoryPolicy
+from utils.decision_cache import DecisionCache
+from utils.prompts import COMPUTER_USE_UITARS, COMPUTER_USE_UITARS_MULTI
+from utils.tracing import NULL_TRACER, Tracer
+from utils.trajectory import Trajectory, TrajectoryStep
 
 
 # 定义State
@@ -28,37 +42,271 @@ class AgentState(TypedDict):
     thought: str  # 模型思考
     action: str  # 模型输出的动作
     finished: bool  # 是否完成
+    settle_time: float  # 动作执行后等待画面稳定的耗时（秒）
+    plan: list  # 多动作模式下本轮计划执行的动作（PlannedAction 列表）
 
 
 class GUIAgent:
     """GUI自动化Agent"""
     
-    def __init__(self, instruction: str, model_name: str = "your-model-name"):
+    def __init__(self, instruction: str, model_name: str = "your-model-name",
+                 api_key: str = None, base_url: str = DEFAULT_BASE_URL, client_mode: str = "sync",
+                 save_screenshots: bool = True, upload_profile=DEFAULT_UPLOAD_PROFILE,
+                 capture_service: CaptureService | None = None,
+                 settle_options: dict | None = None,
+                 history_policy: HistoryPolicy = DEFAULT_HISTORY_POLICY,
+                 streaming: bool = False,
+                 decision_cache: DecisionCache | None = None,
+                 record_trajectory: bool = True,
+                 replay: Trajectory | None = None,
+                 replay_max_distance: int = 6,
+                 multi_action: bool = False,
+                 max_actions_per_turn: int = 5,
+                 input_backend: InputBackend | str = "auto",
+                 pacing: Pacing = DEFAULT_PACING,
+                 operation: Operation | None = None,
+                 steps_dir: str = "steps",
+                 checkpointer: AgentCheckpointer | None = None,
+                 run_id: str | None = None,
+                 cancel_token: CancelToken | None = None,
+                 tracer: Tracer | None = None,
+                 recursion_limit: int = 100,
+                 events: EventBus | None = None):
         self.instruction = instruction
-        self.operation = Operation()
-        self.lvm_chat = LVMChat(model=model_name)
-        self.s_dir = Path("steps")
-        self.s_dir.mkdir(exist_ok=True)
+        # 事件总线：传入时日志和步骤信息以结构化事件发布（界面/Web/文件日志各自订阅），否则打印到控制台
+        self.events = events
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.current_step = 0
+        # 图的递归上限（每步经过 截图/决策/执行 三个节点）
+        self.recursion_limit = recursion_limit
+        # 分阶段计时（截图、编码、序列化、网络、解析、输入、稳定等待），未传入时不记录
+        self.tracer = tracer or NULL_TRACER
+        # 取消令牌贯穿图节点、模型请求、输入和等待：cancel() 后循环在几百毫秒内停下
+        self.cancel_token = cancel_token or CancelToken()
+        self.cancel_latency: float | None = None
+        # 可传入预先构造的 Operation（虚拟显示器/假屏幕），无桌面也能运行整个循环
+        self.operation = operation or Operation(input_backend, pacing, log=self._log)
+        self.operation.cancel_token = self.cancel_token
+        self.operation.tracer = self.tracer
+        self.operation.log = self._log
+        self.lvm_chat = LVMChat(api_key=api_key, base_url=base_url, model=model_name,
+                                upload_profile=upload_profile, history_policy=history_policy,
+                                client_mode=client_mode, cancel_token=self.cancel_token, tracer=self.tracer,
+                                log=self._log)
+        self.s_dir = Path(steps_dir)
+        self.s_dir.mkdir(parents=True, exist_ok=True)
+        # 截图以内存帧直接送入模型；落盘到steps/只是可选的后台副作用
+        self.save_screenshots = save_screenshots
+        self.current_frame = None
+        # 当前步骤上传给模型的图片信息（原图尺寸 + 上传尺寸）
+        self.current_image = None
+        # 可选的后台截图服务：截图节点直接取缓冲区中的新帧
+        self.capture_service = capture_service
+        self._last_action_time = 0.0
+        # 画面稳定检测，替代固定的sleep；settle_options 透传给 SettleDetector
+        self.settle_detector = SettleDetector(self._grab_for_settle, cancel_token=self.cancel_token,
+                                              **(settle_options or {}))
+        self.settle_times: list[float] = []
+        # 每一步的请求字节数，用于观察历史裁剪后请求大小是否趋于平稳
+        self.request_sizes: list[int] = []
+        # 流式模式：Action 一出现就在后台线程提前执行，剩余输出继续读取用于日志
+        self.streaming = streaming
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="early-action") if streaming else None
+        self._early_action: tuple[str, Future] | None = None
+        self.time_to_action: list[float] = []
+        # 可选的决策缓存：相同指令、相同动作历史、相似画面时直接复用之前的决策
+        self.decision_cache = decision_cache
+        self.action_history: list[str] = []
+        # 多动作模式：一次模型调用返回动作列表，画面检查不通过时才回到模型
+        self.multi_action = multi_action
+        self.max_actions_per_turn = max_actions_per_turn
+        self._plan_feedback: str | None = None
+        # 往返统计：模型调用次数 vs 实际执行的动作数
+        self.model_calls = 0
+        self.actions_executed = 0
+        # 动作处理表：Action.name -> 处理函数（返回 SettleResult 时表示已自行等待）
+        self._handlers = {
+            "click": self._do_click,
+            "left_double": self._do_double_click,
+            "right_single": self._do_right_click,
+            "type": self._do_type,
+            "hotkey": self._do_hotkey,
+            "scroll": self._do_scroll,
+            "drag": self._do_drag,
+            "wait": self._do_wait,
+        }
+        
+        # 获取屏幕尺寸用于坐标映射（来自输入后端，与点击坐标一致）
+        self.screen_width, self.screen_height = self.operation.screen_size()
+        self._log(f"🖥️  屏幕尺寸: {self.screen_width}x{self.screen_height}")
+        
+        # 轨迹记录（动作 + 每步画面指纹 + 稳定耗时），以及可选的无模型回放
+        self.record_trajectory = record_trajectory
+        self.trajectory = Trajectory(instruction, (self.screen_width, self.screen_height))
+        self.replay = replay
+        self.replay_max_distance = replay_max_distance
+        self._replay_index = 0
+        self.replayed_steps = 0
+        # 正在回放的一步录制时的稳定耗时：执行后至少等到这个时刻，慢界面回放时不抢跑
+        self._replay_settle: float | None = None
+        self.current_fingerprint: int | None = None
+        
+        # 可选的检查点：每个节点结束后保存状态，进程退出后可从最近完成的一步续跑
+        self.checkpointer = checkpointer
+        self._resume_state: AgentState | None = None
+    
+    @classmethod
+    def resume(cls, run_id: str, checkpointer: AgentCheckpointer, **kwargs) -> 'GUIAgent':
+        """
+        从检查点恢复一次中断的运行，返回的 Agent 调用 run() 即从最近完成的一步之后继续
         
-        # 获取屏幕尺寸用于坐标映射
-        import pyautogui
-        self.screen_width, self.screen_height = pyautogui.size()
-        print(f"🖥️  屏幕尺寸: {self.screen_width}x{self.screen_height}")
+        Args:
+            run_id: 运行ID
+            checkpointer: 检查点存储
+            **kwargs: 其余 GUIAgent 参数（模型配置等）
+        """
+        loaded = checkpointer.load(run_id)
+        if loaded is None:
+            raise KeyError(f"没有找到运行记录: {run_id}")
+        checkpoint, seqs = loaded
+        if checkpoint.state.get("finished"):
+            raise ValueError(f"运行 {run_id} 已经完成，无需续跑")
+        agent = cls(instruction=checkpoint.instruction, checkpointer=checkpointer, run_id=run_id, **kwargs)
+        agent._restore(checkpoint, seqs)
+        return agent
+    
+    def _restore(self, checkpoint: Checkpoint, seqs: list[int]) -> None:
+        """把快照中的会话历史、动作历史、轨迹和计数器恢复到当前Agent"""
+        if not checkpoint.state:
+            self._log(f"♻️  运行 {checkpoint.run_id} 尚未完成任何一步，从头开始")
+            return
+        extra = checkpoint.extra
+        self.lvm_chat.restore_history(checkpoint.history)
+        self.checkpointer.adopt(self.run_id, self.lvm_chat.conversation_history, seqs)
+        self.action_history = list(checkpoint.logs.get("action_history", []))
+        self.trajectory.steps = [TrajectoryStep.from_dict(s) for s in checkpoint.logs.get("trajectory", [])]
+        self._replay_index = extra.get("replay_index", 0)
+        self.replayed_steps = extra.get("replayed_steps", 0)
+        self.model_calls = extra.get("model_calls", 0)
+        self.actions_executed = extra.get("actions_executed", 0)
+        self.settle_times = list(extra.get("settle_times", []))
+        self._plan_feedback = extra.get("plan_feedback")
+        self._resume_state = {**checkpoint.state, "plan": []}
+        self.current_step = checkpoint.state.get("step", 0)
+        self._log(f"♻️  从检查点恢复运行 {checkpoint.run_id}: 已完成 {checkpoint.state.get('step', 0)} 步, "
+                  f"会话历史 {len(checkpoint.history)} 条")
+    
+    def _checkpoint_extra(self) -> dict:
+        """需要随检查点一起保存的Agent侧状态（动作历史和轨迹作为只追加列表单独增量保存）"""
+        return {
+            "replay_index": self._replay_index,
+            "replayed_steps": self.replayed_steps,
+            "model_calls": self.model_calls,
+            "actions_executed": self.actions_executed,
+            "settle_times": self.settle_times,
+            "plan_feedback": self._plan_feedback,
+        }
+    
+    def cancel(self, reason: str = "") -> None:
+        """请求停止：进行中的模型请求和等待立即中止，不再发送新的输入"""
+        self.cancel_token.cancel(reason)
+    
+    def _emit(self, kind: str, **data) -> None:
+        """发布一条事件（没有事件总线时不做任何事）"""
+        if self.events is not None:
+            self.events.publish(AgentEvent(kind, self.run_id, self.current_step, data))
+    
+    # 日志级别按消息开头的图标区分
+    _LOG_LEVELS = (("❌", "error"), ("⚠️", "warning"), ("✅", "success"), ("🎉", "success"))
+    
+    def _log(self, message: str, level: str | None = None) -> None:
+        """输出一行日志：有事件总线时发布 LOG 事件，否则打印到控制台"""
+        if self.events is None:
+            print(message)
+            return
+        if level is None:
+            text = message.lstrip()
+            level = next((name for icon, name in self._LOG_LEVELS if text.startswith(icon)), "info")
+        self._emit(LOG, message=message, level=level)
+    
+    def _node(self, name: str, fn):
+        """包装图节点：进入节点前检查取消，并记录节点耗时"""
+        def wrapper(state: AgentState) -> AgentState:
+            self.cancel_token.raise_if_cancelled()
+            with self.tracer.span(f"node.{name}", "node"):
+                return fn(state)
+        return wrapper
+    
+    def _checkpointed(self, node: str, fn):
+        """包装图节点：节点返回后写入检查点"""
+        def wrapper(state: AgentState) -> AgentState:
+            result = fn(state)
+            with self.tracer.span("checkpoint", "agent", node=node):
+                self.checkpointer.save(
+                    self.run_id, node,
+                    {key: value for key, value in result.items() if key != "plan"},
+                    self.lvm_chat.conversation_history,
+                    self.lvm_chat.compact_message,
+                    self._checkpoint_extra(),
+                    {"action_history": self.action_history, "trajectory": self.trajectory.steps}
+                )
+            return result
+        return wrapper
     
     def normalize_coords(self, x: int, y: int) -> tuple[int, int]:
-        """将归一化坐标(0-1000)转换为实际像素坐标"""
-        actual_x = int(x / 1000.0 * self.screen_width)
-        actual_y = int(y / 1000.0 * self.screen_height)
-        print(f"   归一化坐标 ({x}, {y}) -> 实际坐标 ({actual_x}, {actual_y})")
+        """
+        将归一化坐标(0-1000)转换为实际像素坐标
+        
+        模型看到的是缩放后的上传图，坐标先落到上传图像素上，
+        再按记录的缩放比例还原到原始截图，最后映射到屏幕（兼容截图与屏幕DPI不一致）
+        """
+        image = self.current_image
+        if image is not None:
+            enc_w, enc_h = image.encoded_size
+            src_x, src_y = image.to_source(x / 1000.0 * enc_w, y / 1000.0 * enc_h)
+            src_w, src_h = image.source_size
+            actual_x = int(src_x * self.screen_width / src_w)
+            actual_y = int(src_y * self.screen_height / src_h)
+        else:
+            actual_x = int(x / 1000.0 * self.screen_width)
+            actual_y = int(y / 1000.0 * self.screen_height)
+        actual_x = min(max(actual_x, 0), self.screen_width - 1)
+        actual_y = min(max(actual_y, 0), self.screen_height - 1)
+        self._log(f"   归一化坐标 ({x}, {y}) -> 实际坐标 ({actual_x}, {actual_y})")
         return actual_x, actual_y
         
+    def _grab_for_settle(self):
+        """稳定检测用的抓帧：有截图服务时取其新帧，否则直接抓取"""
+        if self.capture_service is not None and self.capture_service.running:
+            frame = self.capture_service.frame_after(time.monotonic(), timeout=0.5)
+            if frame is not None:
+                return frame
+        return self.operation.grab()
+    
     def take_screenshot(self, state: AgentState) -> AgentState:
-        """步骤1: 截图并保存"""
+        """步骤1: 截图（内存帧），按需在后台保存"""
         step = state.get("step", 0) + 1
+        self.tracer.step = step
+        self.current_step = step
+        self._emit(STEP_STARTED)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        screenshot_path = str(self.s_dir / f"step_{step}_{timestamp}.png")
+        screenshot_path = str(self.s_dir / f"step_{step}_{timestamp}.png") if self.save_screenshots else ""
         
-        self.operation.screenshot(screenshot_path)
+        frame = None
+        with self.tracer.span("capture", "capture"):
+            if self.capture_service is not None:
+                # 取上一个动作执行完之后才开始抓取的第一帧，避免拿到旧画面
+                frame = self.capture_service.frame_after(self._last_action_time)
+            if frame is not None:
+                self.operation.save_frame(frame, screenshot_path or None)
+            else:
+                frame = self.operation.screenshot(screenshot_path or None)
+        self.current_frame = frame
+        self._emit(SCREENSHOT, path=screenshot_path, width=frame.width, height=frame.height, frame=frame)
+        self.current_fingerprint = None
+        if self.record_trajectory or self.replay is not None or self.decision_cache is not None:
+            with self.tracer.span("fingerprint", "capture"):
+                self.current_fingerprint = dhash(frame)
         
         return {
             **state,
@@ -73,171 +321,319 @@ class GUIAgent:
         from datetime import datetime
         
         step_start_time = datetime.now()
-        prompt = COMPUTER_USE_UITARS.format(instruction=state["instruction"])
+        if self.multi_action:
+            prompt = COMPUTER_USE_UITARS_MULTI.format(instruction=state["instruction"],
+                                                      max_actions=self.max_actions_per_turn)
+        else:
+            prompt = COMPUTER_USE_UITARS.format(instruction=state["instruction"])
+        
+        # 回放模式：画面指纹与轨迹一致时直接执行记录的动作
+        replayed = self._next_replay_decision(state["step"])
+        if replayed is not None:
+            return self._apply_offline_decision(state, prompt, *replayed, source="replay")
+        
+        if self.decision_cache is not None:
+            cached = self.decision_cache.lookup(state["instruction"], self.action_history,
+                                                self.current_fingerprint, self.current_frame)
+            if cached is not None:
+                self._log(f"\n📸 Step {state['step']} - 💾 命中决策缓存，跳过模型调用")
+                return self._apply_offline_decision(state, prompt, *cached, source="cache")
+        
+        if self._plan_feedback:
+            # 告诉模型上一轮的动作列表在哪里中断
+            prompt += f"\n## Previous Plan\n{self._plan_feedback}\n"
+            self._plan_feedback = None
         
         # 调用多模态模型（use_history=True 自动保留上下文）
+        # 多动作模式下响应是动作列表，不做单个Action的提前执行
+        early_dispatch = self.streaming and not self.multi_action
+        self._early_action = None
+        self.model_calls += 1
         response, usage_info = self.lvm_chat.get_multimodal_response(
             text=prompt,
-            image_paths=state["screenshot_path"],
+            image_paths=self.current_frame,
             res_format="json",
-            use_history=True# 启用会话历史，模型会记住之前的所有交互
+            use_history=True,# 启用会话历史，模型会记住之前的所有交互
+            stream=self.streaming,
+            on_action=self._dispatch_early if early_dispatch else None
         )
+        self.current_image = self.lvm_chat.last_image
         
         step_end_time = datetime.now()
         duration = (step_end_time - step_start_time).total_seconds()
         
         # 打印详细的步骤信息
-        print(f"\n📸 Step {state['step']} - 模型响应:")
-        print(f"⏱️  时间: {step_start_time.strftime('%H:%M:%S')} - {step_end_time.strftime('%H:%M:%S')} (耗时: {duration:.2f}秒)")
-        print(f"🔢 Token使用: 输入={usage_info.get('input_tokens', 0)}, 输出={usage_info.get('output_tokens', 0)}, 总计={usage_info.get('total_tokens', 0)}")
-        print(f"📝 响应内容:\n{response}\n")
+        self._log(f"\n📸 Step {state['step']} - 模型响应:")
+        self._log(f"⏱️  时间: {step_start_time.strftime('%H:%M:%S')} - {step_end_time.strftime('%H:%M:%S')} (耗时: {duration:.2f}秒)")
+        self._log(f"🔢 Token使用: 输入={usage_info.get('input_tokens', 0)}, 输出={usage_info.get('output_tokens', 0)}, 总计={usage_info.get('total_tokens', 0)}")
+        if 'time_to_action' in usage_info:
+            self.time_to_action.append(usage_info['time_to_action'])
+            self._log(f"⚡ 动作就绪: {usage_info['time_to_action']:.2f}秒, 完整响应: {usage_info['completion_time']:.2f}秒")
+        if 'request_bytes' in usage_info:
+            self.request_sizes.append(usage_info['request_bytes'])
+            self._log(f"📦 请求大小: {usage_info['request_bytes'] / 1024:.1f}KB, "
+                      f"约 {usage_info['request_tokens_est']} tokens, "
+                      f"{usage_info['request_images']} 张图片, {usage_info['request_messages']} 条消息")
+        if self.current_image is not None:
+            enc_w, enc_h = self.current_image.encoded_size
+            self._log(f"🖼️  上传图片: {enc_w}x{enc_h}, {self.current_image.num_bytes / 1024:.1f}KB")
+        self._log(f"📝 响应内容:\n{response}\n")
         
-        # 解析JSON响应
-        try:
-            result = json.loads(response)
-            thought = result.get("Thought", "")
-            action = result.get("Action", "")
-        except json.JSONDecodeError:
-            # 如果不是JSON格式，尝试正则提取
-            thought_match = re.search(r'"?Thought"?\s*[:：]\s*"?([^"]*)"?', response, re.DOTALL)
-            action_match = re.search(r'"?Action"?\s*[:：]\s*"?([^"]*)"?', response, re.DOTALL)
-            thought = thought_match.group(1).strip() if thought_match else ""
-            action = action_match.group(1).strip() if action_match else ""
-            
-            # 如果还是找不到，尝试更宽松的匹配
-            if not action:
-                # 查找包含动作的行
-                lines = response.split('\n')
-                for line in lines:
-                    if any(cmd in line for cmd in ['click(', 'type(', 'hotkey(', 'scroll(', 'finished(']):
-                        action = line.strip()
-                        break
+        # 解析响应（JSON优先，格式不规范时按 Thought/Action 键扫描）
+        plan: list[PlannedAction] = []
+        with self.tracer.span("parse", "agent"):
+            if self.multi_action:
+                thought, plan = parse_plan(response, self.max_actions_per_turn)
+                action = plan[0].action if plan else ""
+            else:
+                thought, action = parse_response(response)
+        
+        self._emit(USAGE, **usage_info)
+        self._emit(MODEL_RESPONSE, thought=thought, action=action, response=response, source="model",
+                   duration=duration)
+        
+        if self.decision_cache is not None and action:
+            self.decision_cache.store(state["instruction"], self.action_history,
+                                      self.current_fingerprint, thought, action, self.current_frame)
+        self.action_history.append(action)
         
         return {
             **state,
             "thought": thought,
-            "action": action
+            "action": action,
+            "plan": plan
         }
     
+    def _next_replay_decision(self, step: int) -> tuple[str, str] | None:
+        """取回放轨迹的下一步；画面指纹不一致时退出回放，后续改为实时调用模型"""
+        self._replay_settle = None
+        if self.replay is None or self._replay_index >= len(self.replay.steps):
+            return None
+        recorded = self.replay.steps[self._replay_index]
+        distance = hamming(self.current_fingerprint, recorded.fingerprint)
+        if distance > self.replay_max_distance:
+            distance = self._await_replay_screen(recorded.fingerprint)
+        if distance > self.replay_max_distance:
+            self._log(f"⚠️ Step {step} 画面与轨迹不一致（指纹距离 {distance}），退出回放，改用模型决策")
+            self.replay = None
+            return None
+        self._replay_index += 1
+        self.replayed_steps += 1
+        self._replay_settle = recorded.settle_time
+        self._log(f"\n📸 Step {step} - ⏩ 回放轨迹第 {recorded.step} 步（指纹距离 {distance}）")
+        return recorded.thought, recorded.action
+    
+    def _await_replay_screen(self, fingerprint: int) -> int:
+        """
+        画面与轨迹不一致时先等画面跟上再判断：界面比录制时慢，截图可能早于上一步引起的切换。
+        最多等到上一步录制的稳定耗时或稳定检测超时（取较长者），返回最后一次的指纹距离
+        """
+        previous = self.replay.steps[self._replay_index - 1].settle_time if self._replay_index else 0.0
+        deadline = time.monotonic() + max(previous, self.settle_detector.timeout)
+        distance = hamming(self.current_fingerprint, fingerprint)
+        while distance > self.replay_max_distance and time.monotonic() < deadline:
+            self._wait_for_settle()
+            self.current_frame = self._grab_for_settle()
+            self.current_fingerprint = dhash(self.current_frame)
+            distance = hamming(self.current_fingerprint, fingerprint)
+        return distance
+    
+    def _apply_offline_decision(self, state: AgentState, prompt: str, thought: str, action: str,
+                                source: str) -> AgentState:
+        """使用无需调用模型的决策（回放/缓存命中），并写入会话历史保证之后的模型调用上下文连续"""
+        self._log(f"📝 Thought: {thought}\n   Action: {action}\n")
+        self._emit(MODEL_RESPONSE, thought=thought, action=action, response="", source=source, duration=0.0)
+        self.lvm_chat.record_turn(
+            prompt, self.current_frame,
+            json.dumps({"Thought": thought, "Action": action}, ensure_ascii=False)
+        )
+        self.current_image = self.lvm_chat.last_image
+        self.action_history.append(action)
+        return {**state, "thought": thought, "action": action, "plan": []}
+    
+    def _record_step(self, state: AgentState, action: str, settle_time: float) -> None:
+        """记录轨迹的一步"""
+        if self.record_trajectory and self.current_fingerprint is not None:
+            self.trajectory.add(TrajectoryStep(
+                step=state["step"],
+                thought=state.get("thought", ""),
+                action=action,
+                fingerprint=self.current_fingerprint,
+                settle_time=round(settle_time, 3)
+            ))
+    
+    def _dispatch_early(self, action: str) -> None:
+        """流式回调：Action 完整出现时立即提交执行，不等待响应结束"""
+        if not action or action.startswith("finished("):
+            return
+        self.current_image = self.lvm_chat.last_image
+        self._log(f"⚡ 提前执行动作: {action}")
+        self._early_action = (action, self._executor.submit(self._parse_and_execute, action))
+    
     def execute_action(self, state: AgentState) -> AgentState:
         """步骤3: 解析并执行动作"""
-        action = state["action"]
+        if len(state.get("plan") or []) > 1:
+            return self._execute_plan(state)
         
-        if not action:
-            print("⚠️ 没有可执行的动作")
-            return {**state, "finished": True}
-        
-        # 检查是否完成
-        if action.startswith("finished("):
-            content_match = re.search(r"finished\(content='([^']*)'\)", action)
-            content = content_match.group(1) if content_match else"任务完成"
-            print(f"✅ 任务完成: {content}")
-            return {**state, "finished": True}
+        action = state["action"]
+        settle = None
+        error = None
         
-        # 解析并执行动作
-        try:
-            self._parse_and_execute(action)
-        except Exception as e:
-            print(f"❌ 执行动作失败: {e}")
-            print(f"   动作: {action}")
-        
-        return state
-    
-    def _parse_and_execute(self, action: str):
-        """解析动作字符串并执行"""
-        print(f"🔧 执行动作: {action}")
-        
-        # click(point='<point>x y</point>') 或 click(point='x y')
-        if action.startswith("click("):
-            # 尝试带标签的格式
-            point_match = re.search(r"<point>(\d+)\s+(\d+)</point>", action)
-            if not point_match:
-                # 尝试不带标签的格式
-                point_match = re.search(r"point=['\"](\d+)\s+(\d+)['\"]", action)
+        if self._early_action is not None:
+            # 流式模式下动作已经提前执行，等待其完成即可
+            early_action, future = self._early_action
+            self._early_action = None
+            if early_action != action:
+                self._log(f"⚠️ 完整响应中的动作与提前执行的动作不一致，以已执行的为准: {early_action}")
+                action = early_action
+            try:
+                settle = future.result()
+            except Exception as e:
+                error = e
+                self._log(f"❌ 执行动作失败: {e}")
+                self._log(f"   动作: {action}")
+        else:
+            if not action:
+                self._log("⚠️ 没有可执行的动作")
+                return {**state, "finished": True}
             
-            if point_match:
-                x, y = int(point_match.group(1)), int(point_match.group(2))
-                actual_x, actual_y = self.normalize_coords(x, y)
-                self.operation.click(actual_x, actual_y)
-            else:
-                print(f"⚠️ 无法解析点击坐标: {action}")
-        
-        # left_double(point='<point>x y</point>') 或 double_click(point='x y')
-        elif action.startswith("left_double("):
-            # 尝试带标签的格式
-            point_match = re.search(r"<point>(\d+)\s+(\d+)</point>", action)
-            if not point_match:
-                # 尝试不带标签的格式
-                point_match = re.search(r"point=['\"](\d+)\s+(\d+)['\"]", action)
+            # 检查是否完成
+            if action.startswith("finished("):
+                try:
+                    content = parse_action(action).content
+                except ActionParseError:
+                    content = None
+                self._log(f"✅ 任务完成: {content or '任务完成'}")
+                self._record_step(state, action, 0.0)
+                return {**state, "finished": True}
             
-            if point_match:
-                x, y = int(point_match.group(1)), int(point_match.group(2))
-                actual_x, actual_y = self.normalize_coords(x, y)
-                self.operation.double_click(actual_x, actual_y)
-            else:
-                print(f"⚠️ 无法解析双击坐标: {action}")
-        
-        # type(content='xxx')
-        elif action.startswith("type("):
-            content_match = re.search(r"content=['\"]([^'\"]*)['\"]", action)
-            if content_match:
-                text = content_match.group(1)
-                # 处理转义字符
-                text = text.replace(r"\'", "'").replace(r'\"', '"').replace(r"\n", "\n")
-                self.operation.input(text)
-        
-        # hotkey(key='ctrl c')
-        elif action.startswith("hotkey("):
-            key_match = re.search(r"key=['\"]([^'\"]*)['\"]", action)
-            if key_match:
-                keys = key_match.group(1).split()
-                self.operation.hotkey(*keys)
-        
-        # scroll(point='<point>x y</point>', direction='down') 或 scroll(point='x y', direction='down')
-        elif action.startswith("scroll("):
-            # 尝试带标签的格式
-            point_match = re.search(r"<point>(\d+)\s+(\d+)</point>", action)
-            if not point_match:
-                # 尝试不带标签的格式
-                point_match = re.search(r"point=['\"](\d+)\s+(\d+)['\"]", action)
-            
-            direction_match = re.search(r"direction=['\"]([^'\"]*)['\"]", action)
-            if point_match and direction_match:
-                x, y = int(point_match.group(1)), int(point_match.group(2))
-                actual_x, actual_y = self.normalize_coords(x, y)
-                direction = direction_match.group(1)
-                # 移动到位置并滚动
-                import pyautogui
-                pyautogui.moveTo(actual_x, actual_y)
-                scroll_amount = 3 if direction in ["up", "left"] else -3
-                pyautogui.scroll(scroll_amount)
-        
-        # wait()
-        elif action.startswith("wait("):
-            self.operation.wait(seconds=2)
-        
-        # drag(start_point='<point>x1 y1</point>', end_point='<point>x2 y2</point>')
-        elif action.startswith("drag("):
-            # 尝试带标签的格式
-            start_match = re.search(r"start_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", action)
-            end_match = re.search(r"end_point=['\"]<point>(\d+)\s+(\d+)</point>['\"]", action)
+            # 解析并执行动作
+            try:
+                settle = self._parse_and_execute(action)
+            except Exception as e:
+                error = e
+                self._log(f"❌ 执行动作失败: {e}")
+                self._log(f"   动作: {action}")
+        
+        self.actions_executed += 1
+        self._last_action_time = time.monotonic()
+        settle_time = settle.elapsed if settle else 0.0
+        self.settle_times.append(settle_time)
+        self._emit(ACTION, action=action, ok=error is None, error=str(error) if error else None,
+                   settle_time=settle_time)
+        self._record_step(state, action, settle_time)
+        return {**state, "action": action, "settle_time": settle_time}
+    
+    def _execute_plan(self, state: AgentState) -> AgentState:
+        """多动作模式：依次执行动作列表，每个动作后等待稳定；画面检查不通过或执行失败时中断，回到模型"""
+        plan: list[PlannedAction] = state["plan"]
+        self._log(f"📋 本轮计划 {len(plan)} 个动作")
+        before = self.current_frame
+        fingerprint = self.current_fingerprint
+        settle_time = 0.0
+        action = state["action"]
+        
+        for index, planned in enumerate(plan):
+            action = planned.action
+            if index > 0:
+                # 后续动作已由同一次模型调用决定，计入动作历史（决策缓存的上下文）
+                self.action_history.append(action)
+                self.current_fingerprint = fingerprint
+            if action.startswith("finished("):
+                try:
+                    content = parse_action(action).content
+                except ActionParseError:
+                    content = None
+                self._log(f"✅ 任务完成: {content or '任务完成'}")
+                self._record_step(state, action, 0.0)
+                return {**state, "action": action, "settle_time": settle_time, "plan": [], "finished": True}
             
-            if not start_match:
-                # 尝试不带标签的格式
-                start_match = re.search(r"start_point=['\"](\d+)\s+(\d+)['\"]", action)
-                end_match = re.search(r"end_point=['\"](\d+)\s+(\d+)['\"]", action)
+            self._log(f"▶️  动作 {index + 1}/{len(plan)}")
+            try:
+                settle = self._parse_and_execute(action)
+            except Exception as e:
+                self._log(f"❌ 执行动作失败: {e}")
+                self._log(f"   动作: {action}")
+                self._emit(ACTION, action=action, ok=False, error=str(e), settle_time=0.0)
+                self._plan_feedback = (f"Executed {index} of {len(plan)} planned actions. "
+                                       f"`{action}` failed, the remaining actions were skipped.")
+                break
+            self.actions_executed += 1
+            self._last_action_time = time.monotonic()
+            settle_time += settle.elapsed
+            self.settle_times.append(settle.elapsed)
+            self._emit(ACTION, action=action, ok=True, error=None, settle_time=settle.elapsed)
+            self._record_step(state, action, settle.elapsed)
             
-            if start_match and end_match:
-                x1, y1 = int(start_match.group(1)), int(start_match.group(2))
-                x2, y2 = int(end_match.group(1)), int(end_match.group(2))
-                actual_x1, actual_y1 = self.normalize_coords(x1, y1)
-                actual_x2, actual_y2 = self.normalize_coords(x2, y2)
-                import pyautogui
-                pyautogui.moveTo(actual_x1, actual_y1)
-                pyautogui.drag(actual_x2 - actual_x1, actual_y2 - actual_y1, duration=0.5)
-        
-        # 等待一下让界面响应
-        self.operation.wait(seconds=1)
+            if index == len(plan) - 1:
+                break
+            after = self._grab_for_settle()
+            if planned.expect_change and not screen_changed(before, after):
+                self._log(f"⚠️ 动作后画面没有变化，放弃剩余 {len(plan) - index - 1} 个动作，重新截图决策")
+                self._plan_feedback = (f"Executed {index + 1} of {len(plan)} planned actions. "
+                                       f"The screen did not change after `{action}`, "
+                                       f"so the remaining actions were skipped.")
+                break
+            before = after
+            if self.current_fingerprint is not None:
+                fingerprint = dhash(after)
+        
+        return {**state, "action": action, "settle_time": settle_time, "plan": []}
+    
+    def _wait_for_settle(self, **kwargs) -> SettleResult:
+        """等待画面稳定并打印实测耗时；回放的动作至少等到录制时画面稳定的时刻"""
+        if self._replay_settle is not None:
+            # 录制的耗时包含最后一段稳定窗口，这里只把之前的部分作为最短等待
+            recorded = self._replay_settle - self.settle_detector.stable_ms / 1000
+            kwargs["min_wait"] = max(kwargs.get("min_wait", self.settle_detector.min_wait), recorded)
+            self._replay_settle = None
+        with self.tracer.span("settle", "settle"):
+            result = self.settle_detector.wait(**kwargs)
+        status = "已稳定" if result.settled else "超时"
+        self._log(f"⏱️  画面{status}，等待 {result.elapsed:.2f} 秒（采样 {result.polls} 帧）")
+        return result
+    
+    def _parse_and_execute(self, action: str) -> SettleResult:
+        """解析动作字符串并通过处理表执行，返回动作后的画面稳定检测结果"""
+        self._log(f"🔧 执行动作: {action}")
+        try:
+            parsed = parse_action(action)
+        except ActionParseError as e:
+            self._log(f"⚠️ {e}")
+            return self._wait_for_settle()
+        
+        handler = self._handlers.get(parsed.name)
+        if handler is None:
+            self._log(f"⚠️ 不支持的动作: {parsed.name}")
+            return self._wait_for_settle()
+        result = handler(parsed)
+        # 等待界面响应完成（画面稳定检测，代替固定sleep）
+        return result if result is not None else self._wait_for_settle()
+    
+    def _do_click(self, action: Action) -> None:
+        self.operation.click(*self.normalize_coords(*action.point))
+    
+    def _do_double_click(self, action: Action) -> None:
+        self.operation.double_click(*self.normalize_coords(*action.point))
+    
+    def _do_right_click(self, action: Action) -> None:
+        self.operation.right_click(*self.normalize_coords(*action.point))
+    
+    def _do_type(self, action: Action) -> None:
+        self.operation.input(action.content)
+    
+    def _do_hotkey(self, action: Action) -> None:
+        self.operation.hotkey(*action.keys)
+    
+    def _do_scroll(self, action: Action) -> None:
+        self.operation.scroll(*self.normalize_coords(*action.point), action.direction)
+    
+    def _do_drag(self, action: Action) -> None:
+        self.operation.drag(*self.normalize_coords(*action.point), *self.normalize_coords(*action.end_point))
+    
+    def _do_wait(self, action: Action) -> SettleResult:
+        # wait() - 至少等待1秒，之后画面稳定即返回，最长5秒
+        return self._wait_for_settle(min_wait=1.0, timeout=5.0)
     
     def should_continue(self, state: AgentState) -> str:
         """判断是否继续循环"""
@@ -248,10 +644,12 @@ class GUIAgent:
         # 构建graph
         workflow = StateGraph(AgentState)
         
-        # 添加节点
-        workflow.add_node("screenshot", self.take_screenshot)
-        workflow.add_node("decide", self.model_decide)
-        workflow.add_node("execute", self.execute_action)
+        # 添加节点（启用检查点时每个节点结束后保存状态）
+        nodes = {"screenshot": self.take_screenshot, "decide": self.model_decide, "execute": self.execute_action}
+        for name, node in nodes.items():
+            if self.checkpointer is not None:
+                node = self._checkpointed(name, node)
+            workflow.add_node(name, self._node(name, node))
         
         # 添加边
         workflow.set_entry_point("screenshot")
@@ -269,19 +667,154 @@ class GUIAgent:
         # 编译并运行
         app = workflow.compile()
         
-        print(f"🚀 开始执行任务: {self.instruction}\n")
+        self._log(f"🚀 开始执行任务: {self.instruction}\n")
+        if self.checkpointer is not None:
+            self.checkpointer.begin(self.run_id, self.instruction)
+            self._log(f"💾 检查点: {self.checkpointer.path} (运行ID {self.run_id})")
+        # 预热模型连接，与第一次截图并行完成握手
+        self.lvm_chat.warmup()
         
-        # 设置递归限制为100步
-        config = {"recursion_limit": 100}
-        final_state = app.invoke(
-            {"instruction": self.instruction, "step": 0},
-            config=config
-        )
+        # 设置递归限制（默认100）
+        config = {"recursion_limit": self.recursion_limit}
+        owns_capture = self.capture_service is not None and not self.capture_service.running
+        if owns_capture:
+            self.capture_service.start()
+        try:
+            # 续跑时从最近完成的一步之后重新截图，中断时尚未确认执行的决策不会被重放
+            final_state = app.invoke(
+                self._resume_state or {"instruction": self.instruction, "step": 0},
+                config=config
+            )
+        except Cancelled:
+            if self.cancel_token.cancelled_at is not None:
+                self.cancel_latency = time.monotonic() - self.cancel_token.cancelled_at
+                self._log(f"⏹️ 任务已取消，{self.cancel_latency * 1000:.0f}ms 内停止")
+            self._emit(FINISHED, status=CANCELLED, steps=self.current_step, error=None)
+            raise
+        except Exception as e:
+            self._emit(FINISHED, status=FAILED, steps=self.current_step, error=str(e))
+            raise
+        finally:
+            if owns_capture:
+                self.capture_service.stop()
+            # 确保所有截图都已落盘（任务记录会引用这些文件）
+            self.operation.flush()
+        
+        if self.checkpointer is not None:
+            self.checkpointer.finish(self.run_id, RUN_FINISHED)
         
-        print(f"\n🎉 任务完成! 共执行 {final_state['step']} 步")
+        self._log(f"\n🎉 任务完成! 共执行 {final_state['step']} 步")
+        if self.actions_executed:
+            self._log(f"🔁 往返: 模型调用 {self.model_calls} 次, 执行动作 {self.actions_executed} 个 "
+                      f"(平均 {self.actions_executed / max(self.model_calls, 1):.2f} 个动作/次调用)")
+        stats = self.lvm_chat.usage_stats
+        self._log(f"🔌 模型请求: {stats['requests']} 次 (chat {stats['chat']} / responses {stats['responses']}), "
+                  f"重试 {stats['retries']} 次, 接口回退 {stats['fallbacks']} 次")
+        if self.request_sizes:
+            self._log(f"📦 请求大小: 平均 {sum(self.request_sizes) / len(self.request_sizes) / 1024:.1f}KB, "
+                      f"最大 {max(self.request_sizes) / 1024:.1f}KB")
+        if self.replayed_steps:
+            self._log(f"⏩ 回放步骤: {self.replayed_steps} 步无需调用模型")
+        if self.decision_cache is not None:
+            cache_stats = self.decision_cache.stats()
+            self._log(f"💾 决策缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次 "
+                      f"(命中率 {cache_stats['hit_rate']:.0%})")
+        if self.time_to_action:
+            self._log(f"⚡ 动作就绪耗时: 平均 {sum(self.time_to_action) / len(self.time_to_action):.2f} 秒/步")
+        for name, latency in self.operation.latency_summary().items():
+            self._log(f"🎛️  输入耗时 {name}: {latency['count']} 次, 平均 {latency['mean_ms']:.1f}ms, p95 {latency['p95_ms']:.1f}ms")
+        if self.checkpointer is not None:
+            ckpt = self.checkpointer.stats()
+            self._log(f"💾 检查点写入: {ckpt['writes']} 次, 平均 {ckpt['mean_ms']:.2f}ms, "
+                      f"p95 {ckpt['p95_ms']:.2f}ms, 最大 {ckpt['max_ms']:.2f}ms")
+        if self.settle_times:
+            self._log(f"⏱️  画面稳定等待: 合计 {sum(self.settle_times):.2f} 秒, "
+                      f"平均 {sum(self.settle_times) / len(self.settle_times):.2f} 秒/步")
+        if self.tracer.enabled:
+            self._log(f"🧭 分阶段耗时:\n{self.tracer.format_summary()}")
+        self._emit(FINISHED, status=COMPLETED, steps=final_state["step"], error=None)
         return final_state
 
 
+def run_batch(args, app_config) -> None:
+    """批量模式：多进程并发运行任务文件中的全部指令，每个工作进程使用独立的虚拟显示器"""
+    from core.worker_pool import WorkerConfig, WorkerPool, load_tasks, summarize
+    
+    tasks = load_tasks(args.batch)
+    config = WorkerConfig(
+        model_name=app_config.model_name,
+        api_key=app_config.api_key,
+        base_url=app_config.base_url,
+        agent_options={"multi_action": args.multi_action, "streaming": args.streaming},
+        fake_script=args.fake_script,
+        output_dir=args.output_dir
+    )
+    pool = WorkerPool(config, workers=args.workers, display_mode=args.display_mode,
+                      screen_size=tuple(args.screen_size), task_deadline=args.deadline)
+    print(f"📋 批量运行 {len(tasks)} 个任务, {args.workers} 个工作进程 ({args.display_mode})")
+    
+    results_path = Path(args.output_dir) / "results.jsonl"
+    with open(results_path, "w", encoding="utf-8") as f:
+        def on_result(result):
+            f.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+            f.flush()
+        results = pool.run(tasks, on_result=on_result)
+    
+    summary = summarize(results)
+    (Path(args.output_dir) / "summary.json").write_text(
+        json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n📊 成功率 {summary['success_rate']:.1%} ({summary['statuses']}), "
+          f"平均 {summary['steps_mean']} 步, 平均耗时 {summary['duration_mean']} 秒, "
+          f"每步 {summary['step_latency_mean']} 秒 (p95 {summary['step_latency_p95']} 秒)")
+    print(f"📁 结果: {results_path}")
+
+
 if __name__ == "__main__":
-    agent = GUIAgent(instruction="""打开edge浏览器查找bilibili, 搜索小米汽车，找到排序第一的视频并打开播放""")
-    agent.run()
\ No newline at end of file
+    import argparse
+    from core.config_manager import ConfigManager
+    
+    parser = argparse.ArgumentParser(description="GUI Agent")
+    parser.add_argument("instruction", nargs="?",
+                        default="打开edge浏览器查找bilibili, 搜索小米汽车，找到排序第一的视频并打开播放",
+                        help="单任务模式下的指令")
+    parser.add_argument("--batch", help="批量模式：任务文件（.txt 每行一条指令 / .jsonl），- 表示标准输入")
+    parser.add_argument("--workers", type=int, default=4, help="批量模式的并发工作进程数")
+    parser.add_argument("--display-mode", choices=["xvfb", "current", "fake"], default="xvfb",
+                        help="批量模式的显示器：每进程一个Xvfb / 当前桌面 / 假屏幕脚本")
+    parser.add_argument("--screen-size", type=int, nargs=2, default=[1920, 1080], metavar=("W", "H"))
+    parser.add_argument("--fake-script", help="假屏幕脚本（JSON），配合 --display-mode fake")
+    parser.add_argument("--deadline", type=float, default=600.0, help="单任务截止时间（秒）")
+    parser.add_argument("--output-dir", default="batch_runs", help="批量结果目录")
+    parser.add_argument("--multi-action", action="store_true", help="启用多动作模式")
+    parser.add_argument("--streaming", action="store_true", help="启用流式响应")
+    parser.add_argument("--checkpoint", action="store_true", help="单任务模式下每步保存检查点，可用 --resume 续跑")
+    parser.add_argument("--checkpoint-db", default="cache/checkpoints.db", help="检查点数据库路径")
+    parser.add_argument("--resume", metavar="RUN_ID", help="从检查点续跑（latest 表示最近一次未完成的运行）")
+    parser.add_argument("--trace", metavar="PATH", help="记录分阶段耗时并导出 Chrome trace JSON")
+    args = parser.parse_args()
+    
+    app_config = ConfigManager().load_config()
+    if args.batch:
+        run_batch(args, app_config)
+    else:
+        tracer = Tracer() if args.trace else None
+        options = dict(model_name=app_config.model_name,
+                       api_key=app_config.api_key,
+                       base_url=app_config.base_url,
+                       multi_action=args.multi_action,
+                       streaming=args.streaming,
+                       tracer=tracer)
+        if args.resume:
+            checkpointer = AgentCheckpointer(args.checkpoint_db)
+            run_id = checkpointer.latest_run() if args.resume == "latest" else args.resume
+            if run_id is None:
+                sys.exit("❌ 没有可续跑的运行")
+            agent = GUIAgent.resume(run_id, checkpointer, **options)
+        else:
+            checkpointer = AgentCheckpointer(args.checkpoint_db) if args.checkpoint else None
+            agent = GUIAgent(instruction=args.instruction, checkpointer=checkpointer, **options)
+        try:
+            agent.run()
+        finally:
+            if tracer is not None:
+                print(f"🧭 Chrome trace: {tracer.save_chrome_trace(args.trace)}")
@@ -0,0 +1,5 @@
+# tests/conftest.py
+
+import sys, os
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir)
@@ -0,0 +1,78 @@
+# tests/test_cancel.py
+
+import threading
+import time
+
+import pytest
+
+import utils.model_client
+from benchmarks.mock_server import MockConfig, MockModelServer
+from gui_operator.execute import Operation
+from gui_operator.fake_screen import FakeScreen
+from main import GUIAgent
+from utils.cancel import Cancelled
+
+# 停止到 Agent 线程空闲的上限（与 benchmarks/bench_cancel.py 的阈值一致）
+STOP_LIMIT = 0.3
+
+SCRIPT = {"size": [640, 480], "states": {"home": {"widgets": [
+    {"name": "search", "box": [100, 100, 500, 140], "kind": "input", "submit": "home"}]}}}
+UNAVAILABLE = (503, {"error": {"message": "Service temporarily unavailable"}})
+
+# 场景 -> (服务端行为, 是否流式, 何时算进入该阶段, 进入后再等待的秒数)
+SCENARIOS = {
+    # run() 刚开始（图构建、首次截图）：这里不能有不可取消的耗时工作（如导入重依赖）
+    "startup": (MockConfig(latency=30.0), False, lambda stats: True, 0.05),
+    # 模型请求进行中（服务端不响应）
+    "request": (MockConfig(latency=30.0), False, lambda stats: stats.requests >= 1, 0.1),
+    # 5xx 后的重试退避等待中
+    "backoff": (MockConfig(errors={"chat": UNAVAILABLE, "responses": UNAVAILABLE}), False,
+                lambda stats: stats.rejected >= 1, 0.1),
+    # 流式响应只发出一个分片后挂起
+    "stream": (MockConfig(stall_after_first_chunk=30.0), True, lambda stats: stats.streamed >= 1, 0.2),
+}
+
+
+def stop_to_idle(server: MockModelServer, streaming: bool, reached, settle: float, tmp_path) -> tuple[float, int]:
+    """运行 Agent，进入目标阶段后取消，返回 (取消到 run() 退出的秒数, 取消后收到的输入事件数)"""
+    screen = FakeScreen.from_script(SCRIPT)
+    agent = GUIAgent("在搜索框输入关键词", model_name="mock", api_key="mock", base_url=server.base_url,
+                     streaming=streaming, record_trajectory=False, save_screenshots=False,
+                     steps_dir=str(tmp_path / "steps"), operation=Operation(input_backend=screen, screen=screen))
+    agent.lvm_chat.warmup = lambda: None
+    done = threading.Event()
+    outcome: dict = {}
+
+    def run():
+        try:
+            agent.run()
+        except Cancelled:
+            outcome["cancelled"] = True
+        finally:
+            outcome["stopped_at"] = time.monotonic()
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not reached(server.stats):
+        assert time.monotonic() < deadline, "Agent 没有进入预期的阶段"
+        time.sleep(0.005)
+    time.sleep(settle)
+    assert not done.is_set(), "Agent 在取消前就结束了，场景没有停在预期的阶段"
+    events_before = len(screen.events)
+    cancelled_at = time.monotonic()
+    agent.cancel("test")
+    assert done.wait(10), "取消后 Agent 没有退出"
+    assert outcome.get("cancelled")
+    return outcome["stopped_at"] - cancelled_at, len(screen.events) - events_before
+
+
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+def test_stop_to_idle_latency(scenario, tmp_path, monkeypatch):
+    config, streaming, reached, settle = SCENARIOS[scenario]
+    # 退避固定为5秒，保证取消时正处于退避等待中
+    monkeypatch.setattr(utils.model_client, "backoff_delay", lambda attempt, policy: 5.0)
+    with MockModelServer(config) as server:
+        latency, stray_inputs = stop_to_idle(server, streaming, reached, settle, tmp_path)
+    assert latency < STOP_LIMIT, f"{scenario}: 取消到空闲耗时 {latency * 1000:.0f}ms"
+    assert stray_inputs == 0
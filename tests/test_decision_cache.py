@@ -0,0 +1,81 @@
+# tests/test_decision_cache.py
+
+import sqlite3
+
+from gui_operator.fake_screen import FakeScreen
+from gui_operator.fingerprint import dhash
+from utils.decision_cache import DecisionCache
+
+INSTRUCTION = "同意协议后点击确定"
+# 复选框在 (408, 308)，模型输出的归一化坐标为 (319, 428)
+CLICK_AGREE = "click(point='<point>319 428</point>')"
+
+
+def screen(checked: bool = False, query: str = "", focus_query: bool = False):
+    """只有复选框、输入框内容或焦点不同的画面"""
+    fake = FakeScreen.from_script({"size": [1280, 720], "states": {"form": {"widgets": [
+        {"name": "agree", "box": [400, 300, 416, 316], "color": "#202020" if checked else "#ffffff"},
+        {"name": "query", "box": [440, 296, 800, 320], "kind": "input", "text": query},
+        {"name": "ok", "box": [560, 500, 720, 540], "label": "确定"}]}}})
+    if focus_query:
+        fake.click(480, 310)
+    return fake.grab()
+
+
+def test_small_change_at_target_is_a_miss(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.db"))
+    before = screen()
+    cache.store(INSTRUCTION, [], dhash(before), "勾选同意", CLICK_AGREE, before)
+
+    checked = screen(checked=True)
+    # 整屏指纹分辨不出勾选状态，只能靠目标区域指纹
+    assert dhash(checked) == dhash(before)
+    assert cache.lookup(INSTRUCTION, [], dhash(checked), checked) is None
+    assert cache.lookup(INSTRUCTION, [], dhash(before), screen()) == ("勾选同意", CLICK_AGREE)
+
+
+def test_text_and_focus_changes_at_target_are_misses(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.db"))
+    click_query = "click(point='<point>375 430</point>')"
+    before = screen()
+    cache.store(INSTRUCTION, [], dhash(before), "点击输入框", click_query, before)
+
+    for changed in (screen(query="hello world"), screen(focus_query=True)):
+        assert cache.lookup(INSTRUCTION, [], dhash(changed), changed) is None
+
+
+def test_point_actions_need_a_frame_to_hit(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.db"))
+    frame = screen()
+    cache.store(INSTRUCTION, [], dhash(frame), "勾选同意", CLICK_AGREE, frame)
+    cache.store(INSTRUCTION, ["hotkey(key='enter')"], dhash(frame), "提交", "hotkey(key='enter')", frame)
+
+    assert cache.lookup(INSTRUCTION, [], dhash(frame)) is None
+    # 不带坐标的动作只比对整屏指纹
+    assert cache.lookup(INSTRUCTION, ["hotkey(key='enter')"], dhash(frame)) == ("提交", "hotkey(key='enter')")
+
+
+def test_whole_screen_match_is_exact_by_default(tmp_path):
+    cache = DecisionCache(str(tmp_path / "decisions.db"))
+    cache.store(INSTRUCTION, [], 0b1010, "提交", "hotkey(key='enter')")
+
+    assert cache.lookup(INSTRUCTION, [], 0b1011) is None
+    assert cache.lookup(INSTRUCTION, [], 0b1010) == ("提交", "hotkey(key='enter')")
+
+
+def test_old_database_without_region_is_cleared(tmp_path):
+    path = str(tmp_path / "decisions.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE decisions (id INTEGER PRIMARY KEY AUTOINCREMENT, context TEXT NOT NULL, "
+                 "phash INTEGER NOT NULL, thought TEXT NOT NULL, action TEXT NOT NULL, "
+                 "created REAL NOT NULL, last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO decisions (context, phash, thought, action, created, last_used) "
+                 "VALUES ('x', 0, 't', 'a', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = DecisionCache(path)
+    frame = screen()
+    cache.store(INSTRUCTION, [], dhash(frame), "勾选同意", CLICK_AGREE, frame)
+    assert cache.lookup(INSTRUCTION, [], dhash(frame), frame) == ("勾选同意", CLICK_AGREE)
+    assert cache._conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0] == 1
@@ -0,0 +1,44 @@
+# tests/test_events.py
+
+from core.events import EventBus, LOG
+from gui_operator.execute import Operation
+from gui_operator.fake_screen import FakeScreen
+from main import GUIAgent
+
+SCRIPT = {"size": [640, 480], "states": {"home": {"widgets": [
+    {"name": "next", "box": [100, 100, 200, 140], "kind": "button", "click": "home"}]}}}
+
+
+def make_agent(tmp_path, bus: EventBus) -> GUIAgent:
+    screen = FakeScreen.from_script(SCRIPT)
+    return GUIAgent("点击下一步", model_name="mock", api_key="mock", base_url="http://127.0.0.1:9/v1",
+                    record_trajectory=False, save_screenshots=False, steps_dir=str(tmp_path / "steps"),
+                    operation=Operation(input_backend=screen, screen=screen), run_id="run-1", events=bus)
+
+
+def test_operation_click_log_is_published_as_log_event(tmp_path, capsys):
+    bus = EventBus()
+    subscription = bus.subscribe(kinds=[LOG])
+    agent = make_agent(tmp_path, bus)
+    subscription.drain()
+
+    agent.operation.click(150, 120)
+
+    events = subscription.drain()
+    assert [event.data["message"] for event in events] == ["🖱️  点击坐标 (150, 120)"]
+    assert events[0].run_id == "run-1"
+    assert events[0].data["level"] == "info"
+    # 有事件总线时不再打印到控制台
+    assert "点击坐标" not in capsys.readouterr().out
+
+
+def test_model_retry_log_is_published_as_log_event(tmp_path):
+    bus = EventBus()
+    subscription = bus.subscribe(kinds=[LOG])
+    agent = make_agent(tmp_path, bus)
+    subscription.drain()
+
+    agent.lvm_chat._on_retry(1, TimeoutError("read timeout"))
+
+    messages = [event.data["message"] for event in subscription.drain()]
+    assert messages == ["🔁 请求失败，第 1 次重试: read timeout"]
@@ -0,0 +1,66 @@
+# tests/test_input_backend.py
+
+from types import SimpleNamespace
+
+from gui_operator.input_backend import InputBackend, Pacing, XTestBackend
+
+SPARE = 250
+KEY_PRESS, KEY_RELEASE = 2, 3
+
+
+class FakeDisplay:
+    """
+    模拟X服务器：改键码映射立即生效（XKB 客户端直接向服务器查询映射），
+    按键事件则在 sync() 时才被应用读取并按当时的映射翻译成字符
+    """
+
+    def __init__(self):
+        self.mapping: dict[int, int] = {}
+        self.pending: list[tuple[int, int]] = []
+        self.typed: list[str] = []
+        self.calls: list[str] = []
+
+    def keysym_to_keycodes(self, keysym: int):
+        return []
+
+    def change_keyboard_mapping(self, first: int, keysyms: list) -> None:
+        assert XTestBackend._remap_lock.locked(), "改映射时没有持有锁"
+        self.calls.append("remap")
+        self.mapping[first] = keysyms[0][0]
+
+    def fake_input(self, event_type: int, detail: int) -> None:
+        self.calls.append("press" if event_type == KEY_PRESS else "release")
+        self.pending.append((event_type, detail))
+
+    def sync(self) -> None:
+        self.calls.append("sync")
+        for event_type, keycode in self.pending:
+            keysym = self.mapping.get(keycode, 0)
+            if event_type == KEY_PRESS and keysym:
+                self.typed.append(chr(keysym & 0xffffff))
+        self.pending.clear()
+
+
+def make_backend() -> tuple[XTestBackend, FakeDisplay]:
+    """不连接X服务器，直接用假的 display 构造 XTest 后端"""
+    display = FakeDisplay()
+    backend = XTestBackend.__new__(XTestBackend)
+    InputBackend.__init__(backend, Pacing(remap_interval=0.0))
+    backend._display = display
+    backend._X = SimpleNamespace(KeyPress=KEY_PRESS, KeyRelease=KEY_RELEASE)
+    backend._xtest = SimpleNamespace(fake_input=lambda d, event_type, detail, x=0, y=0: d.fake_input(event_type, detail))
+    backend._spare_keycode = SPARE
+    return backend, display
+
+
+def test_consecutive_non_ascii_characters_each_type_their_own_glyph():
+    backend, display = make_backend()
+
+    backend.type_text("你好")
+
+    assert display.typed == ["你", "好"]
+    # 每个字符：改映射后同步再按键，按键同步后才允许下一次改映射；最后恢复为空映射
+    per_char = ["sync", "remap", "sync", "press", "release", "sync"]
+    assert display.calls == per_char * 2 + ["sync", "remap", "sync"]
+    assert display.mapping[SPARE] == 0
+    assert not XTestBackend._remap_lock.locked()
@@ -0,0 +1,56 @@
+# tests/test_replay.py
+
+import pytest
+
+from gui_operator.execute import Operation
+from gui_operator.fake_screen import FakeScreen
+from gui_operator.fingerprint import dhash
+from main import GUIAgent
+from utils.trajectory import Trajectory, TrajectoryStep
+
+SCRIPT = {"size": [640, 480], "states": {
+    "home": {"widgets": [{"name": "next", "box": [100, 100, 200, 140], "click": "done"}]},
+    "done": {"widgets": [{"name": "result", "box": [40, 200, 600, 440], "color": "#303030"}]}}}
+# 点击后界面要 0.6 秒才切换（比稳定检测默认的 0.1 秒最短等待 + 0.3 秒稳定窗口更慢）
+SLOW_UI = 0.6
+
+
+def trajectory(settle_time: float) -> Trajectory:
+    """在慢界面上录制的两步轨迹：点击下一步，然后完成"""
+    home = FakeScreen.from_script(SCRIPT).grab()
+    done = FakeScreen.from_script({**SCRIPT, "initial": "done"}).grab()
+    return Trajectory("点击下一步", (640, 480), [
+        TrajectoryStep(1, "点击下一步", "click(point='<point>234 250</point>')", dhash(home), settle_time),
+        TrajectoryStep(2, "已完成", "finished(content='完成')", dhash(done)),
+    ])
+
+
+def replay(tmp_path, recorded: Trajectory) -> tuple[GUIAgent, FakeScreen]:
+    screen = FakeScreen.from_script(SCRIPT, transition_delay=SLOW_UI)
+    # 模型地址不可达：一旦误判为偏离轨迹而调用模型，运行就会失败
+    agent = GUIAgent("点击下一步", model_name="mock", api_key="mock", base_url="http://127.0.0.1:9/v1",
+                     record_trajectory=False, save_screenshots=False, steps_dir=str(tmp_path / "steps"),
+                     operation=Operation(input_backend=screen, screen=screen), replay=recorded)
+    agent.lvm_chat.warmup = lambda: None
+    agent.run()
+    return agent, screen
+
+
+def test_replay_waits_for_recorded_settle_time(tmp_path):
+    agent, screen = replay(tmp_path, trajectory(settle_time=SLOW_UI + 0.3))
+
+    assert agent.replayed_steps == 2
+    assert agent.model_calls == 0
+    # 执行后的等待不短于录制时的稳定耗时（减去稳定窗口），截图时界面已经切换
+    assert agent.settle_times[0] >= SLOW_UI
+    assert screen.state_name == "done"
+
+
+@pytest.mark.parametrize("settle_time", [0.0, 0.2])
+def test_replay_rechecks_before_reporting_divergence(tmp_path, settle_time):
+    # 录制的耗时比回放时的界面短：首次截图还是旧画面，应等画面稳定后重新比对，而不是退出回放
+    agent, screen = replay(tmp_path, trajectory(settle_time))
+
+    assert agent.replayed_steps == 2
+    assert agent.model_calls == 0
+    assert screen.state_name == "done"
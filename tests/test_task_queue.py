@@ -0,0 +1,29 @@
+# tests/test_task_queue.py
+
+import importlib
+import os
+import sys
+
+from core.task_queue import TaskQueue
+
+
+def test_enqueue_ids_are_unique_within_the_same_instant(tmp_path):
+    queue = TaskQueue(str(tmp_path / "queue.db"))
+    ids = [queue.enqueue(f"任务 {i}") for i in range(500)]
+    assert len(set(ids)) == len(ids)
+    assert all(queue.get(task_id) is not None for task_id in ids)
+
+
+def test_importing_web_app_creates_no_storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("web_app", None)
+    web_app = importlib.import_module("web_app")
+    try:
+        assert web_app.task_queue is None and web_app.task_catalog is None
+        assert not os.path.exists(tmp_path / "tasks")
+
+        web_app.init_storage()
+        assert os.path.exists(tmp_path / "tasks" / "queue.db")
+        assert os.path.exists(tmp_path / "tasks" / "catalog.db")
+    finally:
+        sys.modules.pop("web_app", None)
@@ -0,0 +1,34 @@
+# tests/test_upload_profile.py
+
+import base64
+import io
+
+from PIL import Image
+
+from gui_operator.fake_screen import FakeScreen
+from utils.model import DEFAULT_UPLOAD_PROFILE, UPLOAD_PROFILES, encode_image
+
+SCRIPT = {"size": [2560, 1440], "states": {"home": {"widgets": [
+    {"name": "next", "box": [100, 100, 200, 140]}]}}}
+
+
+def decode(data_url: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(data_url.split(",", 1)[1])))
+
+
+def test_default_profile_is_lossless_full_size():
+    frame = FakeScreen.from_script(SCRIPT).grab()
+    encoded = encode_image(frame, UPLOAD_PROFILES[DEFAULT_UPLOAD_PROFILE])
+
+    image = decode(encoded.data_url)
+    assert image.format == "PNG"
+    assert image.size == encoded.encoded_size == encoded.source_size == (2560, 1440)
+    assert image.convert("RGB").tobytes() == frame.rgb
+
+
+def test_lossy_profile_maps_coordinates_back_to_source():
+    frame = FakeScreen.from_script(SCRIPT).grab()
+    encoded = encode_image(frame, UPLOAD_PROFILES["balanced"])
+
+    assert encoded.encoded_size == (1920, 1080)
+    assert encoded.to_source(960, 540) == (1280, 720)
@@ -3,10 +3,16 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from PIL import Image, ImageTk
-import os
 from typing import Callable
 from core.config_manager import AppConfig
 from core.agent_controller import AgentController
+from core.events import (EventBus, EventFileLogger, LOG, SCREENSHOT, FINISHED,
+                         COMPLETED, CANCELLED)
+from core.warmup import warm_up
+
+# 事件轮询间隔（毫秒）和每次最多处理的事件数
+EVENT_POLL_MS = 50
+EVENT_BATCH = 200
 
 
 class MainWindow:
@@ -25,14 +31,17 @@ class MainWindow:
         self.config = config
         self.config_manager = config_manager
         
+        # 事件总线：Agent 线程只发布事件，界面在Tk主线程中定时取出处理
+        self.events = EventBus()
+        self.event_subscription = self.events.subscribe(kinds=(LOG, SCREENSHOT, FINISHED))
+        self.event_logger = EventFileLogger(self.events, "logs/events.jsonl").start()
+        
         # Agent控制器
         self.agent_controller = AgentController(
             api_key=config.api_key,
             base_url=config.base_url,
             model_name=config.model_name,
-            log_callback=self.update_log,
-            screenshot_callback=self.update_screenshot,
-            status_callback=self.update_status
+            events=self.events
         )
         
         # UI组件引用
@@ -61,6 +70,13 @@ class MainWindow:
         # 初始状态
         self.update_status("就绪", "gray")
         self.enable_controls(True)
+        
+        # 开始消费事件
+        self.root.after(EVENT_POLL_MS, self._poll_events)
+        
+        # 窗口显示后在后台预加载 Agent 依赖，第一次点击开始时无需等待导入
+        if config.warmup:
+            self.root.after_idle(warm_up)
     
     def setup_ui(self):
         """设置UI布局"""
@@ -261,6 +277,7 @@ class MainWindow:
         self.screenshot_step_label.config(text="")
         
         # 启动任务
+        self.update_status("执行中", "blue")
         self.agent_controller.start_task(task)
         
         # 添加到历史记录
@@ -295,6 +312,35 @@ class MainWindow:
         self.log_text.delete("1.0", tk.END)
         self.log_text.config(state=tk.DISABLED)
     
+    def _poll_events(self):
+        """在Tk主线程中处理积压的事件（截图只显示这一批中最新的一张）"""
+        try:
+            events = self.event_subscription.drain(EVENT_BATCH)
+            latest_screenshot = None
+            for event in events:
+                if event.kind == LOG:
+                    self.update_log(event.data["message"], event.data.get("level", "info"))
+                elif event.kind == SCREENSHOT:
+                    latest_screenshot = event
+                elif event.kind == FINISHED:
+                    self._on_finished(event.data)
+            if latest_screenshot is not None:
+                self.update_screenshot(latest_screenshot.data["frame"], latest_screenshot.step)
+        finally:
+            self.root.after(EVENT_POLL_MS, self._poll_events)
+    
+    def _on_finished(self, data: dict):
+        """任务结束事件：更新状态和日志"""
+        if data["status"] == COMPLETED:
+            self.update_status("已完成", "green")
+            self.update_log(f"任务完成！共执行 {data['steps']} 步", "success")
+        elif data["status"] == CANCELLED:
+            self.update_status("已停止", "orange")
+            self.update_log("任务已停止", "info")
+        else:
+            self.update_status("错误", "red")
+            self.update_log(f"执行错误: {data.get('error')}", "error")
+    
     def update_log(self, message: str, level: str = "info"):
         """
         更新日志
@@ -308,20 +354,17 @@ class MainWindow:
         self.log_text.see(tk.END)  # 自动滚动到底部
         self.log_text.config(state=tk.DISABLED)
     
-    def update_screenshot(self, image_path: str, step: int):
+    def update_screenshot(self, frame, step: int):
         """
         更新截图显示
         
         Args:
-            image_path: 截图文件路径
+            frame: 截图（内存帧，来自 SCREENSHOT 事件，无需等待落盘）
             step: 步骤编号
         """
-        if not os.path.exists(image_path):
-            return
-        
         try:
             # 加载图片
-            image = Image.open(image_path)
+            image = Image.frombytes("RGB", frame.size, frame.rgb)
             
             # 获取显示区域大小
             label_width = self.screenshot_label.winfo_width()
@@ -355,7 +398,7 @@ class MainWindow:
             self.screenshot_step_label.config(text=f"步骤 {step}")
             
             # 保存当前截图信息
-            self.current_screenshot_path = image_path
+            self.current_screenshot_path = frame.path
             self.current_step = step
             
         except Exception as e:
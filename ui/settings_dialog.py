@@ -2,6 +2,7 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+from dataclasses import replace
 from typing import Optional
 from core.config_manager import AppConfig
 
@@ -149,8 +150,9 @@ class SettingsDialog:
         base_url = self.base_url_entry.get().strip()
         model_name = self.model_name_entry.get().strip()
         
-        # 创建新配置对象（保留历史记录）
-        config = AppConfig(
+        # 创建新配置对象（保留历史记录和其他设置）
+        config = replace(
+            self.current_config,
             api_key=api_key,
             base_url=base_url,
             model_name=model_name if model_name else "your-model-name",
@@ -0,0 +1,343 @@
+# utils/action_parser.py
+
+import json
+import re
+from dataclasses import dataclass
+
+
+class ActionStreamParser:
+    """
+    流式响应的增量解析器
+
+    逐块喂入模型输出，跟踪JSON字符串/键值结构，
+    一旦顶层 "Action" 字段的字符串值完整出现就立即返回，无需等待整个响应结束
+    """
+
+    def __init__(self, key: str = "Action"):
+        self.key = key
+        self.buffer = ""
+        self.action: str | None = None
+        self._pos = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key_candidate: str | None = None  # 刚结束、可能是键的字符串
+        self._current_key: str | None = None  # 冒号之后正在等待值的键
+
+    def feed(self, chunk: str) -> str | None:
+        """
+        喂入一段增量文本
+
+        Returns:
+            Action值首次完整时返回该值，其余情况返回None
+        """
+        if self.action is not None or not chunk:
+            return None
+        self.buffer += chunk
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    value = buffer[self._string_start:i]
+                    if self._current_key is not None:
+                        key, self._current_key = self._current_key, None
+                        if key == self.key:
+                            self._pos = i + 1
+                            self.action = _unescape(value)
+                            return self.action
+                    else:
+                        self._key_candidate = value
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch in ":：" and self._key_candidate is not None:
+                self._current_key = self._key_candidate
+                self._key_candidate = None
+            elif not ch.isspace():
+                self._key_candidate = None
+                self._current_key = None
+        self._pos = len(buffer)
+        return None
+
+
+def _unescape(raw: str) -> str:
+    """按JSON规则还原字符串中的转义字符"""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+
+# ---------------------------------------------------------------------------
+# 动作解析：单次扫描把动作字符串解析为 Action 对象
+# ---------------------------------------------------------------------------
+
+# COMPUTER_USE_UITARS 提示词中的动作空间
+ACTION_SPACE = ("click", "left_double", "right_single", "drag", "hotkey",
+                "type", "scroll", "wait", "finished")
+
+# 模型常见的别名写法
+ACTION_ALIASES = {
+    "left_single": "click",
+    "double_click": "left_double",
+    "right_click": "right_single",
+    "select": "drag",
+    "press": "hotkey",
+    "key": "hotkey",
+    "call_user": "finished",
+}
+
+# 无参数名时，位置参数依次对应的参数名
+POSITIONAL_PARAMS = {
+    "click": ("point",),
+    "left_double": ("point",),
+    "right_single": ("point",),
+    "drag": ("start_point", "end_point"),
+    "hotkey": ("key",),
+    "type": ("content",),
+    "scroll": ("point", "direction"),
+    "wait": (),
+    "finished": ("content",),
+}
+
+# 动作调用：名称 + 左括号
+_CALL_RE = re.compile(r"\b(?P<name>[a-z_]+)\s*\(")
+# 规范写法（全部为 key='值' 且值内无引号/转义）的快速路径，一次匹配取出全部参数
+_CANONICAL_RE = re.compile(
+    r"(?P<name>[a-z_]+)\((?:(?P<k1>[a-z_]+)='(?P<v1>[^'\\]*)'"
+    r"(?:,\s*(?P<k2>[a-z_]+)='(?P<v2>[^'\\]*)')?)?\)"
+)
+# 参数：可选的 key= 前缀 + 引号字符串（允许转义和未转义的引号）或裸值
+_ARG_RE = re.compile(r"""
+    [\s,]*
+    (?:(?P<key>[a-z_]+)\s*=\s*)?
+    (?:
+        (?P<q>['"])(?P<quoted>[^\\'"]*(?:(?:\\.|['"])[^\\'"]*)*?)(?P=q)
+            (?=\s*(?:,\s*[a-z_]+\s*=|,\s*['"]|,?\s*\)|$))
+      | (?P<bare>[^,()'"]+?)(?=\s*(?:,|\)|$))
+      | ['"](?P<unterminated>.+)$
+    )
+""", re.X | re.S)
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_ESCAPE_RE = re.compile(r"\\(['\"n\\t])")
+_ESCAPES = {"'": "'", '"': '"', "n": "\n", "t": "\t", "\\": "\\"}
+
+
+def _unescape_match(match: re.Match) -> str:
+    return _ESCAPES[match.group(1)]
+
+
+class ActionParseError(ValueError):
+    """动作字符串无法解析"""
+
+
+@dataclass(frozen=True)
+class Action:
+    """解析后的动作（坐标为模型输出的 0-1000 归一化坐标）"""
+    name: str
+    point: tuple[int, int] | None = None
+    end_point: tuple[int, int] | None = None
+    content: str | None = None
+    key: str | None = None
+    direction: str | None = None
+    raw: str = ""
+
+    @property
+    def keys(self) -> list[str]:
+        """hotkey 的按键列表"""
+        return (self.key or "").lower().replace("+", " ").split()
+
+
+def _parse_point(value: str) -> tuple[int, int] | None:
+    """解析 <point>x y</point>、x y、(x,y)、[x, y]；四个数（bbox）时取中心"""
+    numbers = _NUMBER_RE.findall(value)
+    if len(numbers) == 2:
+        return round(float(numbers[0])), round(float(numbers[1]))
+    if len(numbers) == 4:
+        x1, y1, x2, y2 = (float(n) for n in numbers)
+        return round((x1 + x2) / 2), round((y1 + y2) / 2)
+    return None
+
+
+def _tokenize(text: str) -> tuple[str, dict[str, str]]:
+    """逐个参数扫描：容忍别名、位置参数、转义/未转义引号、缺失右括号"""
+    for call in _CALL_RE.finditer(text):
+        name = ACTION_ALIASES.get(call.group("name"), call.group("name"))
+        if name in ACTION_SPACE:
+            break
+    else:
+        raise ActionParseError(f"未知动作: {text!r}")
+
+    args: dict[str, str] = {}
+    positional = iter(POSITIONAL_PARAMS[name])
+    pos = call.end()
+    while pos < len(text):
+        match = _ARG_RE.match(text, pos)
+        if not match or match.end() == pos:
+            break
+        pos = match.end()
+        quoted = match.group("quoted")
+        if quoted is None:
+            # 输出被截断时字符串没有闭合，取到末尾
+            quoted = match.group("unterminated")
+        if quoted is None:
+            value = match.group("bare").strip()
+        elif "\\" in quoted:
+            value = _ESCAPE_RE.sub(_unescape_match, quoted)
+        else:
+            value = quoted
+        key = match.group("key") or next(positional, None)
+        if key:
+            args.setdefault(key, value)
+
+    return name, args
+
+
+def parse_action(text: str) -> Action:
+    """
+    单次扫描解析动作字符串
+
+    Args:
+        text: 例如 "click(point='<point>100 200</point>')"
+
+    Returns:
+        Action
+
+    Raises:
+        ActionParseError: 找不到已知动作或缺少必要参数
+    """
+    canonical = _CANONICAL_RE.fullmatch(text.strip())
+    if canonical and canonical.group("name") in POSITIONAL_PARAMS:
+        name = canonical.group("name")
+        args = {canonical.group("k1"): canonical.group("v1"), canonical.group("k2"): canonical.group("v2")}
+    else:
+        name, args = _tokenize(text)
+
+    fields: dict = {"name": name, "raw": text.strip()}
+    if name in ("click", "left_double", "right_single", "scroll"):
+        point = _parse_point(args.get("point") or args.get("start_box") or "")
+        if point is None:
+            raise ActionParseError(f"无法解析坐标: {text!r}")
+        fields["point"] = point
+    if name == "drag":
+        start = _parse_point(args.get("start_point") or args.get("start_box") or "")
+        end = _parse_point(args.get("end_point") or args.get("end_box") or "")
+        if start is None or end is None:
+            raise ActionParseError(f"无法解析拖拽坐标: {text!r}")
+        fields["point"], fields["end_point"] = start, end
+    if name == "scroll":
+        fields["direction"] = (args.get("direction") or "down").strip().lower()
+    if name == "hotkey":
+        if not args.get("key"):
+            raise ActionParseError(f"缺少按键: {text!r}")
+        fields["key"] = args["key"]
+    if name in ("type", "finished"):
+        fields["content"] = args.get("content", "")
+    return Action(**fields)
+
+
+# ---------------------------------------------------------------------------
+# 响应解析：从模型完整输出中提取 Thought / Action
+# ---------------------------------------------------------------------------
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_KEY_RE = re.compile(r"""["'“]?(?P<key>Thought|Action)["'”]?\s*[:：]\s*""", re.I)
+# 值的结束引号：其后紧跟下一个键、右花括号或文本结尾（据此容忍值内未转义的引号）
+_VALUE_END_RE = {
+    opening: re.compile(rf"""(?<!\\){closing}(?=\s*(?:,\s*["'“]?\w+["'”]?\s*[:：]|}}|$))""")
+    for opening, closing in (('"', '"'), ("'", "'"), ("“", "”"))
+}
+
+
+def _read_value(text: str, start: int) -> str:
+    """读取键后面的值：引号字符串读到结束引号（双引号按JSON转义还原），否则读到行尾"""
+    if start < len(text) and text[start] in _VALUE_END_RE:
+        quote = text[start]
+        end = _VALUE_END_RE[quote].search(text, start + 1)
+        if end is None:
+            return text[start + 1:].rstrip('"\'”}\n ,')
+        value = text[start + 1:end.start()]
+        return _unescape(value) if quote == '"' else value
+    end = text.find("\n", start)
+    return text[start:end if end != -1 else len(text)].strip().rstrip(",")
+
+
+def parse_response(text: str) -> tuple[str, str]:
+    """
+    从模型输出中提取 (thought, action)
+
+    依次尝试：标准JSON -> 按 Thought/Action 键扫描（兼容 "Thought: ...\\nAction: ..." 纯文本）
+    -> 在全文中查找第一个已知动作调用
+    """
+    body = text.strip()
+    if body.startswith("```"):
+        body = _FENCE_RE.sub("", body)
+    try:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = {str(k).lower(): v for k, v in data.items()}
+            return str(data.get("thought", "")).strip(), str(data.get("action", "")).strip()
+    except json.JSONDecodeError:
+        pass
+
+    values: dict[str, str] = {}
+    for match in _KEY_RE.finditer(body):
+        key = match.group("key").capitalize()
+        if key not in values:
+            values[key] = _read_value(body, match.end())
+    thought, action = values.get("Thought", ""), values.get("Action", "")
+
+    if not action:
+        for call in _CALL_RE.finditer(body):
+            if ACTION_ALIASES.get(call.group("name"), call.group("name")) in ACTION_SPACE:
+                end = body.find("\n", call.start())
+                action = body[call.start():end if end != -1 else len(body)].strip().rstrip('",}')
+                break
+    return thought.strip(), action.strip()
+
+
+@dataclass(frozen=True)
+class PlannedAction:
+    """多动作模式中的一个动作"""
+    action: str
+    expect_change: bool = False  # 执行后画面必须变化，否则放弃剩余动作
+
+
+def parse_plan(text: str, max_actions: int = 5) -> tuple[str, list[PlannedAction]]:
+    """
+    从多动作模式的模型输出中提取 (thought, 动作列表)
+
+    "Actions" 的元素可以是 {"Action": ..., "ExpectChange": ...} 或动作字符串；
+    输出不是合法JSON或没有 "Actions" 时按单动作解析，只执行第一个动作（保守处理，不盲目连续执行）
+    """
+    body = text.strip()
+    if body.startswith("```"):
+        body = _FENCE_RE.sub("", body)
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        data = {str(k).lower(): v for k, v in data.items()}
+        items = data.get("actions")
+        if isinstance(items, list):
+            plan = []
+            for item in items[:max_actions]:
+                if isinstance(item, dict):
+                    item = {str(k).lower(): v for k, v in item.items()}
+                    action = str(item.get("action", "")).strip()
+                    expect_change = bool(item.get("expectchange", item.get("expect_change", False)))
+                else:
+                    action, expect_change = str(item).strip(), False
+                if action:
+                    plan.append(PlannedAction(action, expect_change))
+            return str(data.get("thought", "")).strip(), plan
+
+    thought, action = parse_response(text)
+    return thought, [PlannedAction(action)] if action else []
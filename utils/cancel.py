@@ -0,0 +1,99 @@
+# utils/cancel.py
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+class Cancelled(BaseException):
+    """
+    任务已被取消
+
+    与 KeyboardInterrupt / asyncio.CancelledError 一样继承 BaseException，
+    不会被重试、接口回退、动作执行失败等处理 Exception 的分支吞掉
+    """
+
+
+class CancelToken:
+    """
+    协作式取消令牌
+
+    由控制方调用 cancel()；Agent 循环在节点边界检查，等待（sleep/画面稳定检测）随时醒来，
+    进行中的模型请求通过注册的回调立即中止
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, Callable[[], Any]] = {}
+        self._next_id = 0
+        self.reason: str | None = None
+        self.cancelled_at: float | None = None  # time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> None:
+        """请求取消（可重复调用），并触发所有已注册的中止回调"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ 取消回调失败: {e}")
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def sleep(self, seconds: float) -> None:
+        """可被取消打断的 sleep"""
+        if seconds <= 0:
+            self.raise_if_cancelled()
+        elif self._event.wait(seconds):
+            raise Cancelled(self.reason)
+
+    def on_cancel(self, callback: Callable[[], Any]) -> int:
+        """
+        注册取消时执行的回调（如中止进行中的请求）；已取消时立即执行
+
+        Returns:
+            回调句柄，配合 remove() 注销
+        """
+        with self._lock:
+            if not self._event.is_set():
+                handle = self._next_id
+                self._next_id += 1
+                self._callbacks[handle] = callback
+                return handle
+        callback()
+        return -1
+
+    def remove(self, handle: int) -> None:
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def wait_future(self, future: Future) -> Any:
+        """
+        等待 Future 结果，取消时立即中止等待并尝试取消该 Future
+
+        （协程 Future 被取消时，事件循环中的请求随之中止）
+        """
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+        handle = self.on_cancel(lambda: (future.cancel(), done.set()))
+        try:
+            done.wait()
+        finally:
+            self.remove(handle)
+        self.raise_if_cancelled()
+        return future.result()
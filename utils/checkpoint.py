@@ -0,0 +1,279 @@
+# utils/checkpoint.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+# 断点续跑的起点：最近一次执行完动作之后的状态
+RESUMABLE_NODE = "execute"
+
+# 运行状态
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+@dataclass
+class Checkpoint:
+    """一次运行可恢复的快照"""
+    run_id: str
+    instruction: str
+    node: str  # 保存快照的节点
+    state: dict  # AgentState
+    history: list[dict]  # 紧凑形式的会话历史
+    extra: dict = field(default_factory=dict)  # 计数器等Agent侧状态
+    logs: dict[str, list] = field(default_factory=dict)  # 只追加的列表（动作历史、轨迹步骤）
+    status: str = RUNNING
+    updated: float = 0.0
+
+
+def _to_json(item):
+    """日志条目序列化：带 to_dict() 的对象（如轨迹步骤）转为字典"""
+    if hasattr(item, "to_dict"):
+        return item.to_dict()
+    raise TypeError(f"无法序列化: {type(item).__name__}")
+
+
+class AgentCheckpointer:
+    """
+    Agent 循环的检查点存储（SQLite）
+
+    每个节点结束后写入 AgentState；会话历史按消息增量追加（每条消息只写一次），
+    动作历史、轨迹等只追加的列表也只写新增条目，快照中只记录消息序号和各列表长度，
+    单步写入量与已运行的步数基本无关
+    """
+
+    def __init__(self, path: str = "cache/checkpoints.db"):
+        """
+        初始化检查点存储
+
+        Args:
+            path: SQLite数据库路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # run_id -> {id(消息): (序号, 消息)}；持有消息引用，保证 id 不会被复用
+        self._persisted: dict[str, dict[int, tuple[int, dict]]] = {}
+        self._next_seq: dict[str, int] = {}
+        # (run_id, 列表名) -> 已写入的条目数
+        self._log_counts: dict[tuple[str, str], int] = {}
+        # 每次写入耗时（秒）
+        self.write_times: list[float] = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + synchronous=NORMAL：提交不等待fsync，进程崩溃不丢数据（仅断电可能丢最后几步）
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                instruction TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                run_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS logs (
+                run_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                PRIMARY KEY (run_id, kind, seq)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT NOT NULL,
+                node TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                history TEXT NOT NULL,
+                extra TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (run_id, node)
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_updated ON runs(updated);
+        """)
+
+    def begin(self, run_id: str, instruction: str) -> None:
+        """登记一次运行（已存在时保留原有快照，用于续跑）"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, instruction, status, created, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET status = excluded.status, updated = excluded.updated",
+                (run_id, instruction, RUNNING, now, now))
+            row = self._conn.execute("SELECT MAX(seq) FROM messages WHERE run_id = ?", (run_id,)).fetchone()
+            self._next_seq[run_id] = (row[0] + 1) if row[0] is not None else 0
+            self._persisted.setdefault(run_id, {})
+            for kind, count in self._conn.execute(
+                    "SELECT kind, COUNT(*) FROM logs WHERE run_id = ? GROUP BY kind", (run_id,)):
+                self._log_counts[(run_id, kind)] = count
+
+    def adopt(self, run_id: str, live_messages: list[dict], seqs: list[int]) -> None:
+        """续跑时把恢复出的消息对象与已存储的序号对应起来，避免重复写入"""
+        with self._lock:
+            self._persisted[run_id] = {id(m): (seq, m) for m, seq in zip(live_messages, seqs)}
+
+    def save(self, run_id: str, node: str, state: dict, history: list[dict],
+             compact: Callable[[dict], dict], extra: dict | None = None,
+             logs: dict[str, list] | None = None) -> float:
+        """
+        保存一个节点结束后的快照
+
+        Args:
+            run_id: 运行ID
+            node: 节点名
+            state: AgentState
+            history: 当前会话历史（活动的消息对象）
+            compact: 消息 -> 可序列化紧凑形式
+            extra: Agent侧需要一起恢复的状态（小对象，每次整体写入）
+            logs: 只追加的列表，每次只写入新增的条目
+
+        Returns:
+            本次写入耗时（秒）
+        """
+        start = time.perf_counter()
+        with self._lock:
+            persisted = self._persisted.setdefault(run_id, {})
+            seqs, new_rows, live = [], [], {}
+            for message in history:
+                entry = persisted.get(id(message))
+                if entry is None or entry[1] is not message:
+                    seq = self._next_seq.get(run_id, 0)
+                    self._next_seq[run_id] = seq + 1
+                    entry = (seq, message)
+                    new_rows.append((run_id, seq, json.dumps(compact(message), ensure_ascii=False)))
+                live[id(message)] = entry
+                seqs.append(entry[0])
+            # 已被历史策略丢弃的消息不再持有
+            self._persisted[run_id] = live
+
+            now = time.time()
+            extra = dict(extra or {})
+            with self._conn:
+                if logs:
+                    extra["_logs"] = {kind: len(items) for kind, items in logs.items()}
+                    for kind, items in logs.items():
+                        count = self._log_counts.get((run_id, kind), 0)
+                        if len(items) < count:
+                            # 列表被清空/截断：丢弃多出的已存条目
+                            self._conn.execute("DELETE FROM logs WHERE run_id = ? AND kind = ? AND seq >= ?",
+                                               (run_id, kind, len(items)))
+                            count = len(items)
+                        if len(items) > count:
+                            self._conn.executemany(
+                                "INSERT OR REPLACE INTO logs (run_id, kind, seq, item) VALUES (?, ?, ?, ?)",
+                                [(run_id, kind, seq, json.dumps(item, ensure_ascii=False, default=_to_json))
+                                 for seq, item in enumerate(items[count:], count)])
+                        self._log_counts[(run_id, kind)] = len(items)
+                if new_rows:
+                    self._conn.executemany("INSERT OR REPLACE INTO messages (run_id, seq, message) VALUES (?, ?, ?)",
+                                           new_rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (run_id, node, step, state, history, extra, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, node, state.get("step", 0), json.dumps(state, ensure_ascii=False, default=str),
+                     json.dumps(seqs), json.dumps(extra, ensure_ascii=False), now))
+                self._conn.execute("UPDATE runs SET updated = ? WHERE run_id = ?", (now, run_id))
+        elapsed = time.perf_counter() - start
+        self.write_times.append(elapsed)
+        return elapsed
+
+    def finish(self, run_id: str, status: str = FINISHED) -> None:
+        """标记运行结束，并清理不再被快照引用的消息"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET status = ?, updated = ? WHERE run_id = ?",
+                               (status, time.time(), run_id))
+            referenced: set[int] = set()
+            for (history,) in self._conn.execute("SELECT history FROM checkpoints WHERE run_id = ?", (run_id,)):
+                referenced.update(json.loads(history))
+            stored = [seq for (seq,) in self._conn.execute("SELECT seq FROM messages WHERE run_id = ?", (run_id,))]
+            self._conn.executemany("DELETE FROM messages WHERE run_id = ? AND seq = ?",
+                                   [(run_id, seq) for seq in stored if seq not in referenced])
+            self._persisted.pop(run_id, None)
+
+    def load(self, run_id: str) -> tuple[Checkpoint, list[int]] | None:
+        """
+        读取可续跑的快照（最近一次执行完动作之后的状态）
+
+        Returns:
+            (快照, 历史消息序号)；运行不存在时返回None，尚未完成任何一步时 state 为空
+        """
+        with self._lock:
+            run = self._conn.execute("SELECT instruction, status, updated FROM runs WHERE run_id = ?",
+                                     (run_id,)).fetchone()
+            if run is None:
+                return None
+            row = self._conn.execute(
+                "SELECT node, state, history, extra, updated FROM checkpoints WHERE run_id = ? AND node = ?",
+                (run_id, RESUMABLE_NODE)).fetchone()
+            if row is None:
+                return Checkpoint(run_id, run[0], "", {}, [], status=run[1], updated=run[2]), []
+            seqs = json.loads(row[2])
+            stored = dict(self._conn.execute(
+                "SELECT seq, message FROM messages WHERE run_id = ?", (run_id,)).fetchall())
+            extra = json.loads(row[3])
+            logs = {}
+            for kind, count in extra.pop("_logs", {}).items():
+                logs[kind] = [json.loads(item) for (item,) in self._conn.execute(
+                    "SELECT item FROM logs WHERE run_id = ? AND kind = ? AND seq < ? ORDER BY seq",
+                    (run_id, kind, count))]
+        history = [json.loads(stored[seq]) for seq in seqs if seq in stored]
+        checkpoint = Checkpoint(run_id, run[0], row[0], json.loads(row[1]), history,
+                                extra, logs, status=run[1], updated=row[4])
+        return checkpoint, [seq for seq in seqs if seq in stored]
+
+    def latest_run(self, status: str | None = RUNNING) -> str | None:
+        """最近更新的运行ID（默认只找未结束的）"""
+        query = "SELECT run_id FROM runs"
+        params: tuple[Any, ...] = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY updated DESC LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def runs(self, limit: int = 20) -> list[dict]:
+        """最近的运行列表"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.run_id, r.instruction, r.status, r.updated, "
+                "(SELECT step FROM checkpoints c WHERE c.run_id = r.run_id AND c.node = ?) "
+                "FROM runs r ORDER BY r.updated DESC LIMIT ?", (RESUMABLE_NODE, limit)).fetchall()
+        return [{"run_id": r[0], "instruction": r[1], "status": r[2], "updated": r[3], "step": r[4] or 0}
+                for r in rows]
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            for table in ("runs", "messages", "logs", "checkpoints"):
+                self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            self._persisted.pop(run_id, None)
+            self._log_counts = {key: count for key, count in self._log_counts.items() if key[0] != run_id}
+
+    def stats(self) -> dict:
+        """写入耗时统计（毫秒）"""
+        times = sorted(self.write_times)
+        if not times:
+            return {"writes": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "writes": len(times),
+            "mean_ms": sum(times) / len(times) * 1000,
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+            "max_ms": times[-1] * 1000,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,189 @@
+# utils/decision_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Sequence
+
+from gui_operator.frame import Frame
+from gui_operator.fingerprint import hamming, region_hash
+from utils.action_parser import parse_action, ActionParseError
+
+
+def _to_signed(value: int) -> int:
+    """64位无符号指纹转为SQLite可存储的有符号整数"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class DecisionCache:
+    """
+    模型决策缓存
+
+    以 (指令, 最近动作历史) 为上下文，截图感知哈希一致即视为同一画面，直接复用之前的 Thought/Action。
+    整屏64位指纹分辨不出复选框、输入框内容、焦点这类小变化，所以带坐标的动作还会记录
+    目标点附近区域的指纹，命中时必须同样一致。SQLite持久化，支持TTL过期与LRU容量淘汰
+    """
+
+    def __init__(
+        self,
+        path: str = "cache/decisions.db",
+        max_distance: int = 0,
+        max_entries: int = 5000,
+        ttl: float = 7 * 24 * 3600,
+        history_len: int = 3,
+        region_radius: float = 0.05
+    ):
+        """
+        初始化决策缓存
+
+        Args:
+            path: SQLite数据库路径
+            max_distance: 整屏指纹允许的最大汉明距离（64位dHash），默认0即完全一致
+            max_entries: 最多保留的条目数，超出后按最近使用时间淘汰
+            ttl: 条目有效期（秒）
+            history_len: 参与上下文键的最近动作数
+            region_radius: 目标区域指纹的半宽/半高（占屏幕宽高的比例）
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.history_len = history_len
+        self.region_radius = region_radius
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                context TEXT NOT NULL,
+                phash INTEGER NOT NULL,
+                region INTEGER,
+                thought TEXT NOT NULL,
+                action TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_decisions_context ON decisions(context);
+            CREATE INDEX IF NOT EXISTS idx_decisions_last_used ON decisions(last_used);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(decisions)")}
+        if "region" not in columns:
+            # 旧版本数据库没有目标区域指纹：旧条目只能靠整屏指纹判断，直接清掉
+            self._conn.execute("DELETE FROM decisions")
+            self._conn.execute("ALTER TABLE decisions ADD COLUMN region INTEGER")
+            self._conn.commit()
+        self.evict()
+
+    def context_key(self, instruction: str, recent_actions: Sequence[str]) -> str:
+        """指令 + 最近动作历史的摘要"""
+        recent = list(recent_actions)[-self.history_len:] if self.history_len else []
+        raw = json.dumps([instruction, recent], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def target_region(self, action: str, frame: Frame | None) -> int | None:
+        """动作目标点附近区域的指纹；动作不带坐标或没有画面时返回None"""
+        if frame is None:
+            return None
+        try:
+            point = parse_action(action).point
+        except ActionParseError:
+            return None
+        if point is None:
+            return None
+        return region_hash(frame, (point[0] / 1000, point[1] / 1000), self.region_radius)
+
+    def lookup(self, instruction: str, recent_actions: Sequence[str], phash: int,
+               frame: Frame | None = None) -> tuple[str, str] | None:
+        """
+        查找缓存的决策
+
+        Args:
+            frame: 当前画面，用于比对目标区域指纹；不提供时带区域指纹的条目不会命中
+
+        Returns:
+            (thought, action)；未命中返回None
+        """
+        context = self.context_key(instruction, recent_actions)
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, phash, region, thought, action FROM decisions WHERE context = ? AND created >= ?",
+                (context, now - self.ttl)
+            ).fetchall()
+            candidates = sorted(
+                (hamming(_to_unsigned(stored), phash), row_id, region, thought, action)
+                for row_id, stored, region, thought, action in rows
+            )
+            best = None
+            for distance, row_id, region, thought, action in candidates:
+                if distance > self.max_distance:
+                    break
+                if region is not None and self.target_region(action, frame) != _to_unsigned(region):
+                    continue
+                best = (distance, row_id, thought, action)
+                break
+            if best is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE decisions SET last_used = ? WHERE id = ?", (now, best[1]))
+            self._conn.commit()
+            self.hits += 1
+            return best[2], best[3]
+
+    def store(self, instruction: str, recent_actions: Sequence[str], phash: int,
+              thought: str, action: str, frame: Frame | None = None) -> None:
+        """保存一次模型决策（frame 为决策时的画面，用于记录目标区域指纹）"""
+        context = self.context_key(instruction, recent_actions)
+        region = self.target_region(action, frame)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO decisions (context, phash, region, thought, action, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (context, _to_signed(phash), None if region is None else _to_signed(region),
+                 thought, action, now, now)
+            )
+            self._conn.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """删除过期条目，并按最近使用时间淘汰超出容量的部分"""
+        with self._lock:
+            self._conn.execute("DELETE FROM decisions WHERE created < ?", (time.time() - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM decisions WHERE id IN ("
+                "SELECT id FROM decisions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM decisions")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,103 +1,336 @@
 # utils/model.py
 
+import io
+import itertools
 import os
 import base64
-from openai import OpenAI
-from typing import List, Dict, Any
+import mimetypes
+import threading
+import time
+from collections import OrderedDict
+import queue
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from PIL import Image
+from typing import List, Dict, Any, Callable
+from utils.action_parser import ActionStreamParser
+from utils.cancel import CancelToken
+from utils.tracing import NULL_TRACER, Tracer
+from utils.model_client import (ApiModeSelector, AsyncModelClient, RetryBudget, RetryPolicy,
+                                DEFAULT_RETRY_POLICY, call_with_retry, create_sync_client,
+                                is_capability_error)
 
 # 默认配置 - 实际使用时会从config.json加载
 DEFAULT_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
 DEFAULT_MODEL = "your-model-name"
 
+
+@dataclass(frozen=True)
+class UploadProfile:
+    """截图上传配置：长边分辨率、编码格式/质量、是否灰度"""
+    max_long_edge: int | None = None  # 长边像素上限，None表示保持原分辨率
+    format: str = "png"  # png / jpeg / webp
+    quality: int = 85  # jpeg/webp 质量 (1-100)
+    grayscale: bool = False
+
+
+# 预置上传配置，可通过名称选择
+# 坐标约定：UI-TARS 输出的 0-1000 坐标相对于上传的那张图。缩放后的配置会在 EncodedImage 中记录
+# 原图尺寸与上传尺寸，GUIAgent.normalize_coords 据此还原到屏幕；直接使用 LVMChat 的调用方需用
+# last_image.to_source() 自行换算。有损压缩和降采样会让小控件、小字号更难识别，点击精度可能下降，
+# 因此默认保持原分辨率的无损 PNG，其余配置需显式选择
+UPLOAD_PROFILES: Dict[str, UploadProfile] = {
+    "original": UploadProfile(),
+    "balanced": UploadProfile(max_long_edge=1920, format="jpeg", quality=85),
+    "compact": UploadProfile(max_long_edge=1280, format="webp", quality=75),
+    "minimal": UploadProfile(max_long_edge=1024, format="jpeg", quality=60, grayscale=True),
+}
+DEFAULT_UPLOAD_PROFILE = "original"
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """编码后的上传图片，记录原始尺寸与上传尺寸用于坐标映射"""
+    data_url: str
+    source_size: tuple[int, int]
+    encoded_size: tuple[int, int]
+    num_bytes: int
+
+    @property
+    def scale(self) -> tuple[float, float]:
+        """上传图相对原图的缩放比例 (sx, sy)"""
+        return (self.encoded_size[0] / self.source_size[0],
+                self.encoded_size[1] / self.source_size[1])
+
+    def to_source(self, x: float, y: float) -> tuple[float, float]:
+        """把上传图上的像素坐标映射回原始截图坐标"""
+        sx, sy = self.scale
+        return x / sx, y / sy
+
+def _open_image(image) -> Image.Image:
+    """把路径/字节/内存帧统一转为PIL图片"""
+    if isinstance(image, (str, os.PathLike)):
+        return Image.open(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    return Image.frombytes("RGB", image.size, image.rgb)
+
+
+def _raw_png(image) -> tuple[bytes, str, tuple[int, int]] | None:
+    """原样上传时直接取已有的PNG数据，避免解码再编码"""
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, "rb") as image_file:
+            data = image_file.read()
+        mime = mimetypes.guess_type(str(image))[0] or "image/png"
+        with Image.open(io.BytesIO(data)) as img:
+            return data, mime, img.size
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        data = bytes(image)
+        with Image.open(io.BytesIO(data)) as img:
+            return data, Image.MIME.get(img.format, "image/png"), img.size
+    return image.to_png(), "image/png", image.size
+
+
+def encode_image(image, profile: UploadProfile) -> EncodedImage:
+    """
+    按上传配置缩放、编码图片
+    
+    Args:
+        image: 图片路径、图片字节，或带 rgb/size/to_png() 的内存帧
+        profile: 上传配置
+        
+    Returns:
+        EncodedImage，包含 data URL 和缩放信息
+    """
+    if profile.format.lower() == "png" and not profile.max_long_edge and not profile.grayscale:
+        data, mime, size = _raw_png(image)
+        encoded_size = size
+    else:
+        img = _open_image(image)
+        size = img.size
+        img = img.convert("L" if profile.grayscale else "RGB")
+        long_edge = max(size)
+        if profile.max_long_edge and long_edge > profile.max_long_edge:
+            ratio = profile.max_long_edge / long_edge
+            target = (max(1, round(size[0] * ratio)), max(1, round(size[1] * ratio)))
+            img = img.resize(target, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        encoded_size = img.size
+        
+        buffer = io.BytesIO()
+        fmt = profile.format.lower()
+        if fmt in ("jpeg", "jpg"):
+            img.save(buffer, format="JPEG", quality=profile.quality)
+            mime = "image/jpeg"
+        elif fmt == "webp":
+            img.save(buffer, format="WEBP", quality=profile.quality, method=0)
+            mime = "image/webp"
+        else:
+            img.save(buffer, format="PNG", compress_level=6)
+            mime = "image/png"
+        data = buffer.getvalue()
+    
+    b64 = base64.b64encode(data).decode("utf-8")
+    return EncodedImage(
+        data_url=f"data:{mime};base64,{b64}",
+        source_size=tuple(size),
+        encoded_size=tuple(encoded_size),
+        num_bytes=len(data)
+    )
+
+
+# 非Frame图片（路径/字节）的句柄编号
+_ref_ids = itertools.count(1)
+
+
+@dataclass(eq=False)
+class ImageRef:
+    """会话历史中的轻量图片句柄：帧编号 + 路径/内存帧，只在序列化请求时才编码"""
+    key: Any
+    source: Any = field(repr=False)  # 图片路径、字节或内存帧
+    path: str | None = None  # 截图落盘路径（检查点中只记录路径）
+
+    @classmethod
+    def of(cls, image) -> 'ImageRef':
+        if isinstance(image, (str, os.PathLike)):
+            return cls(key=f"path:{image}", source=image, path=os.fspath(image))
+        frame_id = getattr(image, "frame_id", None)
+        if frame_id is not None:
+            return cls(key=f"frame:{frame_id}", source=image, path=getattr(image, "path", None))
+        return cls(key=f"ref:{next(_ref_ids)}", source=image)
+
+    def release_buffer(self, encoded: EncodedImage) -> None:
+        """
+        编码完成后释放内存帧的原始像素：
+        已落盘的帧改为只持有路径，否则只保留编码结果（远小于原始像素）
+        """
+        if not hasattr(self.source, "rgb"):
+            return
+        path = getattr(self.source, "path", None)
+        self.source = path if path and os.path.exists(path) else encoded
+
+
+class EncodedImageCache:
+    """按帧编号缓存编码结果的LRU，避免同一截图在多次请求中重复编码"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ref: ImageRef, profile: UploadProfile) -> EncodedImage:
+        key = (ref.key, profile)
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+        self.misses += 1
+        if isinstance(ref.source, EncodedImage):
+            # 句柄已只保留编码结果，直接复用
+            encoded = ref.source
+        else:
+            encoded = encode_image(ref.source, profile)
+            ref.release_buffer(encoded)
+        self._entries[key] = encoded
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return encoded
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    """会话历史策略：最近K张截图保留为图片，更早的轮次只保留文字，并限制单次请求预算"""
+    keep_images: int = 3  # 每次请求最多携带的截图数（含当前截图）
+    max_request_bytes: int | None = 8 * 1024 * 1024  # 单次请求载荷字节上限
+    max_request_tokens: int | None = 48000  # 单次请求估算token上限
+    image_tokens: int = 1500  # 每张截图的估算token数
+    chars_per_token: float = 2.0  # 文本估算：每个token约对应的字符数（中英混合）
+
+
+DEFAULT_HISTORY_POLICY = HistoryPolicy()
+
+# 被降级为纯文字的历史截图占位
+OMITTED_IMAGE_TEXT = "[该步截图已省略，仅保留文字记录]"
+
+
 class LVMChat:
     """支持会话记忆的多模态聊天类"""
     
     def __init__(self, api_key: str = None, base_url: str = DEFAULT_BASE_URL, 
-                 model: str = DEFAULT_MODEL):
+                 model: str = DEFAULT_MODEL,
+                 upload_profile: str | UploadProfile = DEFAULT_UPLOAD_PROFILE,
+                 history_policy: HistoryPolicy = DEFAULT_HISTORY_POLICY,
+                 client_mode: str = "sync",
+                 retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+                 cancel_token: CancelToken | None = None,
+                 tracer: Tracer | None = None,
+                 log: Callable[[str], None] = print):
+        """
+        Args:
+            upload_profile: 截图上传配置（名称或 UploadProfile），默认原分辨率无损 PNG；
+                            "balanced" / "compact" / "minimal" 为有损缩放配置，需显式选择（坐标约定见 UPLOAD_PROFILES）
+            client_mode: "sync" 使用同步客户端；"async" 使用进程内共享的异步连接池客户端
+                         （同一端点的多个Agent共享连接）
+            retry_policy: 超时、重试与连接池配置
+            cancel_token: 取消令牌，取消时中止进行中的请求并抛出 Cancelled
+            tracer: 分阶段计时（编码、历史裁剪、序列化、网络）
+            log: 日志输出（GUIAgent 传入自己的 _log，重试/接口回退等日志随之发布为 LOG 事件）
+        """
         if not api_key:
             raise ValueError("API Key is required. Please configure it in config.json")
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client_mode = client_mode
+        self.retry_policy = retry_policy
+        if client_mode == "async":
+            self.async_client = AsyncModelClient.shared(api_key, base_url, retry_policy)
+            self.client = None
+        else:
+            self.async_client = None
+            self.client = create_sync_client(api_key, base_url, retry_policy)
+            self.retry_budget = RetryBudget()
+        self.cancel_token = cancel_token
+        self.tracer = tracer or NULL_TRACER
+        self.log = log
         self.model = model
+        # 按端点记住可用的接口（chat / responses），避免每步先失败一次再回退
+        self.api_modes = ApiModeSelector.for_endpoint(base_url, model)
+        # 请求统计
+        self.usage_stats: Dict[str, int] = {'requests': 0, 'retries': 0, 'fallbacks': 0,
+                                            'chat': 0, 'responses': 0}
+        if isinstance(upload_profile, str):
+            upload_profile = UPLOAD_PROFILES[upload_profile]
+        self.upload_profile = upload_profile
+        # 最近一次上传图片的尺寸信息（坐标映射用）
+        self.last_image: EncodedImage | None = None
         # 🔥 核心改动：添加会话历史记录
         self.conversation_history: List[Dict[str, Any]] = []
+        self.history_policy = history_policy
+        # 最近一次请求的大小统计
+        self.last_request_stats: Dict[str, int] = {}
+        # 历史中只保存图片句柄，编码结果按帧编号缓存（容量略大于单次请求携带的图片数）
+        self.image_cache = EncodedImageCache(max_entries=history_policy.keep_images + 2)
     
-    def _encode_image(self, image_path: str) -> str:
-        """将本地图片转为 data URL，方便直接作为 image_url 传入"""
-        with open(image_path, "rb") as image_file:
-            b64 = base64.b64encode(image_file.read()).decode("utf-8")
-        return f"data:image/jpeg;base64,{b64}"
+    def _encode_image(self, image) -> str:
+        """
+        将图片按上传配置编码为 data URL，方便直接作为 image_url 传入
+        
+        Args:
+            image: 图片路径、图片字节、内存帧，或历史中的 ImageRef 句柄
+        """
+        ref = image if isinstance(image, ImageRef) else ImageRef.of(image)
+        return self.image_cache.get(ref, self.upload_profile).data_url
     
-    def get_multimodal_response(self, text: str, image_paths: str, 
-                                res_format: str = "text", use_history: bool = False) -> tuple[str, dict]:
+    def get_multimodal_response(self, text: str, image_paths, 
+                                res_format: str = "text", use_history: bool = False,
+                                stream: bool = False,
+                                on_action: Callable[[str], None] | None = None) -> tuple[str, dict]:
         """
         支持记忆的图文对话
         
         Args:
             text: 你的问题
-            image_paths: 图片路径
+            image_paths: 图片路径、PNG字节或内存帧（Frame）
             res_format: 响应格式 ("text" 或 "json")
             use_history: 是否使用会话历史（记住之前的对话）
+            stream: 是否流式调用 chat.completions
+            on_action: 流式模式下，Action 字段完整出现时立即回调（此时响应可能尚未结束）
             
         Returns:
             (response_text, usage_info): 响应文本和使用统计
         """
-        # 1. 加载图片并转为 Ark 支持的 data URL
-        image_url = self._encode_image(image_paths)
+        # 1. 当前截图立即编码（记录缩放信息用于坐标映射）
+        image_ref = ImageRef.of(image_paths)
+        with self.tracer.span("encode", "model"):
+            self.last_image = self.image_cache.get(image_ref, self.upload_profile)
         
-        # 2. 构建 input（Ark Responses API）
+        # 2. 构建 input（Ark Responses格式；历史中只保存图片句柄，序列化时才生成 data URL）
         current_message = {
             "role": "user",
             "content": [
-                {"type": "input_image", "image_url": image_url},
+                {"type": "input_image", "image_ref": image_ref},
                 {"type": "input_text", "text": text},
             ],
         }
         
-        # 3. 🔥 关键：如果启用历史，把之前的对话也带上
-        if use_history and self.conversation_history:
-            # 对于有历史的情况，需要特殊处理
-            payload = self.conversation_history + [current_message]
-            print(f"📚 使用历史上下文，共 {len(self.conversation_history)} 条")
-            
-            # 调用 API (使用chat.completions而不是responses)
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=self._convert_to_chat_format(payload)
-                )
-                result = response.choices[0].message.content
-                
-                # 提取token使用信息
-                usage_info = {
-                    'input_tokens': getattr(response.usage, 'prompt_tokens', 0) if hasattr(response, 'usage') else 0,
-                    'output_tokens': getattr(response.usage, 'completion_tokens', 0) if hasattr(response, 'usage') else 0,
-                    'total_tokens': getattr(response.usage, 'total_tokens', 0) if hasattr(response, 'usage') else 0
-                }
-            except Exception as e:
-                print(f"Chat API failed, falling back to responses API: {e}")
-                # 回退到单次调用
-                response = self.client.responses.create(
-                    model=self.model,
-                    input=[current_message]
-                )
-                result = getattr(response, "output_text", str(response))
-                usage_info = {'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0}
-        else:
-            payload = [current_message]
-            # 4. 调用 API
-            response = self.client.responses.create(
-                model=self.model,
-                input=payload
+        # 3. 🔥 关键：如果启用历史，把之前的对话也带上（先按策略裁剪历史）
+        with self.tracer.span("history", "model"):
+            if use_history:
+                self._apply_history_policy(current_message)
+            self.last_request_stats = self._measure_request(
+                (self.conversation_history if use_history else []) + [current_message]
             )
-            result = getattr(response, "output_text", str(response))
-            
-            # 尝试从响应中提取token信息（如果API提供）
-            usage_info = {
-                'input_tokens': getattr(response, 'input_tokens', 0) if hasattr(response, 'input_tokens') else 0,
-                'output_tokens': getattr(response, 'output_tokens', 0) if hasattr(response, 'output_tokens') else 0,
-                'total_tokens': 0
-            }
-            usage_info['total_tokens'] = usage_info['input_tokens'] + usage_info['output_tokens']
+        
+        request_start = time.perf_counter()
+        payload = (self.conversation_history if use_history else []) + [current_message]
+        if use_history and self.conversation_history:
+            self.log(f"📚 使用历史上下文，共 {len(self.conversation_history)} 条")
+        result, usage_info = self._request(payload, stream, on_action, request_start)
+        usage_info['completion_time'] = time.perf_counter() - request_start
+        usage_info.setdefault('time_to_action', usage_info['completion_time'])
+        usage_info.update(self.last_request_stats)
         
         # 6. 🔥 更新历史记录
         if use_history:
@@ -109,9 +342,337 @@ class LVMChat:
         
         return result, usage_info
     
+    def _request(self, payload, stream: bool, on_action, request_start: float) -> tuple[str, dict]:
+        """
+        按端点记住的接口顺序发送请求，两种接口都携带完整历史
+        
+        接口不被支持时熔断并回退到另一个接口；其他错误（已重试仍失败）也会回退，但不熔断
+        """
+        modes = self.api_modes.order()
+        for index, mode in enumerate(modes):
+            if self.cancel_token is not None:
+                self.cancel_token.raise_if_cancelled()
+            try:
+                if mode == "chat":
+                    with self.tracer.span("serialize", "model", mode=mode):
+                        messages = self._convert_to_chat_format(payload)
+                    with self.tracer.span("network", "model", mode=mode, stream=stream):
+                        if stream:
+                            result, usage_info = self._stream_chat(messages, on_action, request_start)
+                        else:
+                            response = self._create("chat", messages=messages)
+                            result = response.choices[0].message.content
+                            usage_info = self._chat_usage(getattr(response, 'usage', None))
+                else:
+                    with self.tracer.span("serialize", "model", mode=mode):
+                        responses_input = self._to_responses_input(payload)
+                    with self.tracer.span("network", "model", mode=mode, stream=False):
+                        response = self._create("responses", input=responses_input)
+                    result = getattr(response, "output_text", str(response))
+                    usage_info = self._responses_usage(response)
+            except Exception as e:
+                if self.cancel_token is not None:
+                    # 取消引起的连接错误不触发接口回退
+                    self.cancel_token.raise_if_cancelled()
+                if is_capability_error(e):
+                    self.api_modes.record_failure(mode)
+                if index == len(modes) - 1:
+                    raise
+                self.log(f"{mode} API failed, falling back to {modes[index + 1]} API: {e}")
+                continue
+            
+            self.api_modes.record_success(mode)
+            self.usage_stats[mode] += 1
+            if index > 0:
+                self.usage_stats['fallbacks'] += 1
+            usage_info['api_mode'] = mode
+            usage_info['fallbacks'] = self.usage_stats['fallbacks']
+            return result, usage_info
+    
+    def _on_retry(self, attempt: int, error: BaseException) -> None:
+        self.usage_stats['retries'] += 1
+        self.log(f"🔁 请求失败，第 {attempt} 次重试: {error}")
+    
+    def _create(self, api: str, **kwargs):
+        """
+        发起一次带超时/重试的请求
+        
+        Args:
+            api: "chat"（chat.completions）或 "responses"
+        """
+        self.usage_stats['requests'] += 1
+        kwargs["model"] = self.model
+        if self.async_client is not None:
+            coro = self.async_client.create(api, on_retry=self._on_retry, **kwargs)
+            if self.cancel_token is None:
+                return self.async_client.run(coro)
+            # 取消时取消事件循环中的协程，HTTP请求随之中止
+            return self.cancel_token.wait_future(self.async_client.submit(coro))
+        endpoint = self.client.chat.completions if api == "chat" else self.client.responses
+        return self._call_sync(lambda: call_with_retry(
+            lambda timeout: endpoint.create(timeout=timeout, **kwargs),
+            self.retry_policy, self.retry_budget, self._on_retry, self.cancel_token
+        ))
+    
+    @staticmethod
+    def _in_background(fn: Callable[[], Any]) -> Future:
+        """在守护线程中执行，返回 Future（被放弃的请求不会阻止进程退出）"""
+        future: Future = Future()
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+        threading.Thread(target=run, name="model-request", daemon=True).start()
+        return future
+    
+    def _call_sync(self, call: Callable[[], Any]) -> Any:
+        """
+        执行同步请求；设置了取消令牌时放到后台线程执行，取消后立即返回
+        
+        同步客户端阻塞中的读取无法从其他线程打断，被放弃的请求在后台线程中
+        自行结束（受请求超时约束）；需要真正中止连接时使用 client_mode="async"
+        """
+        if self.cancel_token is None:
+            return call()
+        self.cancel_token.raise_if_cancelled()
+        return self.cancel_token.wait_future(self._in_background(call))
+    
+    def _pump_sync_stream(self, open_stream: Callable[[], Any]):
+        """同步流在后台线程读取，分片经队列交给调用方；取消时调用方立即返回，后台随后关闭响应"""
+        token = self.cancel_token
+        chunks: queue.Queue = queue.Queue()
+        end = object()
+        
+        def pump():
+            try:
+                stream = open_stream()
+                try:
+                    for chunk in stream:
+                        if token.cancelled:
+                            break
+                        chunks.put(chunk)
+                finally:
+                    stream.close()
+            except BaseException as e:
+                chunks.put(e)
+            finally:
+                chunks.put(end)
+        
+        self._in_background(pump)
+        handle = token.on_cancel(lambda: chunks.put(end))
+        try:
+            while True:
+                item = chunks.get()
+                token.raise_if_cancelled()
+                if item is end:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            token.remove(handle)
+    
+    def _open_stream(self, messages):
+        """打开流式 chat.completions（建立连接阶段可重试）"""
+        kwargs = {"model": self.model, "messages": messages, "stream_options": {"include_usage": True}}
+        self.usage_stats['requests'] += 1
+        if self.async_client is not None:
+            return self.async_client.stream_chat(on_retry=self._on_retry, cancel_token=self.cancel_token, **kwargs)
+        open_stream = lambda: call_with_retry(
+            lambda timeout: self.client.chat.completions.create(stream=True, timeout=timeout, **kwargs),
+            self.retry_policy, self.retry_budget, self._on_retry, self.cancel_token
+        )
+        return open_stream() if self.cancel_token is None else self._pump_sync_stream(open_stream)
+    
+    def warmup(self) -> None:
+        """后台预热到模型端点的连接（不阻塞调用方）"""
+        if self.async_client is not None:
+            self.async_client.submit(self.async_client.warmup())
+            return
+        
+        def _warm():
+            try:
+                self.client.models.list(timeout=self.retry_policy.connect_timeout)
+            except Exception:
+                # 端点可能不支持 /models，只要连接建立即可
+                pass
+        threading.Thread(target=_warm, name="model-warmup", daemon=True).start()
+    
+    @staticmethod
+    def _chat_usage(usage) -> Dict[str, int]:
+        """提取 chat.completions 的token使用信息"""
+        return {
+            'input_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+            'output_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+            'total_tokens': getattr(usage, 'total_tokens', 0) or 0
+        }
+    
+    @staticmethod
+    def _responses_usage(response) -> Dict[str, int]:
+        """提取 responses 接口的token使用信息（如果API提供）"""
+        usage = getattr(response, 'usage', None)
+        input_tokens = getattr(usage, 'input_tokens', 0) or getattr(response, 'input_tokens', 0) or 0
+        output_tokens = getattr(usage, 'output_tokens', 0) or getattr(response, 'output_tokens', 0) or 0
+        return {
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens
+        }
+    
+    def _stream_chat(self, messages, on_action, request_start: float) -> tuple[str, dict]:
+        """
+        流式调用 chat.completions
+        
+        增量解析输出，Action 一旦完整就回调 on_action（调用方可立即开始执行），
+        之后继续读完剩余内容用于日志和会话历史
+        """
+        response = self._open_stream(messages)
+        parser = ActionStreamParser()
+        parts = []
+        usage = None
+        time_to_action = None
+        token = self.cancel_token
+        try:
+            for chunk in response:
+                if token is not None:
+                    token.raise_if_cancelled()
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                parts.append(delta)
+                if time_to_action is None and parser.feed(delta) is not None:
+                    time_to_action = time.perf_counter() - request_start
+                    if on_action:
+                        on_action(parser.action)
+        except Exception as e:
+            if token is not None:
+                token.raise_if_cancelled()
+            if time_to_action is None:
+                raise
+            # 动作已经派发执行，不能再回退重试，保留已收到的内容
+            self.log(f"⚠️ 流式响应在动作派发后中断: {e}")
+        
+        usage_info = self._chat_usage(usage)
+        if time_to_action is not None:
+            usage_info['time_to_action'] = time_to_action
+        return "".join(parts), usage_info
+    
+    def record_turn(self, text: str, image_paths, response: str) -> None:
+        """
+        把一轮未经模型调用得到的决策（如缓存命中）写入会话历史，
+        保证之后真正调用模型时上下文连续
+        """
+        image_ref = ImageRef.of(image_paths)
+        with self.tracer.span("encode", "model"):
+            self.last_image = self.image_cache.get(image_ref, self.upload_profile)
+        current_message = {
+            "role": "user",
+            "content": [
+                {"type": "input_image", "image_ref": image_ref},
+                {"type": "input_text", "text": text},
+            ],
+        }
+        self._apply_history_policy(current_message)
+        self.conversation_history.append(current_message)
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": response}]
+        })
+    
+    @staticmethod
+    def compact_message(message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        会话消息的紧凑形式（可JSON序列化）：图片句柄只保留落盘路径，
+        没有落盘的截图记为省略占位
+        """
+        content = []
+        for c in message["content"]:
+            if c["type"] == "input_image":
+                path = c["image_ref"].path
+                content.append({"type": "input_image", "path": path} if path
+                               else {"type": "input_text", "text": OMITTED_IMAGE_TEXT})
+            else:
+                content.append(c)
+        return {"role": message["role"], "content": content}
+    
+    def restore_history(self, messages: List[Dict[str, Any]]) -> None:
+        """从紧凑形式恢复会话历史（断点续跑）；截图文件已不存在的轮次降级为纯文字"""
+        history = []
+        for message in messages:
+            content = []
+            for c in message["content"]:
+                if c["type"] == "input_image":
+                    path = c.get("path")
+                    content.append({"type": "input_image", "image_ref": ImageRef.of(path)}
+                                   if path and os.path.exists(path)
+                                   else {"type": "input_text", "text": OMITTED_IMAGE_TEXT})
+                else:
+                    content.append(dict(c))
+            history.append({"role": message["role"], "content": content})
+        self.conversation_history = history
+        self.image_cache.clear()
+    
     def clear_history(self):
         """清空记忆"""
         self.conversation_history = []
+        self.image_cache.clear()
+    
+    def _measure_request(self, payload: List[Dict[str, Any]]) -> Dict[str, int]:
+        """估算请求大小：载荷字节数、token数、图片数"""
+        text_chars = 0
+        num_bytes = 0
+        images = 0
+        for item in payload:
+            for c in item["content"]:
+                if c["type"] == "input_image":
+                    images += 1
+                    num_bytes += len(self._encode_image(c["image_ref"]))
+                else:
+                    text = c.get("text", "")
+                    text_chars += len(text)
+                    num_bytes += len(text.encode("utf-8"))
+        policy = self.history_policy
+        return {
+            'request_bytes': num_bytes,
+            'request_tokens_est': int(text_chars / policy.chars_per_token) + images * policy.image_tokens,
+            'request_images': images,
+            'request_messages': len(payload)
+        }
+    
+    def _within_budget(self, stats: Dict[str, int]) -> bool:
+        policy = self.history_policy
+        if policy.max_request_bytes and stats['request_bytes'] > policy.max_request_bytes:
+            return False
+        if policy.max_request_tokens and stats['request_tokens_est'] > policy.max_request_tokens:
+            return False
+        return True
+    
+    def _apply_history_policy(self, current_message: Dict[str, Any]) -> None:
+        """
+        按历史策略裁剪会话历史（直接修改已保存的历史，内存同样有界）
+        
+        1. 只保留最近 keep_images-1 轮用户截图，更早的用户轮次降级为纯文字，
+           助手轮次（Thought/Action）原样保留
+        2. 仍超出字节/token预算时，从最早的一轮开始整轮丢弃
+        """
+        policy = self.history_policy
+        user_turns = [m for m in self.conversation_history if m["role"] == "user"]
+        keep = max(policy.keep_images - 1, 0)
+        demote = user_turns[:len(user_turns) - keep] if keep else user_turns
+        for message in demote:
+            if any(c["type"] == "input_image" for c in message["content"]):
+                message["content"] = [{"type": "input_text", "text": OMITTED_IMAGE_TEXT}]
+        
+        while self.conversation_history and not self._within_budget(
+                self._measure_request(self.conversation_history + [current_message])):
+            # 丢弃最早的一轮（用户 + 助手）
+            del self.conversation_history[:2]
 
 
 # # 示例调用
@@ -138,6 +699,19 @@ class LVMChat:
 # # 现在AI能看到完整的对话链，知道自己做过什么决策。在第二轮返回:
 # {'Thought'： '上一轮已经完成输入操作并且文案已经正确显示在输入框，任务已经完成', 'Action': 'finished'}
     
+    def _to_responses_input(self, payload):
+        """把历史中的图片句柄展开为 data URL（Ark responses格式）"""
+        messages = []
+        for item in payload:
+            content = []
+            for c in item["content"]:
+                if c["type"] == "input_image":
+                    content.append({"type": "input_image", "image_url": self._encode_image(c["image_ref"])})
+                else:
+                    content.append(c)
+            messages.append({"role": item["role"], "content": content})
+        return messages
+    
     def _convert_to_chat_format(self, payload):
         """将Ark responses格式转换为chat格式"""
         messages = []
@@ -149,7 +723,7 @@ class LVMChat:
                     if c["type"] == "input_image":
                         content.append({
                             "type": "image_url",
-                            "image_url": {"url": c["image_url"]}
+                            "image_url": {"url": self._encode_image(c["image_ref"])}
                         })
                     elif c["type"] == "input_text":
                         content.append({
@@ -0,0 +1,359 @@
+# utils/model_client.py
+
+import asyncio
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from utils.cancel import CancelToken
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """模型请求的超时与重试策略"""
+    max_attempts: int = 4  # 含首次请求在内的最大尝试次数
+    base_delay: float = 0.5  # 指数退避的基础延迟（秒）
+    max_delay: float = 8.0  # 单次退避的最大延迟（秒）
+    connect_timeout: float = 10.0  # 建立连接超时（秒）
+    request_timeout: float = 60.0  # 单次请求超时（秒）
+    deadline: float = 120.0  # 一次调用（含全部重试）的总截止时间（秒）
+    max_connections: int = 20  # 连接池最大连接数
+    max_keepalive: int = 10  # 连接池保持的空闲长连接数
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class RetryBudget:
+    """
+    重试预算（令牌桶）
+
+    每次重试消耗一个令牌，每次成功请求回填少量令牌；
+    服务持续故障时令牌耗尽，不再重试，避免重试放大流量
+    """
+
+    def __init__(self, max_tokens: float = 10.0, refill_per_success: float = 0.2):
+        self.max_tokens = max_tokens
+        self.refill_per_success = refill_per_success
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.refill_per_success)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """判断错误是否为可重试的瞬时错误（超时、连接失败、限流、5xx）"""
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, policy: RetryPolicy) -> float:
+    """带完全抖动的指数退避：在 [0, min(max_delay, base * 2^attempt)] 内随机取值"""
+    return random.uniform(0, min(policy.max_delay, policy.base_delay * (2 ** attempt)))
+
+
+def call_with_retry(
+    fn: Callable[[float], Any],
+    policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    budget: RetryBudget | None = None,
+    on_retry: Callable[[int, BaseException], None] | None = None,
+    cancel_token: CancelToken | None = None
+) -> Any:
+    """
+    同步调用并按策略重试
+
+    Args:
+        fn: 接收本次尝试超时秒数的调用函数
+        policy: 重试策略
+        budget: 共享的重试预算
+        on_retry: 每次重试前的回调 (attempt, error)
+        cancel_token: 取消令牌，取消后不再发起新的尝试，退避等待立即中止
+    """
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    sleep = cancel_token.sleep if cancel_token is not None else time.sleep
+    while True:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        remaining = deadline - time.monotonic()
+        try:
+            result = fn(min(policy.request_timeout, max(remaining, 0.1)))
+            if budget:
+                budget.on_success()
+            return result
+        except Exception as e:
+            attempt += 1
+            delay = backoff_delay(attempt, policy)
+            if (not is_retryable(e) or attempt >= policy.max_attempts
+                    or time.monotonic() + delay >= deadline
+                    or (budget and not budget.try_acquire())):
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            sleep(delay)
+
+
+async def async_call_with_retry(
+    fn: Callable[[float], Awaitable[Any]],
+    policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    budget: RetryBudget | None = None,
+    on_retry: Callable[[int, BaseException], None] | None = None
+) -> Any:
+    """call_with_retry 的异步版本，单次尝试超时由 asyncio.wait_for 强制"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy.deadline
+    attempt = 0
+    while True:
+        timeout = min(policy.request_timeout, max(deadline - loop.time(), 0.1))
+        try:
+            result = await asyncio.wait_for(fn(timeout), timeout=timeout)
+            if budget:
+                budget.on_success()
+            return result
+        except Exception as e:
+            attempt += 1
+            delay = backoff_delay(attempt, policy)
+            if (not is_retryable(e) or attempt >= policy.max_attempts
+                    or loop.time() + delay >= deadline
+                    or (budget and not budget.try_acquire())):
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            await asyncio.sleep(delay)
+
+
+def create_sync_client(api_key: str, base_url: str, policy: RetryPolicy = DEFAULT_RETRY_POLICY) -> OpenAI:
+    """创建同步客户端：显式超时与连接池，关闭SDK自带重试（由 call_with_retry 统一处理）"""
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        timeout=httpx.Timeout(policy.request_timeout, connect=policy.connect_timeout),
+        http_client=httpx.Client(limits=httpx.Limits(
+            max_connections=policy.max_connections,
+            max_keepalive_connections=policy.max_keepalive
+        ))
+    )
+
+
+class _EventLoopThread:
+    """进程内共享的后台事件循环，供同步代码（LangGraph节点）提交异步请求"""
+
+    _instance: '_EventLoopThread | None' = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="model-client-loop", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls) -> '_EventLoopThread':
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+
+_END = object()
+
+
+class AsyncModelClient:
+    """
+    异步模型客户端
+
+    基于 AsyncOpenAI + httpx 连接池，运行在共享的后台事件循环上；
+    同一 (base_url, api_key) 的多个Agent共享同一个客户端和连接池
+    """
+
+    _registry: dict[tuple[str, str], 'AsyncModelClient'] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, api_key: str, base_url: str, policy: RetryPolicy = DEFAULT_RETRY_POLICY):
+        self.policy = policy
+        self.budget = RetryBudget()
+        self._loop = _EventLoopThread.get().loop
+        self._client: AsyncOpenAI = self.run(self._create_client(api_key, base_url))
+
+    @classmethod
+    def shared(cls, api_key: str, base_url: str, policy: RetryPolicy = DEFAULT_RETRY_POLICY) -> 'AsyncModelClient':
+        """获取（或创建）指定端点的共享客户端"""
+        key = (base_url, api_key)
+        with cls._registry_lock:
+            client = cls._registry.get(key)
+            if client is None:
+                client = cls._registry[key] = cls(api_key, base_url, policy)
+            return client
+
+    async def _create_client(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        # httpx.AsyncClient 需要在其所属的事件循环中创建
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            timeout=httpx.Timeout(self.policy.request_timeout, connect=self.policy.connect_timeout),
+            http_client=httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.policy.max_connections,
+                max_keepalive_connections=self.policy.max_keepalive
+            ))
+        )
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """在共享事件循环上执行协程并阻塞等待结果（供同步代码调用）"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def submit(self, coro: Awaitable[Any]):
+        """在共享事件循环上执行协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def create(self, api: str, on_retry=None, **kwargs) -> Any:
+        """
+        带超时和重试的请求
+
+        Args:
+            api: "chat" 或 "responses"
+            on_retry: 每次重试前的回调
+            **kwargs: 透传给SDK的参数
+        """
+        endpoint = self._client.chat.completions if api == "chat" else self._client.responses
+        return await async_call_with_retry(
+            lambda timeout: endpoint.create(timeout=timeout, **kwargs),
+            self.policy, self.budget, on_retry
+        )
+
+    def stream_chat(self, on_retry=None, cancel_token: CancelToken | None = None, **kwargs) -> Iterator[Any]:
+        """
+        同步迭代的流式 chat.completions
+
+        建立连接阶段按策略重试；开始收到数据后不再重试。
+        取消令牌触发时取消事件循环中的协程（中止HTTP请求），迭代抛出 Cancelled
+        """
+        chunks: queue.Queue = queue.Queue()
+
+        async def pump():
+            try:
+                stream = await self.create("chat", on_retry=on_retry, stream=True, **kwargs)
+                async for chunk in stream:
+                    chunks.put(chunk)
+            except BaseException as e:
+                chunks.put(e)
+            finally:
+                chunks.put(_END)
+
+        future = self.submit(pump())
+        handle = cancel_token.on_cancel(future.cancel) if cancel_token is not None else None
+        try:
+            while True:
+                item = chunks.get()
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if handle is not None:
+                cancel_token.remove(handle)
+
+    async def warmup(self) -> None:
+        """预热连接：发一个轻量请求，提前完成DNS/TCP/TLS握手"""
+        try:
+            await self._client.models.list(timeout=self.policy.connect_timeout)
+        except Exception:
+            # 端点可能不支持 /models，只要连接建立即可
+            pass
+
+
+# 400/415/422 只有在错误码或错误信息指明接口/参数不被支持时才算能力错误；
+# 请求体过大、图片无效、上下文超长等普通请求错误不能熔断接口
+CAPABILITY_STATUS = (404, 405, 501)
+CAPABILITY_ERROR_CODES = ("unsupported_endpoint", "unsupported_parameter", "unknown_parameter", "unknown_url")
+CAPABILITY_ERROR_MARKERS = ("unrecognized request url", "unrecognized request argument", "unknown parameter",
+                            "unsupported parameter", "endpoint is not supported", "api is not supported",
+                            "not supported by this endpoint", "unknown endpoint")
+
+
+def is_capability_error(error: BaseException) -> bool:
+    """判断错误是否说明端点不支持该接口（404/405/501，或指明接口/参数不被支持的 400/415/422），而非请求本身有误"""
+    if not isinstance(error, openai.APIStatusError):
+        return False
+    if error.status_code in CAPABILITY_STATUS:
+        return True
+    if error.status_code not in (400, 415, 422):
+        return False
+    body = error.body if isinstance(error.body, dict) else {}
+    detail = body.get("error") if isinstance(body.get("error"), dict) else body
+    code = str(error.code or detail.get("code") or "").lower()
+    if code in CAPABILITY_ERROR_CODES:
+        return True
+    message = f"{error.message} {detail.get('message') or ''}".lower()
+    return any(marker in message for marker in CAPABILITY_ERROR_MARKERS)
+
+
+class ApiModeSelector:
+    """
+    按端点记住可用的接口模式（"chat" 或 "responses"）
+
+    某个接口因不支持而失败时熔断该接口，冷却期内直接使用另一个接口，
+    冷却结束后允许再试一次（半开），成功则恢复。同一端点的所有 LVMChat 共享状态
+    """
+
+    MODES = ("chat", "responses")
+
+    _registry: dict[tuple[str, str], 'ApiModeSelector'] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, cooldown: float = 300.0):
+        self.cooldown = cooldown
+        self._open_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_endpoint(cls, base_url: str, model: str) -> 'ApiModeSelector':
+        key = (base_url, model)
+        with cls._registry_lock:
+            selector = cls._registry.get(key)
+            if selector is None:
+                selector = cls._registry[key] = cls()
+            return selector
+
+    def order(self) -> list[str]:
+        """本次请求按顺序尝试的接口：未熔断的在前，熔断中的排在最后兜底"""
+        now = time.monotonic()
+        with self._lock:
+            available = [m for m in self.MODES if self._open_until.get(m, 0.0) <= now]
+            tripped = sorted((m for m in self.MODES if m not in available), key=lambda m: self._open_until[m])
+        return available + tripped
+
+    def record_success(self, mode: str) -> None:
+        with self._lock:
+            self._open_until.pop(mode, None)
+
+    def record_failure(self, mode: str) -> None:
+        """接口不被支持：熔断该接口 cooldown 秒"""
+        with self._lock:
+            self._open_until[mode] = time.monotonic() + self.cooldown
+
+    def is_open(self, mode: str) -> bool:
+        with self._lock:
+            return self._open_until.get(mode, 0.0) > time.monotonic()
@@ -0,0 +1,154 @@
+# utils/tracing.py
+
+import json
+import os
+import threading
+import time
+
+
+class _NullSpan:
+    """关闭追踪时使用的空span：进入/退出都不做任何事"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: 'Tracer', name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._add(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    """
+    轻量的分阶段计时
+
+    span(name) 作为上下文管理器记录一段耗时（附带当前步骤号和线程）；
+    关闭时 span() 直接返回共享的空对象，不取时间也不分配内存。
+    结果可导出为 Chrome trace-event JSON（chrome://tracing / Perfetto）和按阶段的 p50/p95 汇总
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 200_000):
+        """
+        初始化追踪器
+
+        Args:
+            enabled: 是否记录
+            max_spans: 最多保留的span数，超出后不再记录（避免长任务无限增长）
+        """
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.step = 0  # 当前步骤号，记录到每个span的参数中
+        self.dropped = 0
+        self._origin = time.perf_counter_ns()
+        self._spans: list[tuple] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, cat: str = "agent", **args):
+        """记录一段耗时：with tracer.span("encode"): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def record(self, name: str, start_ns: int, end_ns: int, cat: str = "agent", **args) -> None:
+        """记录一段已在别处测得的耗时（time.perf_counter_ns 时间戳）"""
+        if self.enabled:
+            self._add(name, cat, start_ns, end_ns, args)
+
+    def _add(self, name: str, cat: str, start_ns: int, end_ns: int, args: dict) -> None:
+        if len(self._spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            with self._lock:
+                self._threads[thread.ident] = thread.name
+        self._spans.append((name, cat, start_ns, end_ns - start_ns, thread.ident, self.step, args))
+
+    def clear(self) -> None:
+        self._spans = []
+        self.dropped = 0
+
+    def durations(self) -> dict[str, list[float]]:
+        """各阶段的耗时列表（毫秒）"""
+        result: dict[str, list[float]] = {}
+        for name, _, _, duration, _, _, _ in list(self._spans):
+            result.setdefault(name, []).append(duration / 1e6)
+        return result
+
+    def summary(self) -> dict[str, dict]:
+        """按阶段汇总：次数、合计、平均、p50、p95、最大（毫秒），按合计耗时降序"""
+        def percentile(ordered: list[float], q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+        rows = {}
+        for name, samples in self.durations().items():
+            ordered = sorted(samples)
+            total = sum(ordered)
+            rows[name] = {
+                "count": len(ordered),
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / len(ordered), 3),
+                "p50_ms": round(percentile(ordered, 0.5), 3),
+                "p95_ms": round(percentile(ordered, 0.95), 3),
+                "max_ms": round(ordered[-1], 3),
+            }
+        return dict(sorted(rows.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def format_summary(self) -> str:
+        """汇总表（纯文本）"""
+        rows = self.summary()
+        if not rows:
+            return "（没有记录到耗时）"
+        width = max(len(name) for name in rows)
+        lines = [f"{'阶段':<{width}}  {'次数':>6}  {'合计ms':>10}  {'p50ms':>9}  {'p95ms':>9}  {'最大ms':>9}"]
+        for name, row in rows.items():
+            lines.append(f"{name:<{width}}  {row['count']:>6}  {row['total_ms']:>10.1f}  "
+                         f"{row['p50_ms']:>9.2f}  {row['p95_ms']:>9.2f}  {row['max_ms']:>9.2f}")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        """导出 Chrome trace-event 格式（完整事件 ph="X"，时间单位微秒）"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in list(self._threads.items())]
+        for name, cat, start, duration, tid, step, args in list(self._spans):
+            events.append({
+                "name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - self._origin) / 1000, "dur": duration / 1000,
+                "args": {"step": step, **args},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+        return path
+
+
+# 默认的关闭状态追踪器（各组件未传入追踪器时使用）
+NULL_TRACER = Tracer(enabled=False)
@@ -0,0 +1,72 @@
+# utils/trajectory.py
+
+import json
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import List
+
+
+@dataclass
+class TrajectoryStep:
+    """轨迹中的一步：动作 + 执行前画面指纹 + 执行后画面稳定耗时"""
+    step: int
+    thought: str
+    action: str
+    fingerprint: int  # 执行动作前截图的dHash
+    settle_time: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['fingerprint'] = f"{self.fingerprint:016x}"
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TrajectoryStep':
+        data = dict(data)
+        data['fingerprint'] = int(data['fingerprint'], 16)
+        return cls(**data)
+
+
+@dataclass
+class Trajectory:
+    """一次任务的紧凑轨迹，可用于无模型回放"""
+    instruction: str
+    screen_size: tuple[int, int]
+    steps: List[TrajectoryStep] = field(default_factory=list)
+    created: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def add(self, step: TrajectoryStep) -> None:
+        self.steps.append(step)
+
+    @property
+    def finished(self) -> bool:
+        """轨迹是否以 finished 动作结束（只有成功的轨迹才适合回放）"""
+        return bool(self.steps) and self.steps[-1].action.startswith("finished(")
+
+    def to_dict(self) -> dict:
+        return {
+            'instruction': self.instruction,
+            'screen_size': list(self.screen_size),
+            'created': self.created,
+            'steps': [s.to_dict() for s in self.steps]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Trajectory':
+        return cls(
+            instruction=data['instruction'],
+            screen_size=tuple(data['screen_size']),
+            steps=[TrajectoryStep.from_dict(s) for s in data.get('steps', [])],
+            created=data.get('created', '')
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'Trajectory':
+        """从轨迹文件或包含 trajectory 字段的任务记录（tasks/<id>.json）加载"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls.from_dict(data.get('trajectory', data))
@@ -18,8 +18,15 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, base_dir)
 
 from core.config_manager import ConfigManager, AppConfig
-from main import GUIAgent
+from core.events import EventBus, EventFileLogger, LOG, SCREENSHOT, USAGE, STEP_STARTED, MODEL_RESPONSE
+from core.task_catalog import TaskCatalog, MAX_PAGE_SIZE, SEARCH_KINDS
+from core.task_queue import TaskQueue, QueuedTask, COMPLETED, FAILED, CANCELLED, RUNNING, QUEUED
+from core.warmup import load_agent_class, warm_up
+from utils.cancel import CancelToken, Cancelled
+from utils.tracing import Tracer
+from utils.trajectory import Trajectory
 import json
+from dataclasses import dataclass, field
 from datetime import datetime
 
 app = Flask(__name__)
@@ -29,11 +36,133 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # 全局变量
 config_manager = ConfigManager()
 current_config = None
-agent_thread = None
-agent_running = False
-current_task_id = None  # 当前任务ID
-task_logs = []  # 当前任务的日志
-task_screenshots = []  # 当前任务的截图
+task_queue: TaskQueue | None = None  # 持久化任务队列，重启后未完成的任务自动重新排队（init_storage 创建）
+task_catalog: TaskCatalog | None = None  # 历史任务目录和全文索引（init_storage 创建）
+storage_lock = threading.Lock()
+active_tasks: dict[str, 'TaskState'] = {}  # 运行中任务的状态对象
+active_tasks_lock = threading.Lock()
+executors: list['TaskExecutor'] = []
+executors_lock = threading.Lock()
+event_bus = EventBus()  # Agent 事件总线：每个任务一个消费线程，另有文件日志订阅全部事件
+
+
+@dataclass
+class TaskState:
+    """一个运行中任务的状态（日志、截图、取消令牌），替代原先的模块级全局变量"""
+    task_id: str
+    instruction: str
+    executor: str
+    display: str | None = None
+    start_time: datetime = field(default_factory=datetime.now)
+    logs: list = field(default_factory=list)
+    screenshots: list = field(default_factory=list)
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+    tracer: Tracer = field(default_factory=Tracer)  # 分阶段计时，任务结束后写入任务记录
+    usage: dict = field(default_factory=lambda: {'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0})
+    step: int | None = None  # 当前步骤，日志按步骤关联截图
+    search_documents: list = field(default_factory=list)  # 尚未写入全文索引的 (类型, 步骤, 内容)
+    
+    def __post_init__(self):
+        self.search_documents.append(('instruction', None, self.instruction))
+    
+    def log(self, message: str, level: str = 'info', timestamp: datetime = None) -> None:
+        """记录一条日志并推送到前端"""
+        timestamp = timestamp or datetime.now()
+        socketio.emit('log', {'message': message, 'level': level, 'task_id': self.task_id})
+        self.logs.append({'message': message, 'level': level, 'timestamp': timestamp.isoformat(), 'step': self.step})
+        self.search_documents.append(('log', self.step, message))
+    
+    def flush_search(self) -> None:
+        """把积累的指令/Thought/Action/日志写入全文索引（写入时按步骤关联已保存的截图）"""
+        documents, self.search_documents = self.search_documents, []
+        if not documents:
+            return
+        screenshots = {shot['step']: shot['filename'] for shot in self.screenshots}
+        try:
+            task_catalog.index(self.task_id, [(kind, step, content, screenshots.get(step))
+                                              for kind, step, content in documents])
+        except Exception as e:
+            print(f"⚠️ 写入全文索引失败: {e}")
+    
+    def status(self, status: str, color: str) -> None:
+        socketio.emit('status', {'status': status, 'color': color, 'task_id': self.task_id})
+
+
+class TaskEventForwarder:
+    """
+    一个任务的事件消费线程：把 Agent 事件转成任务日志、截图记录和前端推送
+    
+    Agent 线程只把事件放入队列，Socket.IO 推送在这里按自己的节奏进行
+    """
+    
+    def __init__(self, state: TaskState):
+        self.state = state
+        self.subscription = event_bus.subscribe(run_id=state.task_id)
+        self.thread = threading.Thread(target=self._run, name=f"task-events-{state.task_id}", daemon=True)
+    
+    def start(self) -> 'TaskEventForwarder':
+        self.thread.start()
+        return self
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止订阅并等待已发布的事件处理完（保存任务记录前调用）"""
+        self.subscription.close()
+        self.thread.join(timeout)
+    
+    def _run(self) -> None:
+        state = self.state
+        for event in self.subscription:
+            timestamp = datetime.fromtimestamp(event.timestamp)
+            if event.kind == STEP_STARTED:
+                # 上一步的日志和决策按步骤批量写入全文索引（此时上一步的截图已保存）
+                state.flush_search()
+                state.step = event.step
+            elif event.kind == MODEL_RESPONSE:
+                state.search_documents.append(('thought', event.step, event.data.get('thought') or ''))
+                state.search_documents.append(('action', event.step, event.data.get('action') or ''))
+            if event.kind == LOG:
+                message = event.data['message'].strip()
+                if message:
+                    state.log(f"[{timestamp.strftime('%H:%M:%S')}] {message}", event.data.get('level', 'info'),
+                              timestamp)
+            elif event.kind == SCREENSHOT:
+                if not event.data['path']:
+                    continue
+                # 记录截图信息（文件名相对 steps/，包含任务目录）
+                screenshot_info = {
+                    'filename': f"{state.task_id}/{os.path.basename(event.data['path'])}",
+                    'step': event.step,
+                    'path': event.data['path'],
+                    'timestamp': timestamp.isoformat(),
+                    'task_id': state.task_id
+                }
+                state.screenshots.append(screenshot_info)
+                socketio.emit('screenshot', screenshot_info)
+                state.log(f'[{timestamp.strftime("%H:%M:%S")}] 📸 截图已保存: 步骤 {event.step}', 'info', timestamp)
+            else:
+                if event.kind == USAGE:
+                    # 累计 token 用量，任务结束时写入任务记录和任务目录
+                    for key in state.usage:
+                        state.usage[key] += event.data.get(key) or 0
+                # 步骤开始、模型响应、动作、用量、结束：结构化事件原样推送
+                socketio.emit('agent_event', {'task_id': state.task_id, 'kind': event.kind,
+                                              'step': event.step, 'data': event.data})
+
+
+@app.before_request
+def init_storage():
+    """
+    打开任务队列和任务目录（只执行一次）
+    
+    服务启动时调用；导入本模块（测试、工具脚本）不会创建数据库，也不会把中断的任务重新排队。
+    以其他方式托管 app 时由第一个请求触发
+    """
+    global task_queue, task_catalog
+    with storage_lock:
+        if task_queue is None:
+            task_queue = TaskQueue()
+        if task_catalog is None:
+            task_catalog = TaskCatalog()
 
 
 @app.route('/')
@@ -75,7 +204,10 @@ def save_config():
         api_key=data.get('api_key', ''),
         base_url=data.get('base_url', ''),
         model_name=data.get('model_name', 'your-model-name'),
-        history=data.get('history', [])
+        history=data.get('history', []),
+        executors=int(data.get('executors', current_config.executors if current_config else 1)),
+        displays=data.get('displays', current_config.displays if current_config else []),
+        warmup=bool(data.get('warmup', current_config.warmup if current_config else True))
     )
     
     # 验证配置
@@ -91,57 +223,105 @@ def save_config():
         return jsonify({'error': '保存配置失败'}), 500
 
 
-@app.route('/api/task/start', methods=['POST'])
-def start_task():
-    """启动任务"""
-    global agent_thread, agent_running, current_config, current_task_id, task_logs, task_screenshots
-    
-    if agent_running:
-        return jsonify({'error': '任务已在运行中'}), 400
-    
+def enqueue_task(data: dict):
+    """校验请求并把任务加入队列，返回 (响应, 状态码)"""
     if not current_config:
-        return jsonify({'error': '请先配置API凭证'}), 400
+        return {'error': '请先配置API凭证'}, 400
     
-    data = request.json
     instruction = data.get('instruction', '')
     
+    # 回放历史任务：复用其轨迹，画面不一致时自动回退到模型决策
+    replay_task_id = data.get('replay_task_id')
+    if replay_task_id:
+        task_file = f"tasks/{replay_task_id}.json"
+        if not os.path.exists(task_file):
+            return {'error': '回放的任务记录不存在'}, 404
+        instruction = instruction or Trajectory.load(task_file).instruction
+    
     if not instruction:
-        return jsonify({'error': '任务描述不能为空'}), 400
-    
-    # 生成任务ID
-    current_task_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    task_logs = []
-    task_screenshots = []
-    
-    # 确保tasks目录存在
-    tasks_dir = "tasks"
-    if not os.path.exists(tasks_dir):
-        os.makedirs(tasks_dir)
-    
-    # 在新线程中运行Agent
-    agent_thread = threading.Thread(
-        target=run_agent_task,
-        args=(instruction,),
-        daemon=True
-    )
-    agent_running = True
-    agent_thread.start()
+        return {'error': '任务描述不能为空'}, 400
+    
+    ensure_executors()
+    task_id = task_queue.enqueue(instruction, priority=int(data.get('priority', 0)),
+                                 replay_task_id=replay_task_id)
     
     # 添加到历史记录
     config_manager.add_to_history(instruction)
     
-    return jsonify({'success': True, 'task_id': current_task_id})
+    return {'success': True, 'task_id': task_id, 'position': task_queue.position(task_id)}, 200
+
+
+@app.route('/api/task/start', methods=['POST'])
+def start_task():
+    """启动任务（加入队列，有空闲执行器时立即开始）"""
+    response, code = enqueue_task(request.json or {})
+    return jsonify(response), code
+
+
+@app.route('/api/tasks', methods=['POST'])
+def create_task():
+    """任务入队：{"instruction": ..., "priority"?: 0, "replay_task_id"?: ...}"""
+    response, code = enqueue_task(request.json or {})
+    return jsonify(response), code
+
+
+def cancel_task(task_id: str) -> QueuedTask | None:
+    """取消排队中的任务，或通知运行中的任务停止"""
+    task = task_queue.cancel(task_id)
+    with active_tasks_lock:
+        state = active_tasks.get(task_id)
+    if state is not None:
+        state.cancel_token.cancel("用户停止")
+        state.log('正在停止任务...', 'warning')
+    return task
+
+
+@app.route('/api/tasks/<task_id>/cancel', methods=['POST'])
+def cancel_task_api(task_id):
+    """取消任务"""
+    task = cancel_task(task_id)
+    if task is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify({'success': True, 'task': task.to_dict()})
+
+
+@app.route('/api/tasks/<task_id>/status', methods=['GET'])
+def get_task_status(task_id):
+    """查询任务状态（排队位置、执行器、运行中的日志/截图数）"""
+    task = task_queue.get(task_id)
+    if task is None:
+        return jsonify({'error': '任务不存在'}), 404
+    result = task.to_dict()
+    if task.status == QUEUED:
+        result['position'] = task_queue.position(task_id)
+    with active_tasks_lock:
+        state = active_tasks.get(task_id)
+    if state is not None:
+        result['display'] = state.display
+        result['log_count'] = len(state.logs)
+        result['screenshots'] = len(state.screenshots)
+        result['timing'] = state.tracer.summary()
+    return jsonify(result)
+
+
+@app.route('/api/queue', methods=['GET'])
+def get_queue():
+    """排队中和运行中的任务"""
+    tasks = task_queue.list((RUNNING, QUEUED), limit=int(request.args.get('limit', 100)))
+    return jsonify({
+        'tasks': [task.to_dict() for task in tasks],
+        'executors': [{'name': e.name, 'display': e.display, 'task_id': e.current_task_id} for e in executors]
+    })
 
 
 @app.route('/api/task/stop', methods=['POST'])
 def stop_task():
-    """停止任务"""
-    global agent_running
-    
-    agent_running = False
-    socketio.emit('log', {'message': '正在停止任务...', 'level': 'warning'})
-    
-    return jsonify({'success': True})
+    """停止任务（指定 task_id，未指定时停止所有运行中的任务）"""
+    data = request.get_json(silent=True) or {}
+    task_ids = [data['task_id']] if data.get('task_id') else [t.id for t in task_queue.list((RUNNING,))]
+    for task_id in task_ids:
+        cancel_task(task_id)
+    return jsonify({'success': True, 'cancelled': task_ids})
 
 
 @app.route('/api/history', methods=['GET'])
@@ -166,40 +346,67 @@ def get_task_details(task_id):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/task/<task_id>/trace', methods=['GET'])
+def get_task_trace(task_id):
+    """下载任务的 Chrome trace（chrome://tracing 或 ui.perfetto.dev 打开）"""
+    tasks_dir = os.path.join(base_dir, 'tasks')
+    filename = f"{task_id}.trace.json"
+    if not os.path.exists(os.path.join(tasks_dir, filename)):
+        return jsonify({'error': '该任务没有耗时记录'}), 404
+    return send_from_directory(tasks_dir, filename, as_attachment=True)
+
+
 @app.route('/api/tasks', methods=['GET'])
 def get_all_tasks():
-    """获取所有任务列表"""
+    """
+    分页查询历史任务（按开始时间倒序）
+    
+    参数: status（已完成/已停止/错误 或 completed/cancelled/failed）、since/until（ISO 时间，until 按前缀包含当天）、
+    prefix（指令前缀）、page（从1开始）、page_size（默认50）
+    """
     try:
-        tasks_dir = "tasks"
-        if not os.path.exists(tasks_dir):
-            return jsonify({'tasks': []})
-        
-        tasks = []
-        for filename in os.listdir(tasks_dir):
-            if filename.endswith('.json'):
-                task_id = filename[:-5]  # 移除.json后缀
-                try:
-                    with open(os.path.join(tasks_dir, filename), 'r', encoding='utf-8') as f:
-                        task_data = json.load(f)
-                    
-                    # 只返回基本信息
-                    task_summary = {
-                        'id': task_id,
-                        'instruction': task_data.get('instruction', ''),
-                        'start_time': task_data.get('start_time', ''),
-                        'end_time': task_data.get('end_time', ''),
-                        'status': task_data.get('status', ''),
-                        'steps': len(task_data.get('screenshots', [])),
-                        'duration': task_data.get('duration', 0)
-                    }
-                    tasks.append(task_summary)
-                except Exception as e:
-                    print(f"读取任务文件失败 {filename}: {e}")
-                    continue
-        
-        # 按时间倒序排列
-        tasks.sort(key=lambda x: x.get('start_time', ''), reverse=True)
-        return jsonify({'tasks': tasks})
+        page = max(int(request.args.get('page', 1)), 1)
+        page_size = min(max(int(request.args.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+        tasks, total = task_catalog.query(
+            status=request.args.get('status') or None,
+            since=request.args.get('since') or None,
+            until=request.args.get('until') or None,
+            prefix=request.args.get('prefix') or None,
+            page=page,
+            page_size=page_size
+        )
+        return jsonify({'tasks': [task.to_dict() for task in tasks], 'total': total,
+                        'page': page, 'page_size': page_size})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/search', methods=['GET'])
+def search_tasks():
+    """
+    全文搜索任务指令、每一步的 Thought/Action 和日志（按相关度排序）
+    
+    参数: q（搜索词，空格分隔的多个词须同时出现）、kind（instruction/thought/action/log）、task_id、
+    page（从1开始）、page_size（默认20）
+    结果中的 screenshot_url 指向该步骤的截图
+    """
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    if not query:
+        return jsonify({'error': '请提供搜索词'}), 400
+    if kind and kind not in SEARCH_KINDS:
+        return jsonify({'error': f"kind 只能是 {', '.join(SEARCH_KINDS)}"}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        page_size = min(max(int(request.args.get('page_size', 20)), 1), MAX_PAGE_SIZE)
+        hits, total = task_catalog.search(query, kind=kind, task_id=request.args.get('task_id') or None,
+                                          page=page, page_size=page_size)
+        results = [{**hit.to_dict(),
+                    'screenshot_url': f"/screenshots/{hit.screenshot}" if hit.screenshot else None}
+                   for hit in hits]
+        return jsonify({'results': results, 'total': total, 'page': page, 'page_size': page_size})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -216,144 +423,162 @@ def serve_screenshot(filename):
     return send_from_directory(steps_dir, filename)
 
 
-def run_agent_task(instruction: str):
-    """在后台线程运行Agent任务"""
-    global agent_running, current_config, current_task_id, task_logs, task_screenshots
+class TaskExecutor:
+    """任务执行器：后台线程从队列领取任务，在绑定的显示器上运行 GUIAgent"""
     
-    start_time = datetime.now()
+    def __init__(self, name: str, display: str | None = None):
+        self.name = name
+        self.display = display
+        self.current_task_id: str | None = None
+        self.thread = threading.Thread(target=self._loop, name=f"task-executor-{name}", daemon=True)
+    
+    def start(self) -> 'TaskExecutor':
+        self.thread.start()
+        return self
+    
+    def _loop(self) -> None:
+        while True:
+            task = task_queue.claim(self.name)
+            state = TaskState(task.id, task.instruction, self.name, self.display)
+            with active_tasks_lock:
+                active_tasks[task.id] = state
+            self.current_task_id = task.id
+            try:
+                run_agent_task(state, task)
+            finally:
+                self.current_task_id = None
+                with active_tasks_lock:
+                    active_tasks.pop(task.id, None)
+
+
+def ensure_executors() -> None:
+    """按配置启动执行器（只启动一次）；每个执行器绑定各自的显示器"""
+    with executors_lock:
+        if executors or not current_config:
+            return
+        _start_executors()
+
+
+def _start_executors() -> None:
+    EventFileLogger(event_bus, os.path.join('logs', 'events.jsonl')).start()
+    count = max(current_config.executors, 1)
+    displays = list(current_config.displays)
+    if count > 1 and len(displays) < count:
+        # 没有配置足够的显示器时为其余执行器启动虚拟显示器
+        from gui_operator.virtual_display import VirtualDisplay
+        for _ in range(count - len(displays)):
+            number = VirtualDisplay.free_number(99 + len(displays))
+            displays.append(VirtualDisplay(number).start().name)
+    for index in range(count):
+        display = displays[index] if index < len(displays) and displays[index] else None
+        executors.append(TaskExecutor(f"executor-{index + 1}", display).start())
+    print(f"⚙️  已启动 {count} 个任务执行器")
+
+
+def run_agent_task(state: TaskState, task: QueuedTask):
+    """在执行器线程中运行一个Agent任务"""
+    start_time = state.start_time
+    agent = None
+    forwarder = TaskEventForwarder(state).start()
     
     try:
-        socketio.emit('status', {'status': '执行中', 'color': 'blue'})
-        
-        start_log = f'[{start_time.strftime("%H:%M:%S")}] 🚀 开始执行任务: {instruction}'
-        socketio.emit('log', {'message': start_log, 'level': 'info'})
-        task_logs.append({'message': start_log, 'level': 'info', 'timestamp': start_time.isoformat()})
+        replay = Trajectory.load(f"tasks/{task.replay_task_id}.json") if task.replay_task_id else None
+        state.status('执行中', 'blue')
+        state.log(f'[{start_time.strftime("%H:%M:%S")}] 🚀 开始执行任务: {state.instruction}', 'info', start_time)
         
-        # 创建Agent
+        # 创建Agent（截图按任务分目录保存，并发任务互不覆盖；日志和截图以事件发布）
+        # GUIAgent 及其依赖在第一个任务开始时才导入（已预热时直接使用）
+        from gui_operator.execute import Operation
+        GUIAgent = load_agent_class()
         agent = GUIAgent(
-            instruction=instruction,
-            model_name=current_config.model_name
+            instruction=state.instruction,
+            model_name=current_config.model_name,
+            api_key=current_config.api_key,
+            base_url=current_config.base_url,
+            replay=replay,
+            operation=Operation(display=state.display) if state.display else None,
+            steps_dir=os.path.join('steps', state.task_id),
+            cancel_token=state.cancel_token,
+            tracer=state.tracer,
+            run_id=state.task_id,
+            events=event_bus
         )
         
-        # 修改Agent的配置
-        agent.lvm_chat.client.api_key = current_config.api_key
-        agent.lvm_chat.client.base_url = current_config.base_url
-        
-        # 重定向输出
-        import sys
-        from io import StringIO
-        
-        class SocketIOWriter:
-            def write(self, text):
-                if text.strip():
-                    # 添加时间戳
-                    timestamp = datetime.now()
-                    message = f"[{timestamp.strftime('%H:%M:%S')}] {text.strip()}"
-                    socketio.emit('log', {'message': message, 'level': 'info'})
-                    task_logs.append({'message': message, 'level': 'info', 'timestamp': timestamp.isoformat()})
-            def flush(self):
-                pass
-        
-        old_stdout = sys.stdout
-        sys.stdout = SocketIOWriter()
-        
-        # 修改Agent以支持截图回调
-        original_take_screenshot = agent.take_screenshot
-        
-        def enhanced_take_screenshot(state):
-            # 调用原始截图方法
-            result = original_take_screenshot(state)
-            
-            # 发送截图信息到前端
-            if 'screenshot_path' in result:
-                screenshot_path = result['screenshot_path']
-                step = result.get('step', 0)
-                
-                # 获取文件名
-                filename = os.path.basename(screenshot_path)
-                
-                # 记录截图信息
-                screenshot_info = {
-                    'filename': filename,
-                    'step': step,
-                    'path': screenshot_path,
-                    'timestamp': datetime.now().isoformat()
-                }
-                task_screenshots.append(screenshot_info)
-                
-                # 发送截图事件
-                socketio.emit('screenshot', screenshot_info)
-                
-                # 添加时间戳的截图日志
-                timestamp = datetime.now()
-                log_message = f'[{timestamp.strftime("%H:%M:%S")}] 📸 截图已保存: 步骤 {step}'
-                socketio.emit('log', {'message': log_message, 'level': 'info'})
-                task_logs.append({'message': log_message, 'level': 'info', 'timestamp': timestamp.isoformat()})
-            
-            return result
-        
-        # 替换截图方法
-        agent.take_screenshot = enhanced_take_screenshot
-        
         # 运行Agent
         final_state = agent.run()
-        
-        # 恢复stdout
-        sys.stdout = old_stdout
+        steps = final_state.get('step', 0)
+        forwarder.stop()
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
-        if agent_running:
-            socketio.emit('status', {'status': '已完成', 'color': 'green'})
-            success_log = f'[{end_time.strftime("%H:%M:%S")}] ✅ 任务完成！共执行 {final_state["step"]} 步，总耗时: {duration:.2f}秒'
-            socketio.emit('log', {'message': success_log, 'level': 'success'})
-            task_logs.append({'message': success_log, 'level': 'success', 'timestamp': end_time.isoformat()})
-            
-            # 保存任务记录
-            save_task_record(instruction, start_time, end_time, '已完成', final_state.get('step', 0), duration)
+        state.status('已完成', 'green')
+        state.log(f'[{end_time.strftime("%H:%M:%S")}] ✅ 任务完成！共执行 {steps} 步，总耗时: {duration:.2f}秒',
+                  'success', end_time)
+        task_queue.finish(state.task_id, COMPLETED, steps)
+        
+        # 保存任务记录（附带轨迹，供之后回放）
+        save_task_record(state, end_time, '已完成', steps, duration, trajectory=agent.trajectory.to_dict())
+    
+    except Cancelled:
+        forwarder.stop()
+        steps = agent.current_step if agent else 0
+        end_time = datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        state.status('已停止', 'orange')
+        state.log(f'[{end_time.strftime("%H:%M:%S")}] ⏹️ 任务已停止', 'warning', end_time)
+        task_queue.finish(state.task_id, CANCELLED, steps)
+        save_task_record(state, end_time, '已停止', steps, duration)
     
     except Exception as e:
+        forwarder.stop()
+        steps = agent.current_step if agent else 0
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
-        error_log = f'[{end_time.strftime("%H:%M:%S")}] ❌ 执行错误: {str(e)}'
-        socketio.emit('log', {'message': error_log, 'level': 'error'})
-        task_logs.append({'message': error_log, 'level': 'error', 'timestamp': end_time.isoformat()})
-        socketio.emit('status', {'status': '错误', 'color': 'red'})
+        state.log(f'[{end_time.strftime("%H:%M:%S")}] ❌ 执行错误: {str(e)}', 'error', end_time)
+        state.status('错误', 'red')
+        task_queue.finish(state.task_id, FAILED, steps, str(e))
         
         # 保存任务记录
-        save_task_record(instruction, start_time, end_time, '错误', 0, duration, str(e))
-    
-    finally:
-        agent_running = False
+        save_task_record(state, end_time, '错误', steps, duration, str(e))
 
 
-def save_task_record(instruction: str, start_time: datetime, end_time: datetime, 
-                    status: str, steps: int, duration: float, error: str = None):
+def save_task_record(state: TaskState, end_time: datetime, status: str, steps: int, duration: float,
+                     error: str = None, trajectory: dict = None):
     """保存任务执行记录"""
-    global current_task_id, task_logs, task_screenshots
-    
     try:
         task_record = {
-            'id': current_task_id,
-            'instruction': instruction,
-            'start_time': start_time.isoformat(),
+            'id': state.task_id,
+            'instruction': state.instruction,
+            'start_time': state.start_time.isoformat(),
             'end_time': end_time.isoformat(),
             'status': status,
             'steps': steps,
             'duration': duration,
-            'logs': task_logs,
-            'screenshots': task_screenshots
+            'logs': state.logs,
+            'screenshots': state.screenshots
         }
         
+        task_record['usage'] = dict(state.usage)
+        
         if error:
             task_record['error'] = error
+        if trajectory:
+            task_record['trajectory'] = trajectory
         
         # 保存到文件
-        task_file = f"tasks/{current_task_id}.json"
+        os.makedirs("tasks", exist_ok=True)
+        timing = state.tracer.summary()
+        if timing:
+            # 分阶段耗时汇总放进任务记录，完整的span导出为 Chrome trace
+            task_record['timing'] = timing
+            state.tracer.save_chrome_trace(f"tasks/{state.task_id}.trace.json")
+        task_file = f"tasks/{state.task_id}.json"
         with open(task_file, 'w', encoding='utf-8') as f:
             json.dump(task_record, f, ensure_ascii=False, indent=2)
+        task_catalog.upsert(task_record)
+        state.flush_search()
         
         print(f"任务记录已保存: {task_file}")
     
@@ -361,6 +586,13 @@ def save_task_record(instruction: str, start_time: datetime, end_time: datetime,
         print(f"保存任务记录失败: {e}")
 
 
+def backfill_catalog():
+    """回填任务目录"""
+    added = task_catalog.backfill("tasks")
+    if added:
+        print(f"🗂️  任务目录已回填 {added} 条历史记录")
+
+
 def open_browser():
     """延迟打开浏览器"""
     time.sleep(1.5)
@@ -371,8 +603,23 @@ if __name__ == '__main__':
     print("🚀 GUI Agent Web版本启动中...")
     print("📱 浏览器将自动打开，如未打开请访问: http://127.0.0.1:5000")
     
+    # 打开任务队列（上次未完成的任务重新排队）和任务目录
+    init_storage()
+    
     # 在新线程中打开浏览器
     threading.Thread(target=open_browser, daemon=True).start()
     
+    # 把尚未收录的历史任务记录回填到任务目录（首次启动时为全部记录）
+    threading.Thread(target=backfill_catalog, daemon=True).start()
+    
+    # 已配置时立即启动执行器，继续执行上次退出时未完成的任务
+    if not config_manager.is_first_run():
+        current_config = config_manager.load_config()
+        ensure_executors()
+    
+    # 服务启动后在后台预加载 Agent 依赖，第一个任务无需等待导入
+    if current_config is None or current_config.warmup:
+        warm_up(delay=1.0)
+    
     # 启动Flask应用
     socketio.run(app, host='127.0.0.1', port=5000, debug=False)